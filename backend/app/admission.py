@@ -0,0 +1,207 @@
+"""
+Pinpost Admission Control
+Caps concurrent requests per worker with a limit that adapts to observed
+latency, and decides who waits when the cap is reached: core actions
+(login, messaging) queue first, ordinary reads queue briefly, expensive
+low-priority endpoints are shed with a fast 503.
+"""
+import asyncio
+import json
+import math
+import re
+import time
+from collections import deque
+from typing import Dict, Optional
+
+from . import metrics
+from .config import settings
+
+CRITICAL, NORMAL, LOW = 0, 1, 2
+PRIORITY_NAMES = {CRITICAL: "critical", NORMAL: "normal", LOW: "low"}
+
+# (method or None for any, path regex) -> class; first match wins, default NORMAL
+ROUTE_CLASSES = [
+    ("POST", re.compile(r"^/api/auth/(login|register)$"), CRITICAL),
+    ("GET", re.compile(r"^/api/auth/me$"), CRITICAL),
+    ("POST", re.compile(r"^/api/(messages|conversations)$"), CRITICAL),
+    ("PUT", re.compile(r"^/api/(messages|conversations)/[^/]+/read$"), CRITICAL),
+    ("POST", re.compile(r"^/api/conversations/[^/]+/typing$"), CRITICAL),
+    ("GET", re.compile(r"^/api/users/(suggestions|search)$"), LOW),
+    (None, re.compile(r"^/api/(admin|debug)/"), LOW),
+]
+
+# Never queued or shed: probes, scrapes and media
+EXEMPT = re.compile(r"^/($|metrics$|api/health$|uploads/)")
+
+# Admitted, but too slow by nature (request bodies) to say anything about database load
+UNSAMPLED = re.compile(r"^/api/upload/")
+
+# Fraction of the limit each class may fill; the rest is headroom for higher classes
+SHARE = {CRITICAL: 1.0, NORMAL: 0.9, LOW: 0.6}
+
+# Gradient limit tuning (as in Netflix's Gradient2)
+SHORT_ALPHA = 0.1  # ~10 requests
+LONG_ALPHA = 2 / 601  # ~600 requests
+TOLERANCE = 1.5  # latency may grow this much over its long-term average before the limit shrinks
+SMOOTHING = 0.2
+
+
+def classify(method: str, path: str) -> Optional[int]:
+    """Priority class of a request, or None if it bypasses admission."""
+    if EXEMPT.match(path):
+        return None
+    for route_method, pattern, priority in ROUTE_CLASSES:
+        if (route_method is None or route_method == method) and pattern.match(path):
+            return priority
+    return NORMAL
+
+
+class GradientLimit:
+    """
+    Concurrency limit from the ratio of long-term to recent latency.
+
+    While recent latency stays near its long-term average the limit grows
+    by about sqrt(limit); when requests start queueing somewhere (Motor
+    pool, Mongo, CPU) recent latency rises and the limit shrinks, by at
+    most half per update.
+    """
+
+    def __init__(self, initial: float, minimum: float, maximum: float):
+        self.limit = float(initial)
+        self.minimum = minimum
+        self.maximum = maximum
+        self.short: Optional[float] = None
+        self.long: Optional[float] = None
+
+    def update(self, rtt: float, inflight: int):
+        if self.short is None:
+            self.short = self.long = rtt
+            return
+        self.short += (rtt - self.short) * SHORT_ALPHA
+        self.long += (rtt - self.long) * LONG_ALPHA
+        # After an overload the long average is inflated; let it drift back down
+        if self.long > 2 * self.short:
+            self.long *= 0.95
+        # Nowhere near the limit: latency says nothing about whether more would fit
+        if inflight < self.limit / 2:
+            return
+        gradient = max(0.5, min(1.0, TOLERANCE * self.long / self.short))
+        target = self.limit * gradient + math.sqrt(self.limit)
+        limit = self.limit * (1 - SMOOTHING) + target * SMOOTHING
+        self.limit = max(self.minimum, min(self.maximum, limit))
+
+
+class AdmissionController:
+    """Per-worker admission: an adaptive limit plus a priority queue in front of it."""
+
+    def __init__(self):
+        self.gradient = GradientLimit(
+            settings.ADMISSION_INITIAL_LIMIT, settings.ADMISSION_MIN_LIMIT, settings.ADMISSION_MAX_LIMIT
+        )
+        self.inflight = 0
+        self._waiters: Dict[int, deque] = {CRITICAL: deque(), NORMAL: deque()}
+        self._timeouts = {
+            CRITICAL: settings.ADMISSION_CRITICAL_QUEUE_TIMEOUT,
+            NORMAL: settings.ADMISSION_QUEUE_TIMEOUT,
+            LOW: 0,  # shed at once
+        }
+
+    @property
+    def limit(self) -> float:
+        return self.gradient.limit
+
+    def _fits(self, priority: int) -> bool:
+        return self.inflight < self.gradient.limit * SHARE[priority]
+
+    def _queued_ahead(self, priority: int) -> bool:
+        return any(self._waiters[p] for p in self._waiters if p <= priority)
+
+    async def acquire(self, priority: int) -> bool:
+        """Wait for a slot; False if the request should be rejected."""
+        if self._fits(priority) and not self._queued_ahead(priority):
+            self.inflight += 1
+            return True
+        timeout = self._timeouts[priority]
+        if not timeout:
+            return False
+        waiter = asyncio.get_running_loop().create_future()
+        queue = self._waiters[priority]
+        queue.append(waiter)
+        admitted = False
+        try:
+            # _wake() counts the slot before waking us
+            await asyncio.wait_for(waiter, timeout)
+            admitted = True
+            return True
+        except asyncio.TimeoutError:
+            return False
+        finally:
+            if not admitted:
+                if waiter.done() and not waiter.cancelled():
+                    # Granted just as we gave up (client went away): pass the slot on
+                    self.release(None)
+                else:
+                    try:
+                        queue.remove(waiter)
+                    except ValueError:
+                        pass
+
+    def release(self, rtt: Optional[float]):
+        self.inflight -= 1
+        if rtt is not None:
+            self.gradient.update(rtt, self.inflight + 1)
+        self._wake()
+
+    def _wake(self):
+        for priority in (CRITICAL, NORMAL):
+            queue = self._waiters[priority]
+            while queue and self._fits(priority):
+                waiter = queue.popleft()
+                if not waiter.done():
+                    self.inflight += 1
+                    waiter.set_result(None)
+            if queue:
+                # Lower classes stay behind a class that is still waiting
+                return
+
+
+admission = AdmissionController()
+
+_BUSY_BODY = json.dumps({"detail": "Server is busy, please retry shortly"}).encode()
+
+
+class AdmissionMiddleware:
+    """Admits HTTP requests through `admission`, answering 503 + Retry-After when shed."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not settings.ADMISSION_ENABLED:
+            await self.app(scope, receive, send)
+            return
+        priority = classify(scope["method"], scope["path"])
+        if priority is None:
+            await self.app(scope, receive, send)
+            return
+
+        if not await admission.acquire(priority):
+            metrics.ADMISSION_REJECTED.labels(PRIORITY_NAMES[priority]).inc()
+            await send({
+                "type": "http.response.start",
+                "status": 503,
+                "headers": [
+                    (b"content-type", b"application/json"),
+                    (b"content-length", str(len(_BUSY_BODY)).encode()),
+                    (b"retry-after", b"1"),
+                ],
+            })
+            await send({"type": "http.response.body", "body": _BUSY_BODY})
+            return
+
+        start = time.perf_counter()
+        sampled = not UNSAMPLED.match(scope["path"])
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            admission.release(time.perf_counter() - start if sampled else None)
@@ -0,0 +1,169 @@
+"""
+Pinpost Response Compression
+Brotli/gzip for API responses, negotiated from Accept-Encoding.
+Only textual bodies over COMPRESSION_MIN_SIZE are compressed; media,
+ranges, already-encoded bodies and WebSockets pass through untouched.
+"""
+import gzip
+import zlib
+from typing import Optional
+
+import anyio
+
+from .config import settings
+
+try:
+    import brotli
+except ImportError:  # optional dependency, clients get gzip instead
+    brotli = None
+
+COMPRESSIBLE_TYPES = (
+    "application/json",
+    "application/javascript",
+    "application/xml",
+    "image/svg+xml",
+    "text/",
+)
+
+# Bodies this large are compressed off the event loop; both codecs release the GIL
+THREAD_THRESHOLD = 64 * 1024
+
+
+def negotiate(accept_encoding: str) -> Optional[str]:
+    """Best coding the client accepts: "br" when available, then "gzip"."""
+    accepted = {}
+    for part in accept_encoding.lower().split(","):
+        coding, _, params = part.strip().partition(";")
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        accepted[coding.strip()] = q
+    wildcard = accepted.get("*", 0.0)
+    for coding in (("br", "gzip") if brotli is not None else ("gzip",)):
+        if accepted.get(coding, wildcard) > 0:
+            return coding
+    return None
+
+
+def compress(coding: str, body: bytes) -> bytes:
+    if coding == "br":
+        return brotli.compress(body, quality=settings.COMPRESSION_BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=settings.COMPRESSION_GZIP_LEVEL, mtime=0)
+
+
+class _StreamCompressor:
+    """Incremental compressor for streamed (more_body) responses."""
+
+    def __init__(self, coding: str):
+        if coding == "br":
+            self._c = brotli.Compressor(quality=settings.COMPRESSION_BROTLI_QUALITY)
+            self._feed, self._finish = self._c.process, self._c.finish
+        else:
+            self._c = zlib.compressobj(settings.COMPRESSION_GZIP_LEVEL, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+            self._feed, self._finish = self._c.compress, self._c.flush
+
+    def feed(self, chunk: bytes, last: bool) -> bytes:
+        out = self._feed(chunk) if chunk else b""
+        return out + self._finish() if last else out
+
+
+def _header(headers, name: bytes) -> Optional[bytes]:
+    for key, value in headers:
+        if key.lower() == name:
+            return value
+    return None
+
+
+def _compressible(status: int, headers) -> bool:
+    if status < 200 or status in (204, 206, 304):
+        return False
+    if _header(headers, b"content-encoding") is not None or _header(headers, b"content-range") is not None:
+        return False
+    content_type = (_header(headers, b"content-type") or b"").decode("latin-1").lower()
+    return content_type.startswith(COMPRESSIBLE_TYPES) and not content_type.startswith("text/event-stream")
+
+
+def _add_vary(headers: list) -> list:
+    vary = _header(headers, b"vary")
+    if vary is None:
+        return headers + [(b"vary", b"Accept-Encoding")]
+    if b"accept-encoding" in vary.lower():
+        return headers
+    return [(k, v) for k, v in headers if k.lower() != b"vary"] + [(b"vary", vary + b", Accept-Encoding")]
+
+
+class CompressionMiddleware:
+    """
+    Compresses HTTP responses the client can decode.
+
+    Whole bodies under COMPRESSION_MIN_SIZE go out as-is (the framing
+    overhead isn't worth the CPU); larger ones are compressed in one shot,
+    and streamed bodies chunk by chunk without a Content-Length.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not settings.COMPRESSION_ENABLED:
+            await self.app(scope, receive, send)
+            return
+
+        accept = _header(scope["headers"], b"accept-encoding")
+        coding = negotiate(accept.decode("latin-1")) if accept else None
+
+        start = None  # held http.response.start, until the first body chunk decides
+        stream: Optional[_StreamCompressor] = None
+        passthrough = False
+
+        async def send_wrapper(message):
+            nonlocal start, stream, passthrough
+            if message["type"] == "http.response.start":
+                headers = list(message.get("headers", []))
+                if not _compressible(message["status"], headers):
+                    passthrough = True
+                    await send(message)
+                    return
+                # Vary even when not compressing, so shared caches keep the variants apart
+                if coding is None:
+                    passthrough = True
+                    await send({**message, "headers": _add_vary(headers)})
+                    return
+                start = {**message, "headers": _add_vary(headers)}
+                return
+            if passthrough or message["type"] != "http.response.body":
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            more = message.get("more_body", False)
+            if start is not None:
+                headers = start["headers"]
+                if not more and len(body) < settings.COMPRESSION_MIN_SIZE:
+                    passthrough = True
+                    await send(start)
+                    start = None
+                    await send(message)
+                    return
+                headers = [(k, v) for k, v in headers if k.lower() != b"content-length"]
+                headers.append((b"content-encoding", coding.encode()))
+                if not more:
+                    if len(body) >= THREAD_THRESHOLD:
+                        body = await anyio.to_thread.run_sync(compress, coding, body)
+                    else:
+                        body = compress(coding, body)
+                    headers.append((b"content-length", str(len(body)).encode()))
+                    await send({**start, "headers": headers})
+                    start = None
+                    await send({"type": "http.response.body", "body": body})
+                    return
+                stream = _StreamCompressor(coding)
+                await send({**start, "headers": headers})
+                start = None
+            await send({"type": "http.response.body", "body": stream.feed(body, last=not more), "more_body": more})
+
+        await self.app(scope, receive, send_wrapper)
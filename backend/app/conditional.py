@@ -0,0 +1,93 @@
+"""
+Pinpost Conditional Requests
+ETag / Last-Modified validators for public reads, so revalidation can be
+answered with a 304 from a small projected lookup instead of a full
+hydrated response.
+"""
+import hashlib
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Optional
+
+from fastapi import Request
+from fastapi.responses import Response
+
+from .services.media_service import etag_matches
+
+
+def touched() -> dict:
+    """
+    $set fragment for any write that changes what a read returns.
+
+    Counter updates ($inc likes_count, followers_count...) don't touch
+    updated_at, which means "edited"; modified_at covers every change.
+    """
+    return {"modified_at": datetime.now(timezone.utc).isoformat()}
+
+
+# Everything version_of() reads; validator lookups project just this (plus counters)
+VERSION_FIELDS = {"modified_at": 1, "updated_at": 1, "created_at": 1}
+
+
+def version_of(doc: Optional[dict]) -> str:
+    """Last change of a document; older documents fall back to their edit/creation time."""
+    if not doc:
+        return ""
+    return doc.get("modified_at") or doc.get("updated_at") or doc.get("created_at") or ""
+
+
+def latest(*versions: str) -> str:
+    """Newest of several ISO timestamps (all written as UTC, so they sort as strings)."""
+    return max((v for v in versions if v), default="")
+
+
+def make_etag(*parts) -> str:
+    """Weak ETag over whatever the representation depends on (versions, viewer, page)."""
+    digest = hashlib.blake2b(repr(parts).encode(), digest_size=12).hexdigest()
+    return f'W/"{digest}"'
+
+
+def _parse_iso(value: str) -> Optional[datetime]:
+    try:
+        parsed = datetime.fromisoformat(value)
+    except (TypeError, ValueError):
+        return None
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+
+
+def validator_headers(etag: str, last_modified: Optional[str] = None) -> dict:
+    """
+    Validators plus caching rules: responses depend on the viewer's token and
+    must be revalidated on every use.
+    """
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache", "Vary": "Authorization"}
+    modified = _parse_iso(last_modified) if last_modified else None
+    if modified:
+        headers["Last-Modified"] = format_datetime(modified.astimezone(timezone.utc), usegmt=True)
+    return headers
+
+
+def not_modified(request: Request, etag: str, last_modified: Optional[str] = None) -> Optional[Response]:
+    """
+    A 304 when the client's copy is current, else None.
+
+    If-None-Match wins when present; If-Modified-Since is only used for
+    single resources, whose last_modified covers every change to them.
+    """
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        fresh = etag_matches(if_none_match, etag)
+    else:
+        fresh = False
+        if_modified_since = request.headers.get("if-modified-since")
+        modified = _parse_iso(last_modified) if last_modified else None
+        if if_modified_since and modified:
+            try:
+                since = parsedate_to_datetime(if_modified_since)
+            except (TypeError, ValueError):
+                since = None
+            # HTTP dates have whole-second precision
+            fresh = since is not None and modified.replace(microsecond=0) <= since
+    if fresh:
+        return Response(status_code=304, headers=validator_headers(etag, last_modified))
+    return None
@@ -23,6 +23,9 @@ class Settings:
     SECRET_KEY: str = os.environ.get('SECRET_KEY', 'your-secret-key-change-in-production')
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_DAYS: int = 7
+    PASSWORD_HASH_WORKERS: int = int(os.environ.get('PASSWORD_HASH_WORKERS', 2))
+    TOKEN_CACHE_SIZE: int = int(os.environ.get('TOKEN_CACHE_SIZE', 4096))
+    TOKEN_REVOCATION_REFRESH: int = int(os.environ.get('TOKEN_REVOCATION_REFRESH', 30))  # seconds
     
     # Admin credentials (REQUIRED in .env for admin creation)
     ADMIN_EMAIL: str = os.environ.get('ADMIN_EMAIL', '')
@@ -39,6 +42,58 @@ class Settings:
     # File uploads
     MAX_FILE_SIZE: int = int(os.environ.get('MAX_FILE_SIZE', 10485760))  # 10MB
     UPLOAD_DIR: str = os.environ.get('UPLOAD_DIR', 'uploads')
+    UPLOAD_CHUNK_SIZE: int = int(os.environ.get('UPLOAD_CHUNK_SIZE', 262144))  # 256KB
+    UPLOAD_WORKERS: int = int(os.environ.get('UPLOAD_WORKERS', 4))
+    UPLOAD_TIMEOUT: int = int(os.environ.get('UPLOAD_TIMEOUT', 60))  # seconds
+    STORAGE_BACKEND: str = os.environ.get('STORAGE_BACKEND', 'cloudinary')  # cloudinary | local
+    MEDIA_BASE_URL: str = os.environ.get('MEDIA_BASE_URL', '/uploads')
+    # When set (e.g. /_media/), /uploads answers with an X-Accel-Redirect and nginx sends the bytes
+    MEDIA_ACCEL_REDIRECT_PREFIX: str = os.environ.get('MEDIA_ACCEL_REDIRECT_PREFIX', '')
+    MEDIA_MAX_AGE: int = int(os.environ.get('MEDIA_MAX_AGE', 86400))  # seconds, for files not named by hash
+    DIRECT_UPLOAD_TTL: int = int(os.environ.get('DIRECT_UPLOAD_TTL', 600))  # seconds
+    IMAGE_VARIANTS_ENABLED: bool = os.environ.get('IMAGE_VARIANTS_ENABLED', 'true').lower() == 'true'
+    IMAGE_AVIF_ENABLED: bool = os.environ.get('IMAGE_AVIF_ENABLED', 'true').lower() == 'true'
+    IMAGE_VARIANT_QUALITY: int = int(os.environ.get('IMAGE_VARIANT_QUALITY', 80))
+    IMAGE_WORKERS: int = int(os.environ.get('IMAGE_WORKERS', 2))
+    
+    # WebSockets
+    WS_SEND_QUEUE_SIZE: int = int(os.environ.get('WS_SEND_QUEUE_SIZE', 256))  # frames per socket
+    WS_PER_MESSAGE_DEFLATE: bool = os.environ.get('WS_PER_MESSAGE_DEFLATE', 'true').lower() == 'true'
+    WS_BATCH_WINDOW_MS: int = int(os.environ.get('WS_BATCH_WINDOW_MS', 5))  # 0 disables batching
+    WS_BATCH_MAX_EVENTS: int = int(os.environ.get('WS_BATCH_MAX_EVENTS', 50))
+    
+    # Admission control (per worker; the Motor pool holds 50 connections)
+    ADMISSION_ENABLED: bool = os.environ.get('ADMISSION_ENABLED', 'true').lower() == 'true'
+    ADMISSION_INITIAL_LIMIT: int = int(os.environ.get('ADMISSION_INITIAL_LIMIT', 40))  # concurrent requests
+    ADMISSION_MIN_LIMIT: int = int(os.environ.get('ADMISSION_MIN_LIMIT', 8))
+    ADMISSION_MAX_LIMIT: int = int(os.environ.get('ADMISSION_MAX_LIMIT', 200))
+    ADMISSION_QUEUE_TIMEOUT: float = float(os.environ.get('ADMISSION_QUEUE_TIMEOUT', 1))  # seconds, normal requests
+    ADMISSION_CRITICAL_QUEUE_TIMEOUT: float = float(os.environ.get('ADMISSION_CRITICAL_QUEUE_TIMEOUT', 5))  # login, messaging
+    
+    # Single-flight microcache for anonymous reads
+    MICROCACHE_TTL: float = float(os.environ.get('MICROCACHE_TTL', 2))  # seconds; 0 keeps only the coalescing
+    MICROCACHE_SIZE: int = int(os.environ.get('MICROCACHE_SIZE', 256))  # entries per worker
+    
+    # Per-user story trays; story writes, views and follows invalidate them in every worker (via tray_changes)
+    STORY_TRAY_TTL: float = float(os.environ.get('STORY_TRAY_TTL', 15))  # seconds
+    STORY_TRAY_CACHE_SIZE: int = int(os.environ.get('STORY_TRAY_CACHE_SIZE', 2048))  # users per worker
+    
+    # Response compression (br when the brotli package is installed, else gzip)
+    COMPRESSION_ENABLED: bool = os.environ.get('COMPRESSION_ENABLED', 'true').lower() == 'true'
+    COMPRESSION_MIN_SIZE: int = int(os.environ.get('COMPRESSION_MIN_SIZE', 1024))  # bytes
+    COMPRESSION_GZIP_LEVEL: int = int(os.environ.get('COMPRESSION_GZIP_LEVEL', 1))  # 1-9; higher costs CPU for little gain on JSON
+    COMPRESSION_BROTLI_QUALITY: int = int(os.environ.get('COMPRESSION_BROTLI_QUALITY', 4))  # 0-11
+    
+    # Per-request query accounting
+    QUERY_TRACKING: bool = os.environ.get('QUERY_TRACKING', 'true').lower() == 'true'
+    QUERY_BUDGET: int = int(os.environ.get('QUERY_BUDGET', 20))  # commands per request before logging
+    QUERY_CALLSITES: bool = os.environ.get('QUERY_CALLSITES', 'true').lower() == 'true'
+    QUERY_STRICT: bool = os.environ.get('QUERY_STRICT', 'false').lower() == 'true'  # tests: fail over-budget/N+1 requests
+    
+    # Analytics rollups
+    ANALYTICS_FLUSH_INTERVAL: float = float(os.environ.get('ANALYTICS_FLUSH_INTERVAL', 5))  # seconds
+    ANALYTICS_MINUTE_RETENTION: int = int(os.environ.get('ANALYTICS_MINUTE_RETENTION', 48))  # hours
+    ANALYTICS_HOUR_RETENTION: int = int(os.environ.get('ANALYTICS_HOUR_RETENTION', 90))  # days
     
     @property
     def cors_origins_list(self) -> list:
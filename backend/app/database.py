@@ -7,6 +7,7 @@ import ssl
 import logging
 from motor.motor_asyncio import AsyncIOMotorClient
 from .config import settings
+from .metrics import mongo_listener
 
 # MongoDB connection with custom SSL context for production
 if settings.ENVIRONMENT == 'production':
@@ -22,6 +23,7 @@ if settings.ENVIRONMENT == 'production':
             connectTimeoutMS=30000,
             maxPoolSize=50,
             retryWrites=True,
+            event_listeners=[mongo_listener],
         )
         logging.info("MongoDB client created with SSL context for production")
     except Exception as e:
@@ -31,6 +33,7 @@ if settings.ENVIRONMENT == 'production':
             settings.MONGO_URL,
             serverSelectionTimeoutMS=30000,
             connectTimeoutMS=30000,
+            event_listeners=[mongo_listener],
         )
 else:
     # Local development - simple connection
@@ -38,6 +41,7 @@ else:
         settings.MONGO_URL,
         serverSelectionTimeoutMS=10000,
         connectTimeoutMS=10000,
+        event_listeners=[mongo_listener],
     )
     logging.info("MongoDB client created for local development")
 
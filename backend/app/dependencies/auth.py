@@ -3,27 +3,34 @@ from typing import Optional
 import jwt
 from fastapi import Depends, HTTPException
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from ..config import settings
 from ..database import db
+from ..services import decode_access_token, revocations, analytics
 
 security = HTTPBearer()
 
 
-async def get_current_user(
-    credentials: HTTPAuthorizationCredentials = Depends(security)
-) -> str:
-    """Get the current authenticated user's ID from JWT token."""
+def _verify(token: str) -> dict:
+    """Decode a token (cached) and map JWT errors to 401s."""
     try:
-        token = credentials.credentials
-        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
-        user_id: str = payload.get("sub")
-        if user_id is None:
-            raise HTTPException(status_code=401, detail="Invalid token")
-        return user_id
+        payload = decode_access_token(token)
     except jwt.ExpiredSignatureError:
         raise HTTPException(status_code=401, detail="Token expired")
     except jwt.InvalidTokenError:
         raise HTTPException(status_code=401, detail="Invalid token")
+    if payload.get("sub") is None:
+        raise HTTPException(status_code=401, detail="Invalid token")
+    return payload
+
+
+async def get_current_user(
+    credentials: HTTPAuthorizationCredentials = Depends(security)
+) -> str:
+    """Get the current authenticated user's ID from JWT token."""
+    user_id: str = _verify(credentials.credentials)["sub"]
+    if await revocations.is_revoked(user_id):
+        raise HTTPException(status_code=401, detail="Token revoked")
+    analytics.track_active(user_id)
+    return user_id
 
 
 async def get_optional_user(
@@ -33,9 +40,10 @@ async def get_optional_user(
     if credentials is None:
         return None
     try:
-        token = credentials.credentials
-        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
-        user_id: str = payload.get("sub")
+        user_id: str = _verify(credentials.credentials)["sub"]
+        if await revocations.is_revoked(user_id):
+            return None
+        analytics.track_active(user_id)
         return user_id
     except Exception:
         return None
@@ -45,25 +53,27 @@ async def get_admin_user(
     credentials: HTTPAuthorizationCredentials = Depends(security)
 ) -> str:
     """Verify admin access - returns user_id if admin, raises 403 otherwise."""
+    payload = _verify(credentials.credentials)
+    user_id: str = payload["sub"]
     try:
-        token = credentials.credentials
-        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
-        user_id: str = payload.get("sub")
-        if user_id is None:
-            raise HTTPException(status_code=401, detail="Invalid token")
-        
-        # Check if user is admin
-        user = await db.users.find_one({"id": user_id})
+        entry = await revocations.get(user_id)
+        if entry.get("revoked"):
+            raise HTTPException(status_code=401, detail="Token revoked")
+
+        if "rv" in payload:
+            # Role claims are trusted unless the role changed after issue
+            if payload["rv"] < entry.get("role_version", 0) or not payload.get("adm"):
+                raise HTTPException(status_code=403, detail="Admin access required")
+            return user_id
+
+        # Tokens issued before role claims existed - check the user record
+        user = await db.users.find_one({"id": user_id}, {"_id": 0, "is_admin": 1})
         if not user:
             raise HTTPException(status_code=401, detail="User not found")
         if not user.get("is_admin", False):
             raise HTTPException(status_code=403, detail="Admin access required")
-        
+
         return user_id
-    except jwt.ExpiredSignatureError:
-        raise HTTPException(status_code=401, detail="Token expired")
-    except jwt.InvalidTokenError:
-        raise HTTPException(status_code=401, detail="Invalid token")
     except HTTPException:
         raise
     except Exception:
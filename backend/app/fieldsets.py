@@ -0,0 +1,54 @@
+"""
+Pinpost Sparse Fieldsets
+`?fields=a,b` and `?view=card|full` for list endpoints, turned into Mongo
+projections so unrequested fields (whole blog bodies, mostly) are never
+read, sent or serialized.
+"""
+from typing import AbstractSet, Collection, FrozenSet, Literal, Optional
+
+from fastapi import HTTPException
+
+View = Literal["card", "full"]
+
+# What a card in a list needs: no blog body
+CARD_FIELDS = {
+    "post": frozenset({
+        "id", "author_id", "author_username", "author_avatar", "content",
+        "likes_count", "comments_count", "created_at", "liked_by_user",
+    }),
+    "blog": frozenset({
+        "id", "author_id", "author_username", "author_avatar", "title", "excerpt", "cover_image",
+        "tags", "likes_count", "comments_count", "created_at", "liked_by_user",
+    }),
+}
+
+
+def select_fields(
+    allowed: Collection[str], card: AbstractSet[str], fields: Optional[str], view: View
+) -> Optional[FrozenSet[str]]:
+    """
+    Fields a list response should carry, or None for whole items.
+
+    An explicit `fields` list wins over `view`; `id` is always included.
+    """
+    if fields:
+        requested = {name.strip() for name in fields.split(",") if name.strip()}
+        unknown = requested.difference(allowed)
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(sorted(unknown))}")
+        return frozenset(requested | {"id"})
+    if view == "card":
+        return frozenset(card)
+    return None
+
+
+def wants(selected: Optional[AbstractSet[str]], name: str) -> bool:
+    """Whether a field is part of the response, e.g. to skip hydrating it."""
+    return selected is None or name in selected
+
+
+def projection(selected: Optional[AbstractSet[str]], *needed: str) -> Optional[dict]:
+    """Mongo projection for the selected fields plus those the handler itself reads."""
+    if selected is None:
+        return None
+    return {"_id": 0, **{name: 1 for name in (*selected, *needed)}}
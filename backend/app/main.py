@@ -9,7 +9,7 @@ from datetime import datetime, timezone
 from contextlib import asynccontextmanager
 
 from fastapi import FastAPI, WebSocket, WebSocketDisconnect
-from fastapi.staticfiles import StaticFiles
+from fastapi.responses import ORJSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 
 # Configure logging FIRST (before any other code runs)
@@ -21,8 +21,16 @@ logger = logging.getLogger(__name__)
 
 from .config import settings
 from .database import db, client
-from .routes import api_router
-from .services import hash_password, manager
+from .routes import api_router, media_router, metrics_router
+from .metrics import PrometheusMiddleware
+from .query_log import QueryAccountingMiddleware
+from .compression import CompressionMiddleware
+from .admission import AdmissionMiddleware
+from .services import (
+    hash_password_async, set_admin_status, manager, platform_stats, analytics, ensure_follow_edge_index
+)
+from .services.image_service import shutdown_pool
+from .services.metrics_service import start_sampler, stop_sampler
 
 
 @asynccontextmanager
@@ -33,16 +41,56 @@ async def lifespan(app: FastAPI):
         await db.command('ping')
         await db.users.create_index("email", unique=True)
         await db.users.create_index("username", unique=True)
+        await db.token_revocations.create_index("user_id", unique=True)
+        await db.media.create_index("hash", unique=True)
+        await db.upload_intents.create_index("jti", unique=True)
+        await db.upload_intents.create_index("expires_at", expireAfterSeconds=0)
+        # Lookups behind conditional GETs (and the reads they front)
+        await db.users.create_index("id", unique=True)
+        await db.short_posts.create_index("id", unique=True)
+        await db.blog_posts.create_index("id", unique=True)
+        await db.blog_posts.create_index([("author_id", 1), ("created_at", -1)])
+        await db.stories.create_index([("expires_at", 1), ("created_at", -1)])
+        # List pipelines: newest-first pages and the viewer's-like lookup
+        await db.short_posts.create_index([("author_id", 1), ("created_at", -1)])
+        await db.short_posts.create_index("created_at")
+        await db.blog_posts.create_index("created_at")
+        await db.likes.create_index([("user_id", 1), ("post_type", 1), ("post_id", 1)])
+        await db.comments.create_index([("post_id", 1), ("post_type", 1)])
+        # Story trays: followed users' active stories and the viewer's views of them
+        await db.stories.create_index([("user_id", 1), ("expires_at", 1)])
+        await db.story_views.create_index([("user_id", 1), ("story_id", 1)])
+        await db.tray_changes.create_index("expires_at", expireAfterSeconds=0)
+        await db.analytics_rollups.create_index([("granularity", 1), ("start", 1)])
+        await db.analytics_rollups.create_index("expires_at", expireAfterSeconds=0)
+        await db.analytics_active.create_index("expires_at", expireAfterSeconds=0)
         logging.info("Database connected; ensured users indexes.")
+        await platform_stats.seed()
         
         # Create admin user if not exists
         await create_admin_user()
     except Exception as e:
         logging.error(f"Startup DB initialization failed: {e}")
     
+    # On its own: follow_user's upsert is only race-free with this index, and a
+    # failed build must neither go unnoticed nor hold up the rest of startup
+    try:
+        await ensure_follow_edge_index()
+    except Exception:
+        logging.critical(
+            "Unique follows (follower_id, following_id) index is MISSING; concurrent follows can "
+            "duplicate edges and skew counters until it is built", exc_info=True
+        )
+    
+    analytics.start()
+    start_sampler()
+    
     yield
     
     # Shutdown
+    stop_sampler()
+    await analytics.stop()
+    shutdown_pool()
     client.close()
     logging.info("MongoDB client closed")
 
@@ -61,10 +109,7 @@ async def create_admin_user():
         existing_admin = await db.users.find_one({"email": settings.ADMIN_EMAIL})
         if existing_admin:
             if not existing_admin.get("is_admin"):
-                await db.users.update_one(
-                    {"email": settings.ADMIN_EMAIL},
-                    {"$set": {"is_admin": True}}
-                )
+                await set_admin_status(existing_admin["id"], True)
                 logging.info(f"Updated existing user {settings.ADMIN_EMAIL} to admin")
             else:
                 logging.info(f"Admin user {settings.ADMIN_EMAIL} already exists")
@@ -74,7 +119,7 @@ async def create_admin_user():
             "id": str(uuid.uuid4()),
             "username": settings.ADMIN_USERNAME,
             "email": settings.ADMIN_EMAIL,
-            "password_hash": hash_password(settings.ADMIN_PASSWORD),
+            "password_hash": await hash_password_async(settings.ADMIN_PASSWORD),
             "name": "Administrator",
             "bio": "Platform Administrator",
             "avatar": "",
@@ -89,6 +134,7 @@ async def create_admin_user():
         }
         
         await db.users.insert_one(admin_user)
+        await platform_stats.record(users=1)
         logging.info(f"✅ Admin user created: {settings.ADMIN_EMAIL}")
     except Exception as e:
         logging.error(f"Failed to create admin user: {e}")
@@ -99,7 +145,8 @@ app = FastAPI(
     title="Pinpost API",
     description="Social Media & Blogging Platform API",
     version="1.0.0",
-    lifespan=lifespan
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse,
 )
 
 # Include API router
@@ -117,13 +164,13 @@ async def root():
 @app.websocket("/ws/notifications/{user_id}")
 async def websocket_notifications(websocket: WebSocket, user_id: str):
     """WebSocket endpoint for real-time notifications and messaging."""
-    await manager.connect(user_id, websocket)
+    connection = await manager.connect(user_id, websocket)
     try:
         while True:
-            data = await websocket.receive_json()
+            data = await connection.receive()
             
             if data.get("type") == "ping":
-                await websocket.send_json({"type": "pong"})
+                connection.send({"type": "pong"})
             elif data.get("type") == "typing":
                 await manager.set_typing(
                     user_id,
@@ -131,19 +178,25 @@ async def websocket_notifications(websocket: WebSocket, user_id: str):
                     data.get("typing", False)
                 )
     except WebSocketDisconnect:
-        manager.disconnect(user_id)
-        await manager.broadcast({
-            "type": "user_status",
-            "user_id": user_id,
-            "online": False,
-            "last_seen": datetime.now(timezone.utc).isoformat()
-        })
-
-
-# Mount static files for uploads
-uploads_dir = Path("uploads")
+        pass
+    finally:
+        if manager.disconnect(connection):
+            await manager.broadcast({
+                "type": "user_status",
+                "user_id": user_id,
+                "online": False,
+                "last_seen": datetime.now(timezone.utc).isoformat()
+            })
+
+
+# Uploaded files (local storage backend)
+uploads_dir = Path(settings.UPLOAD_DIR)
 uploads_dir.mkdir(exist_ok=True)
-app.mount("/uploads", StaticFiles(directory="uploads"), name="uploads")
+app.include_router(media_router, tags=["Media"])
+app.include_router(metrics_router, tags=["Metrics"])
+
+# Admission control; inside CORS so 503s still carry CORS headers
+app.add_middleware(AdmissionMiddleware)
 
 # CORS middleware
 app.add_middleware(
@@ -154,7 +207,22 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Brotli/gzip for API responses (see benchmarks/bench_compression.py)
+app.add_middleware(CompressionMiddleware)
+
+# Database commands per request (Server-Timing, query budget)
+app.add_middleware(QueryAccountingMiddleware)
+
+# Outermost, so latency includes every other middleware
+app.add_middleware(PrometheusMiddleware)
+
 
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8000)
+    uvicorn.run(
+        app,
+        host="0.0.0.0",
+        port=8000,
+        ws="websockets",
+        ws_per_message_deflate=settings.WS_PER_MESSAGE_DEFLATE,
+    )
@@ -0,0 +1,178 @@
+"""
+Pinpost Prometheus Metrics
+Metric definitions, HTTP middleware and the MongoDB command listener.
+Kept free of service imports so database.py can register the listener.
+"""
+import os
+import time
+from typing import Tuple
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST, CollectorRegistry, Counter, Gauge, Histogram,
+    generate_latest, multiprocess,
+)
+from pymongo import monitoring
+
+from .query_log import current_log
+
+# Under gunicorn every worker writes to PROMETHEUS_MULTIPROC_DIR and a scrape
+# aggregates them; gauges say how their per-worker values combine.
+MULTIPROCESS = bool(os.environ.get("PROMETHEUS_MULTIPROC_DIR"))
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+MONGO_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 5.0)
+
+HTTP_REQUEST_DURATION = Histogram(
+    "pinpost_http_request_duration_seconds",
+    "HTTP request latency by route template and status",
+    ["method", "route", "status"],
+    buckets=LATENCY_BUCKETS,
+)
+HTTP_REQUESTS_IN_PROGRESS = Gauge(
+    "pinpost_http_requests_in_progress",
+    "HTTP requests currently being handled",
+    ["method"],
+    multiprocess_mode="livesum",
+)
+MONGO_COMMAND_DURATION = Histogram(
+    "pinpost_mongo_command_duration_seconds",
+    "MongoDB command latency by collection and operation",
+    ["collection", "operation"],
+    buckets=MONGO_BUCKETS,
+)
+MONGO_COMMAND_FAILURES = Counter(
+    "pinpost_mongo_command_failures",
+    "MongoDB commands that returned an error",
+    ["collection", "operation"],
+)
+WEBSOCKET_CONNECTIONS = Gauge(
+    "pinpost_websocket_connections",
+    "Open WebSocket connections",
+    multiprocess_mode="livesum",
+)
+WEBSOCKET_USERS = Gauge(
+    "pinpost_websocket_users",
+    "Users with at least one open WebSocket",
+    multiprocess_mode="livesum",
+)
+QUEUE_DEPTH = Gauge(
+    "pinpost_queue_depth",
+    "Items waiting in an in-process queue",
+    ["queue"],
+    multiprocess_mode="livesum",
+)
+ADMISSION_LIMIT = Gauge(
+    "pinpost_admission_limit",
+    "Adaptive concurrency limit (summed over workers)",
+    multiprocess_mode="livesum",
+)
+ADMISSION_REJECTED = Counter(
+    "pinpost_admission_rejected",
+    "Requests shed with a 503 by admission control",
+    ["priority"],
+)
+CACHE_HITS = Gauge(
+    "pinpost_cache_hits",
+    "Cache hits since start (rate() over hits and misses gives the hit rate)",
+    ["cache"],
+    multiprocess_mode="livesum",
+)
+CACHE_MISSES = Gauge(
+    "pinpost_cache_misses",
+    "Cache misses since start",
+    ["cache"],
+    multiprocess_mode="livesum",
+)
+CACHE_ENTRIES = Gauge(
+    "pinpost_cache_entries",
+    "Entries currently held by a cache",
+    ["cache"],
+    multiprocess_mode="livesum",
+)
+
+
+class PrometheusMiddleware:
+    """Times every HTTP request, labelled by the matched route template."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        status = 500
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        in_progress = HTTP_REQUESTS_IN_PROGRESS.labels(method)
+        in_progress.inc()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            in_progress.dec()
+            # The router stores the matched route in the scope; templates keep label cardinality bounded
+            route = getattr(scope.get("route"), "path", None) or "unmatched"
+            HTTP_REQUEST_DURATION.labels(method, route, str(status)).observe(time.perf_counter() - start)
+
+
+def command_collection(command_name: str, command) -> str:
+    """Collection a command targets, or "" for database/admin commands."""
+    target = command.get(command_name)
+    if isinstance(target, str):
+        return target
+    return command.get("collection", "")
+
+
+class MongoCommandListener(monitoring.CommandListener):
+    """
+    Records command latency, globally and for the current request's query
+    log. Callbacks run on the driver's threads, which carry the request's
+    context.
+    """
+
+    def __init__(self):
+        self._started = {}
+
+    def started(self, event):
+        key = (event.connection_id, event.request_id)
+        collection = command_collection(event.command_name, event.command)
+        self._started[key] = collection
+        log = current_log()
+        if log is not None:
+            log.started(key, event.command_name, collection)
+
+    def succeeded(self, event):
+        self._finish(event, failed=False)
+
+    def failed(self, event):
+        self._finish(event, failed=True)
+
+    def _finish(self, event, failed: bool):
+        key = (event.connection_id, event.request_id)
+        collection = self._started.pop(key, "") or "-"
+        log = current_log()
+        if log is not None:
+            log.finished(key, event.duration_micros / 1e6)
+        MONGO_COMMAND_DURATION.labels(collection, event.command_name).observe(event.duration_micros / 1e6)
+        if failed:
+            MONGO_COMMAND_FAILURES.labels(collection, event.command_name).inc()
+
+
+mongo_listener = MongoCommandListener()
+
+
+def render_latest() -> Tuple[bytes, str]:
+    """Exposition text for every metric, merged across workers in multiprocess mode."""
+    if MULTIPROCESS:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry), CONTENT_TYPE_LATEST
+    return generate_latest(), CONTENT_TYPE_LATEST
@@ -6,6 +6,8 @@ from .comment import Comment, CommentCreate
 from .notification import Notification
 from .message import Message, MessageCreate, Conversation, ParticipantDetail
 from .story import Story, StoryCreate
+from .upload import DirectUploadRequest, DirectUploadComplete
+from .moderation import BulkModeration
 
 __all__ = [
     "User", "UserCreate", "UserLogin", "UserUpdate", "ProfileSetup",
@@ -15,4 +17,6 @@ __all__ = [
     "Notification",
     "Message", "MessageCreate", "Conversation", "ParticipantDetail",
     "Story", "StoryCreate",
+    "DirectUploadRequest", "DirectUploadComplete",
+    "BulkModeration",
 ]
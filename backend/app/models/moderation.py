@@ -0,0 +1,13 @@
+"""Bulk moderation models."""
+from datetime import datetime
+from typing import List, Optional
+from pydantic import BaseModel, Field
+
+
+class BulkModeration(BaseModel):
+    """Items to act on: explicit ids, a filter, or both (the filter narrows the ids)."""
+    ids: List[str] = Field(default_factory=list, max_length=10000)
+    author_id: Optional[str] = None
+    created_after: Optional[datetime] = None
+    created_before: Optional[datetime] = None
+    dry_run: bool = False
@@ -0,0 +1,22 @@
+"""Direct upload models."""
+from typing import Union
+from pydantic import BaseModel
+
+
+class DirectUploadRequest(BaseModel):
+    """Schema for requesting signed direct-upload parameters."""
+    upload_type: str = "profile"
+    media: str = "image"
+
+
+class DirectUploadComplete(BaseModel):
+    """
+    Storage response forwarded by the client after a direct upload.
+
+    Only the signed fields are read; etag, format and size are fetched
+    from storage rather than taken from the client.
+    """
+    intent: str
+    public_id: str
+    version: Union[int, str]
+    signature: str
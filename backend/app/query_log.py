@@ -0,0 +1,180 @@
+"""
+Pinpost Query Accounting
+Counts and times every MongoDB command issued while handling a request,
+reports them in a Server-Timing header and flags handlers whose query
+count is over budget or grows with the page size (N+1 patterns).
+"""
+import asyncio
+import contextvars
+import json
+import logging
+import os
+import time
+from collections import Counter
+from typing import Dict, List, Optional
+from urllib.parse import parse_qs
+
+from .config import settings
+
+_APP_DIR = os.path.dirname(os.path.abspath(__file__))
+# Frames from these modules are plumbing, not the code that issued the query
+_SKIP_FILES = {os.path.join(_APP_DIR, name) for name in ("database.py", "metrics.py", "query_log.py")}
+
+
+class QueryLog:
+    """Commands issued on behalf of one request."""
+
+    def __init__(self, task: Optional[asyncio.Task]):
+        self.task = task
+        self.count = 0
+        self.duration = 0.0
+        self.sites: Counter = Counter()
+        self.site_durations: Dict[str, float] = {}
+        self._started: Dict[tuple, str] = {}
+
+    def started(self, key: tuple, operation: str, collection: str):
+        self.count += 1
+        self._started[key] = f"{operation} {collection}".strip()
+
+    def finished(self, key: tuple, seconds: float):
+        self.duration += seconds
+        command = self._started.pop(key, None)
+        if command is None:
+            return
+        # By the time a reply arrives the issuing coroutine is parked on the driver call
+        site = f"{call_site(self.task)} {command}".strip()
+        self.sites[site] += 1
+        self.site_durations[site] = self.site_durations.get(site, 0.0) + seconds
+
+    def top_sites(self, n: int = 5) -> List[str]:
+        return [
+            f"{site} x{count} ({self.site_durations.get(site, 0.0) * 1000:.1f}ms)"
+            for site, count in self.sites.most_common(n)
+        ]
+
+
+_current: contextvars.ContextVar[Optional[QueryLog]] = contextvars.ContextVar("query_log", default=None)
+
+
+def current_log() -> Optional[QueryLog]:
+    """The log of the request being handled; the driver copies context into its threads."""
+    return _current.get()
+
+
+def _await_chain(coro):
+    """Frames of a suspended coroutine and everything it is awaiting, outermost first."""
+    while coro is not None:
+        frame = getattr(coro, "cr_frame", None) or getattr(coro, "gi_frame", None)
+        if frame is not None:
+            yield frame
+        coro = getattr(coro, "cr_await", None) or getattr(coro, "gi_yieldfrom", None)
+
+
+def call_site(task: Optional[asyncio.Task]) -> str:
+    """
+    Innermost app frame of the request's task, e.g. "routes/feed.py:42 get_feed".
+
+    Listener callbacks run on driver threads, so the request's stack is read
+    from its suspended coroutine rather than the current thread.
+    """
+    if task is None or not settings.QUERY_CALLSITES:
+        return ""
+    site = ""
+    try:
+        for frame in _await_chain(task.get_coro()):
+            filename = frame.f_code.co_filename
+            if filename.startswith(_APP_DIR) and filename not in _SKIP_FILES:
+                site = f"{os.path.relpath(filename, _APP_DIR)}:{frame.f_lineno} {frame.f_code.co_name}"
+    except Exception:
+        pass
+    return site
+
+
+# route -> {limit: fewest queries seen}, for strict mode
+_scaling: Dict[str, Dict[int, int]] = {}
+
+
+def _scaling_violation(route: str, query_string: bytes, count: int) -> Optional[str]:
+    """Whether this route issued more queries for a larger ?limit= than for a smaller one."""
+    values = parse_qs(query_string.decode("latin-1")).get("limit")
+    if not values or not values[0].isdigit():
+        return None
+    limit = int(values[0])
+    seen = _scaling.setdefault(route, {})
+    seen[limit] = min(count, seen.get(limit, count))
+    for other_limit, other_count in seen.items():
+        if other_limit < limit and other_count < count:
+            return (
+                f"{route} issued {count} queries for limit={limit} "
+                f"but {other_count} for limit={other_limit}"
+            )
+    return None
+
+
+class QueryAccountingMiddleware:
+    """
+    Tracks database commands per request.
+
+    Adds `Server-Timing: db;dur=..;desc="N queries", app;dur=..` and logs
+    requests over QUERY_BUDGET with their busiest call sites. With
+    QUERY_STRICT (meant for tests), such requests - and list endpoints whose
+    query count grows with `limit` - fail with a 500 describing the problem.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not settings.QUERY_TRACKING:
+            await self.app(scope, receive, send)
+            return
+
+        log = QueryLog(asyncio.current_task())
+        token = _current.set(log)
+        start = time.perf_counter()
+        problem = None
+
+        async def send_wrapper(message):
+            nonlocal problem
+            if message["type"] == "http.response.start":
+                route = getattr(scope.get("route"), "path", None) or scope["path"]
+                problem = self._check(scope, route, log)
+                if problem and settings.QUERY_STRICT:
+                    body = json.dumps({"detail": problem, "call_sites": log.top_sites()}).encode()
+                    await send({
+                        "type": "http.response.start",
+                        "status": 500,
+                        "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())],
+                    })
+                    await send({"type": "http.response.body", "body": body})
+                    return
+                headers = list(message.get("headers", []))
+                headers.append((b"server-timing", self._server_timing(log, start).encode()))
+                message = {**message, "headers": headers}
+            elif problem and settings.QUERY_STRICT:
+                return
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _current.reset(token)
+
+    @staticmethod
+    def _server_timing(log: QueryLog, start: float) -> str:
+        elapsed = (time.perf_counter() - start) * 1000
+        return f'db;dur={log.duration * 1000:.1f};desc="{log.count} queries", app;dur={elapsed:.1f}'
+
+    @staticmethod
+    def _check(scope, route: str, log: QueryLog) -> Optional[str]:
+        problem = None
+        if log.count > settings.QUERY_BUDGET:
+            problem = f"{route} issued {log.count} queries (budget {settings.QUERY_BUDGET})"
+        if settings.QUERY_STRICT:
+            problem = _scaling_violation(route, scope.get("query_string", b""), log.count) or problem
+        if problem:
+            logging.warning(
+                f"{scope['method']} {problem}, {log.duration * 1000:.1f}ms in db; "
+                f"call sites: {'; '.join(log.top_sites())}"
+            )
+        return problem
@@ -7,10 +7,12 @@ api_router = APIRouter(prefix="/api")
 # Import all route modules
 from . import auth, users, posts, blogs, comments, likes
 from . import notifications, messages, stories, feed, admin, upload, health
+from . import media, metrics, profiles
 
 # Include all routers
 api_router.include_router(auth.router, tags=["Authentication"])
 api_router.include_router(users.router, tags=["Users"])
+api_router.include_router(profiles.router, tags=["Profiles"])
 api_router.include_router(posts.router, tags=["Posts"])
 api_router.include_router(blogs.router, tags=["Blogs"])
 api_router.include_router(comments.router, tags=["Comments"])
@@ -22,3 +24,7 @@ api_router.include_router(feed.router, tags=["Feed"])
 api_router.include_router(admin.router, tags=["Admin"])
 api_router.include_router(upload.router, tags=["Upload"])
 api_router.include_router(health.router, tags=["Health"])
+
+# Served outside /api, at the URLs the local storage backend hands out
+media_router = media.router
+metrics_router = metrics.router
@@ -1,34 +1,76 @@
 """Admin routes - admin-only endpoints for platform management."""
 from datetime import datetime, timezone
-from fastapi import APIRouter, HTTPException, Depends
+from typing import Optional
+from fastapi import APIRouter, HTTPException, Depends, Query
 
 from ..database import db
 from ..dependencies import get_admin_user
+from ..models import BulkModeration
+from ..services import revocations, set_admin_status, platform_stats, analytics
+from ..services.moderation_service import TARGETS, bulk_delete
+from ..services.analytics_service import METRICS, GRANULARITIES, DAILY_ONLY
 
 router = APIRouter()
 
 
 @router.get("/admin/stats")
 async def get_admin_stats(admin_id: str = Depends(get_admin_user)):
-    """Get platform statistics."""
-    users_count = await db.users.count_documents({})
-    posts_count = await db.short_posts.count_documents({})
-    blogs_count = await db.blog_posts.count_documents({})
-    comments_count = await db.comments.count_documents({})
-    
-    today = datetime.now(timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0)
-    new_users_today = await db.users.count_documents({"created_at": {"$gte": today.isoformat()}})
+    """Get platform statistics from the maintained counters."""
+    totals = await platform_stats.totals()
+    new_users_today = await analytics.count("signups", "day")
     
     return {
-        "total_users": users_count,
-        "total_posts": posts_count,
-        "total_blogs": blogs_count,
-        "total_comments": comments_count,
+        "total_users": totals["users"],
+        "total_posts": totals["posts"],
+        "total_blogs": totals["blogs"],
+        "total_comments": totals["comments"],
         "new_users_today": new_users_today,
         "timestamp": datetime.now(timezone.utc).isoformat()
     }
 
 
+# Most buckets a single analytics query may return
+MAX_ANALYTICS_POINTS = 1500
+
+
+def _as_utc(value: datetime) -> datetime:
+    return value.replace(tzinfo=timezone.utc) if value.tzinfo is None else value.astimezone(timezone.utc)
+
+
+@router.get("/admin/analytics")
+async def get_analytics(
+    metric: str,
+    granularity: str = "hour",
+    start: Optional[datetime] = Query(None, alias="from"),
+    end: Optional[datetime] = Query(None, alias="to"),
+    admin_id: str = Depends(get_admin_user)
+):
+    """Time series for one activity metric from the rollup buckets."""
+    if metric not in METRICS:
+        raise HTTPException(status_code=400, detail=f"Unknown metric, expected one of: {', '.join(METRICS)}")
+    if granularity not in GRANULARITIES:
+        raise HTTPException(status_code=400, detail=f"Unknown granularity, expected one of: {', '.join(GRANULARITIES)}")
+    if metric in DAILY_ONLY and granularity != "day":
+        raise HTTPException(status_code=400, detail=f"{metric} is only available per day")
+
+    end = _as_utc(end) if end else datetime.now(timezone.utc)
+    start = _as_utc(start) if start else end - GRANULARITIES[granularity] * 24
+    if start >= end:
+        raise HTTPException(status_code=400, detail="'from' must be before 'to'")
+    if (end - start) / GRANULARITIES[granularity] > MAX_ANALYTICS_POINTS:
+        raise HTTPException(status_code=400, detail="Range too large for this granularity")
+
+    points = await analytics.series(metric, start, end, granularity)
+    return {
+        "metric": metric,
+        "granularity": granularity,
+        "from": start.isoformat(),
+        "to": end.isoformat(),
+        "total": sum(p["value"] for p in points),
+        "points": points,
+    }
+
+
 @router.get("/admin/users")
 async def get_all_users(skip: int = 0, limit: int = 50, admin_id: str = Depends(get_admin_user)):
     """Get all users."""
@@ -40,7 +82,8 @@ async def get_all_users(skip: int = 0, limit: int = 50, admin_id: str = Depends(
         user.pop("_id", None)
         result.append(user)
     
-    total = await db.users.count_documents({})
+    # Pagination only needs an approximate total; this reads collection metadata
+    total = await db.users.estimated_document_count()
     return {"users": result, "total": total, "skip": skip, "limit": limit}
 
 
@@ -55,14 +98,21 @@ async def delete_user_admin(user_id: str, admin_id: str = Depends(get_admin_user
         raise HTTPException(status_code=404, detail="User not found")
     
     # Delete all user content
-    await db.short_posts.delete_many({"author_id": user_id})
-    await db.blog_posts.delete_many({"author_id": user_id})
-    await db.comments.delete_many({"user_id": user_id})
+    posts = await db.short_posts.delete_many({"author_id": user_id})
+    blogs = await db.blog_posts.delete_many({"author_id": user_id})
+    comments = await db.comments.delete_many({"user_id": user_id})
     await db.likes.delete_many({"user_id": user_id})
     await db.follows.delete_many({"$or": [{"follower_id": user_id}, {"following_id": user_id}]})
     await db.notifications.delete_many({"$or": [{"user_id": user_id}, {"actor_id": user_id}]})
     await db.stories.delete_many({"user_id": user_id})
-    await db.users.delete_one({"id": user_id})
+    deleted = await db.users.delete_one({"id": user_id})
+    await revocations.record(user_id, revoked=True)
+    await platform_stats.record(
+        users=-deleted.deleted_count,
+        posts=-posts.deleted_count,
+        blogs=-blogs.deleted_count,
+        comments=-comments.deleted_count,
+    )
     
     return {"message": f"User {user['username']} deleted"}
 
@@ -78,7 +128,7 @@ async def toggle_user_admin(user_id: str, admin_id: str = Depends(get_admin_user
         raise HTTPException(status_code=404, detail="User not found")
     
     new_status = not user.get("is_admin", False)
-    await db.users.update_one({"id": user_id}, {"$set": {"is_admin": new_status}})
+    await set_admin_status(user_id, new_status)
     
     return {"message": f"Admin status set to {new_status}", "is_admin": new_status}
 
@@ -90,9 +140,10 @@ async def delete_post_admin(post_id: str, admin_id: str = Depends(get_admin_user
     if not post:
         raise HTTPException(status_code=404, detail="Post not found")
     
-    await db.short_posts.delete_one({"id": post_id})
+    deleted = await db.short_posts.delete_one({"id": post_id})
     await db.likes.delete_many({"post_id": post_id, "post_type": "post"})
-    await db.comments.delete_many({"post_id": post_id, "post_type": "post"})
+    comments = await db.comments.delete_many({"post_id": post_id, "post_type": "post"})
+    await platform_stats.record(posts=-deleted.deleted_count, comments=-comments.deleted_count)
     
     return {"message": "Post deleted by admin"}
 
@@ -104,13 +155,37 @@ async def delete_blog_admin(blog_id: str, admin_id: str = Depends(get_admin_user
     if not blog:
         raise HTTPException(status_code=404, detail="Blog not found")
     
-    await db.blog_posts.delete_one({"id": blog_id})
+    deleted = await db.blog_posts.delete_one({"id": blog_id})
     await db.likes.delete_many({"post_id": blog_id, "post_type": "blog"})
-    await db.comments.delete_many({"post_id": blog_id, "post_type": "blog"})
+    comments = await db.comments.delete_many({"post_id": blog_id, "post_type": "blog"})
+    await platform_stats.record(blogs=-deleted.deleted_count, comments=-comments.deleted_count)
     
     return {"message": "Blog deleted by admin"}
 
 
+@router.post("/admin/moderation/{target}/delete")
+async def bulk_delete_admin(target: str, request: BulkModeration, admin_id: str = Depends(get_admin_user)):
+    """
+    Delete posts, blogs, comments or users in bulk, with their likes,
+    comments and other dependent data. Items are selected by ids and/or
+    author and created_at range; dry_run reports matches without deleting.
+    """
+    if target not in TARGETS:
+        raise HTTPException(status_code=404, detail=f"Unknown target, expected one of: {', '.join(TARGETS)}")
+    if not (request.ids or request.author_id or request.created_after or request.created_before):
+        raise HTTPException(status_code=400, detail="Provide ids or a filter")
+
+    return await bulk_delete(
+        target,
+        admin_id,
+        request.ids,
+        author_id=request.author_id,
+        created_after=request.created_after,
+        created_before=request.created_before,
+        dry_run=request.dry_run,
+    )
+
+
 @router.get("/admin/check")
 async def check_admin_status(admin_id: str = Depends(get_admin_user)):
     """Check if current user is admin."""
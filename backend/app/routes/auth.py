@@ -7,8 +7,9 @@ from pymongo.errors import DuplicateKeyError, PyMongoError
 
 from ..database import db
 from ..models import User, UserCreate, UserLogin, ProfileSetup
-from ..services import hash_password, verify_password, create_access_token
+from ..services import hash_password_async, verify_password_async, create_access_token, token_claims, platform_stats
 from ..dependencies import get_current_user
+from ..conditional import touched
 
 router = APIRouter()
 
@@ -32,7 +33,7 @@ async def register(user_data: UserCreate):
             "id": user_id,
             "username": user_data.username,
             "email": user_data.email,
-            "password_hash": hash_password(user_data.password),
+            "password_hash": await hash_password_async(user_data.password),
             "name": "",
             "bio": user_data.bio,
             "avatar": "",
@@ -47,7 +48,8 @@ async def register(user_data: UserCreate):
         }
         
         await db.users.insert_one(user)
-        token = create_access_token({"sub": user_id})
+        await platform_stats.record(users=1)
+        token = create_access_token(token_claims(user))
         
         user.pop("password_hash", None)
         logging.info(f"Registration successful for user: {user_data.username}")
@@ -69,10 +71,10 @@ async def register(user_data: UserCreate):
 async def login(credentials: UserLogin):
     """Login user and return token."""
     user = await db.users.find_one({"email": credentials.email})
-    if not user or not verify_password(credentials.password, user["password_hash"]):
+    if not user or not await verify_password_async(credentials.password, user["password_hash"]):
         raise HTTPException(status_code=401, detail="Invalid credentials")
     
-    token = create_access_token({"sub": user["id"]})
+    token = create_access_token(token_claims(user))
     user.pop("password_hash", None)
     return {"token": token, "user": User(**user)}
 
@@ -97,7 +99,8 @@ async def setup_profile(profile_data: ProfileSetup, user_id: str = Depends(get_c
         "cover_photo": profile_data.cover_photo or "",
         "date_of_birth": profile_data.date_of_birth or "",
         "location": profile_data.location or "",
-        "profile_completed": True
+        "profile_completed": True,
+        **touched(),
     }
     
     await db.users.update_one({"id": user_id}, {"$set": update_data})
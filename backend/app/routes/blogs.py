@@ -1,12 +1,18 @@
 """Blog routes - CRUD for blog posts."""
 from typing import Optional, List
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Request, Query
+from fastapi.responses import ORJSONResponse
 import uuid
 from datetime import datetime, timezone
 
 from ..database import db
 from ..models import BlogPost, BlogPostCreate, BlogPostUpdate
 from ..dependencies import get_current_user, get_optional_user
+from ..services import platform_stats, anonymous_reads
+from ..services.pipelines import content_page
+from ..serialization import trusted
+from ..fieldsets import CARD_FIELDS, View, select_fields
+from ..conditional import VERSION_FIELDS, make_etag, not_modified, validator_headers, version_of
 
 router = APIRouter()
 
@@ -35,43 +41,54 @@ async def create_blog(blog_data: BlogPostCreate, user_id: str = Depends(get_curr
         "updated_at": now
     }
     await db.blog_posts.insert_one(blog)
+    await platform_stats.record(blogs=1)
     return BlogPost(**blog)
 
 
 @router.get("/blogs", response_model=List[BlogPost])
-async def get_blogs(skip: int = 0, limit: int = 20, current_user_id: Optional[str] = Depends(get_optional_user)):
-    """Get all blogs with pagination."""
-    blogs = await db.blog_posts.find().sort("created_at", -1).skip(skip).limit(limit).to_list(limit)
+async def get_blogs(
+    skip: int = Query(0, ge=0),
+    limit: int = Query(20, ge=1, le=100),
+    fields: Optional[str] = None,
+    view: View = "full",
+    current_user_id: Optional[str] = Depends(get_optional_user)
+):
+    """Get all blogs with pagination; `view=card` leaves out the body."""
+    selected = select_fields(BlogPost.model_fields, CARD_FIELDS["blog"], fields, view)
+    if current_user_id is None:
+        # The same page for every anonymous caller: computed once, shared and cached briefly
+        return await anonymous_reads.response(
+            ("blogs", skip, limit, selected), lambda: content_page("blog", {}, skip, limit, selected, None)
+        )
     
-    result = []
-    for blog in blogs:
-        author = await db.users.find_one({"id": blog["author_id"]})
-        blog_data = BlogPost(**blog).dict()
-        if author:
-            blog_data["author_name"] = author.get("name", "")
-            blog_data["author_avatar"] = author.get("avatar", "")
-        
-        if current_user_id:
-            liked = await db.likes.find_one({"user_id": current_user_id, "post_id": blog["id"], "post_type": "blog"})
-            blog_data["liked_by_user"] = bool(liked)
-        result.append(blog_data)
-    
-    return result
+    # Already shaped like the response model; skip its second validation pass
+    return ORJSONResponse(await content_page("blog", {}, skip, limit, selected, current_user_id))
 
 
 @router.get("/blogs/{blog_id}", response_model=BlogPost)
-async def get_blog(blog_id: str, current_user_id: Optional[str] = Depends(get_optional_user)):
+async def get_blog(blog_id: str, request: Request, current_user_id: Optional[str] = Depends(get_optional_user)):
     """Get a single blog by ID."""
+    versions = await db.blog_posts.find_one(
+        {"id": blog_id}, {"_id": 0, **VERSION_FIELDS, "likes_count": 1, "comments_count": 1}
+    )
+    if not versions:
+        raise HTTPException(status_code=404, detail="Blog not found")
+    last_modified = version_of(versions)
+    etag = make_etag(blog_id, last_modified, versions.get("likes_count"), versions.get("comments_count"), current_user_id)
+    cached = not_modified(request, etag, last_modified)
+    if cached:
+        return cached
+    
     blog = await db.blog_posts.find_one({"id": blog_id})
     if not blog:
         raise HTTPException(status_code=404, detail="Blog not found")
     
-    blog_data = BlogPost(**blog).dict()
+    blog_data = trusted(BlogPost, blog)
     if current_user_id:
         liked = await db.likes.find_one({"user_id": current_user_id, "post_id": blog["id"], "post_type": "blog"})
         blog_data["liked_by_user"] = bool(liked)
     
-    return blog_data
+    return ORJSONResponse(blog_data, headers=validator_headers(etag, last_modified))
 
 
 @router.put("/blogs/{blog_id}", response_model=BlogPost)
@@ -85,6 +102,7 @@ async def update_blog(blog_id: str, blog_data: BlogPostUpdate, user_id: str = De
     
     update_data = {k: v for k, v in blog_data.dict().items() if v is not None}
     update_data["updated_at"] = datetime.now(timezone.utc).isoformat()
+    update_data["modified_at"] = update_data["updated_at"]
     
     await db.blog_posts.update_one({"id": blog_id}, {"$set": update_data})
     updated_blog = await db.blog_posts.find_one({"id": blog_id})
@@ -100,32 +118,57 @@ async def delete_blog(blog_id: str, user_id: str = Depends(get_current_user)):
     if blog["author_id"] != user_id:
         raise HTTPException(status_code=403, detail="Not authorized")
     
-    await db.blog_posts.delete_one({"id": blog_id})
+    deleted = await db.blog_posts.delete_one({"id": blog_id})
     await db.likes.delete_many({"post_id": blog_id, "post_type": "blog"})
-    await db.comments.delete_many({"post_id": blog_id, "post_type": "blog"})
+    comments = await db.comments.delete_many({"post_id": blog_id, "post_type": "blog"})
+    await platform_stats.record(blogs=-deleted.deleted_count, comments=-comments.deleted_count)
     return {"message": "Blog deleted successfully"}
 
 
 @router.get("/users/{username}/blogs", response_model=List[BlogPost])
-async def get_user_blogs(username: str, skip: int = 0, limit: int = 20, current_user_id: Optional[str] = Depends(get_optional_user)):
-    """Get blogs by a specific user."""
+async def get_user_blogs(
+    username: str,
+    request: Request,
+    skip: int = Query(0, ge=0),
+    limit: int = Query(20, ge=1, le=100),
+    fields: Optional[str] = None,
+    view: View = "full",
+    current_user_id: Optional[str] = Depends(get_optional_user)
+):
+    """Get blogs by a specific user; `view=card` leaves out the body."""
+    selected = select_fields(BlogPost.model_fields, CARD_FIELDS["blog"], fields, view)
+    # The author and the versions of the requested page in one round trip
+    versions = await db.users.aggregate([
+        {"$match": {"username": username}},
+        {"$lookup": {
+            "from": "blog_posts",
+            "let": {"author_id": "$id"},
+            "pipeline": [
+                {"$match": {"$expr": {"$eq": ["$author_id", "$$author_id"]}}},
+                {"$sort": {"created_at": -1}},
+                {"$skip": skip},
+                {"$limit": limit},
+                {"$project": {"_id": 0, "id": 1, **VERSION_FIELDS, "likes_count": 1, "comments_count": 1}},
+            ],
+            "as": "blogs",
+        }},
+        {"$project": {"_id": 0, **VERSION_FIELDS, "blogs": 1}},
+    ]).to_list(1)
+    if not versions:
+        raise HTTPException(status_code=404, detail="User not found")
+    # A list can shrink without any remaining item changing, so the ETag covers
+    # page membership and there is no Last-Modified
+    etag = make_etag(
+        username, skip, limit, sorted(selected or ()), current_user_id, version_of(versions[0]),
+        [(b["id"], version_of(b), b.get("likes_count"), b.get("comments_count")) for b in versions[0]["blogs"]],
+    )
+    cached = not_modified(request, etag)
+    if cached:
+        return cached
+    
     user = await db.users.find_one({"username": username})
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     
-    blogs = await db.blog_posts.find({"author_id": user["id"]}).sort("created_at", -1).skip(skip).limit(limit).to_list(limit)
-    
-    result = []
-    for blog in blogs:
-        author = await db.users.find_one({"id": blog["author_id"]})
-        blog_data = BlogPost(**blog).dict()
-        if author:
-            blog_data["author_name"] = author.get("name", "")
-            blog_data["author_avatar"] = author.get("avatar", "")
-        
-        if current_user_id:
-            liked = await db.likes.find_one({"user_id": current_user_id, "post_id": blog["id"], "post_type": "blog"})
-            blog_data["liked_by_user"] = bool(liked)
-        result.append(blog_data)
-    
-    return result
+    result = await content_page("blog", {"author_id": user["id"]}, skip, limit, selected, current_user_id)
+    return ORJSONResponse(result, headers=validator_headers(etag))
@@ -1,13 +1,16 @@
 """Comment routes - CRUD for comments."""
 from typing import List
 from fastapi import APIRouter, HTTPException, Depends
+from fastapi.responses import ORJSONResponse
 import uuid
 from datetime import datetime, timezone
 
 from ..database import db
 from ..models import Comment, CommentCreate
 from ..dependencies import get_current_user
-from ..services import create_notification
+from ..services import create_notification, platform_stats
+from ..services.pipelines import comment_page
+from ..conditional import touched
 
 router = APIRouter()
 
@@ -46,10 +49,11 @@ async def create_comment(
         "created_at": datetime.now(timezone.utc).isoformat()
     }
     await db.comments.insert_one(comment)
+    await platform_stats.record(comments=1)
     
     # Update comment count
     collection = db.short_posts if post_type == "post" else db.blog_posts
-    await collection.update_one({"id": post_id}, {"$inc": {"comments_count": 1}})
+    await collection.update_one({"id": post_id}, {"$inc": {"comments_count": 1}, "$set": touched()})
     
     # Create notification for post author (if not self-comment)
     if post["author_id"] != user_id:
@@ -71,8 +75,8 @@ async def create_comment(
 @router.get("/{post_type}/{post_id}/comments", response_model=List[Comment])
 async def get_comments(post_type: str, post_id: str):
     """Get all comments for a post or blog."""
-    comments = await db.comments.find({"post_id": post_id, "post_type": post_type}).to_list(100)
-    return [Comment(**c) for c in comments]
+    # Commenters' current names and avatars, joined server-side
+    return ORJSONResponse(await comment_page(post_type, post_id))
 
 
 @router.delete("/comments/{comment_id}")
@@ -84,11 +88,12 @@ async def delete_comment(comment_id: str, user_id: str = Depends(get_current_use
     if comment["user_id"] != user_id:
         raise HTTPException(status_code=403, detail="Not authorized")
     
-    await db.comments.delete_one({"id": comment_id})
+    deleted = await db.comments.delete_one({"id": comment_id})
+    await platform_stats.record(comments=-deleted.deleted_count)
     
     # Update comment count
     collection = db.short_posts if comment["post_type"] == "post" else db.blog_posts
-    await collection.update_one({"id": comment["post_id"]}, {"$inc": {"comments_count": -1}})
+    await collection.update_one({"id": comment["post_id"]}, {"$inc": {"comments_count": -1}, "$set": touched()})
     
     return {"message": "Comment deleted successfully"}
 
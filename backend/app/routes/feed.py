@@ -1,21 +1,61 @@
 """Feed route - combined posts and blogs feed."""
-from typing import Optional
-from fastapi import APIRouter, Depends
+from typing import List, Optional
+from fastapi import APIRouter, Depends, Query
+from fastapi.responses import ORJSONResponse
 
 from ..database import db
 from ..dependencies import get_optional_user
+from ..services import anonymous_reads
+from ..services.pipelines import feed_page
+from ..fieldsets import CARD_FIELDS, View, select_fields
 
 router = APIRouter()
 
+# Keys a feed item can carry (blogs add title/excerpt/cover_image/tags)
+FEED_FIELDS = (
+    "type", "id", "author_id", "author_username", "author_avatar", "author_name",
+    "content", "title", "excerpt", "cover_image", "tags",
+    "likes_count", "comments_count", "created_at", "liked_by_user",
+)
+
 
 @router.get("/feed")
 async def get_feed(
-    skip: int = 0,
-    limit: int = 20,
+    skip: int = Query(0, ge=0),
+    limit: int = Query(20, ge=1, le=100),
     following_only: bool = False,
+    fields: Optional[str] = None,
+    view: View = "full",
     current_user_id: Optional[str] = Depends(get_optional_user)
 ):
-    """Get combined feed of posts and blogs."""
+    """
+    Get combined feed of posts and blogs.
+    
+    `fields`/`view=card` trim items (cards leave out blog bodies); `type`,
+    `id` and `created_at` are always included.
+    """
+    # Cards keep a short post's text but not a blog's body
+    post_fields = select_fields(FEED_FIELDS, CARD_FIELDS["post"] | {"type", "author_name"}, fields, view)
+    blog_fields = select_fields(FEED_FIELDS, CARD_FIELDS["blog"] | {"type", "author_name"}, fields, view)
+    
+    if current_user_id is None:
+        # The same feed for every anonymous caller: computed once, shared and cached briefly
+        return await anonymous_reads.response(
+            ("feed", skip, limit, following_only, post_fields, blog_fields),
+            lambda: _feed_items(skip, limit, following_only, post_fields, blog_fields, None),
+        )
+    return ORJSONResponse(await _feed_items(skip, limit, following_only, post_fields, blog_fields, current_user_id))
+
+
+async def _feed_items(
+    skip: int,
+    limit: int,
+    following_only: bool,
+    post_fields,
+    blog_fields,
+    current_user_id: Optional[str]
+) -> List[dict]:
+    """Newest posts and blogs merged into one page."""
     # Get following list if needed
     following_ids = []
     if following_only and current_user_id:
@@ -23,61 +63,5 @@ async def get_feed(
         following_ids = [f["following_id"] for f in follows]
         following_ids.append(current_user_id)  # Include own posts
     
-    # Get posts
-    post_query = {"author_id": {"$in": following_ids}} if following_only else {}
-    posts = await db.short_posts.find(post_query).sort("created_at", -1).skip(skip).limit(limit).to_list(limit)
-    
-    # Get blogs
-    blog_query = {"author_id": {"$in": following_ids}} if following_only else {}
-    blogs = await db.blog_posts.find(blog_query).sort("created_at", -1).skip(skip).limit(limit).to_list(limit)
-    
-    # Combine and sort
-    feed_items = []
-    
-    for post in posts:
-        author = await db.users.find_one({"id": post["author_id"]})
-        item = {
-            "type": "post",
-            "id": post["id"],
-            "author_id": post["author_id"],
-            "author_username": post.get("author_username", author["username"] if author else ""),
-            "author_avatar": author.get("avatar", "") if author else "",
-            "author_name": author.get("name", "") if author else "",
-            "content": post["content"],
-            "likes_count": post.get("likes_count", 0),
-            "comments_count": post.get("comments_count", 0),
-            "created_at": post["created_at"],
-            "liked_by_user": False
-        }
-        if current_user_id:
-            liked = await db.likes.find_one({"user_id": current_user_id, "post_id": post["id"], "post_type": "post"})
-            item["liked_by_user"] = bool(liked)
-        feed_items.append(item)
-    
-    for blog in blogs:
-        author = await db.users.find_one({"id": blog["author_id"]})
-        item = {
-            "type": "blog",
-            "id": blog["id"],
-            "author_id": blog["author_id"],
-            "author_username": blog.get("author_username", author["username"] if author else ""),
-            "author_avatar": author.get("avatar", "") if author else "",
-            "author_name": author.get("name", "") if author else "",
-            "title": blog["title"],
-            "excerpt": blog.get("excerpt", ""),
-            "cover_image": blog.get("cover_image", ""),
-            "content": blog["content"],
-            "tags": blog.get("tags", []),
-            "likes_count": blog.get("likes_count", 0),
-            "comments_count": blog.get("comments_count", 0),
-            "created_at": blog["created_at"],
-            "liked_by_user": False
-        }
-        if current_user_id:
-            liked = await db.likes.find_one({"user_id": current_user_id, "post_id": blog["id"], "post_type": "blog"})
-            item["liked_by_user"] = bool(liked)
-        feed_items.append(item)
-    
-    # Sort by created_at
-    feed_items.sort(key=lambda x: x["created_at"], reverse=True)
-    return feed_items[:limit]
+    query = {"author_id": {"$in": following_ids}} if following_only else {}
+    return await feed_page(query, skip, limit, post_fields, blog_fields, current_user_id)
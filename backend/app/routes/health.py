@@ -5,6 +5,7 @@ from fastapi import APIRouter
 
 from ..database import db
 from ..config import settings
+from ..services import hashing_stats
 
 router = APIRouter()
 
@@ -60,5 +61,6 @@ async def health_check():
         "status": "healthy",
         "service": "pinpost-api",
         "database": db_status,
+        "password_hashing": hashing_stats.snapshot(),
         "timestamp": datetime.now(timezone.utc).isoformat()
     }
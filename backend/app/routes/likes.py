@@ -5,7 +5,8 @@ from datetime import datetime, timezone
 
 from ..database import db
 from ..dependencies import get_current_user
-from ..services import create_notification
+from ..services import create_notification, analytics
+from ..conditional import touched
 
 router = APIRouter()
 
@@ -42,10 +43,11 @@ async def like_post(post_type: str, post_id: str, user_id: str = Depends(get_cur
         "created_at": datetime.now(timezone.utc).isoformat()
     }
     await db.likes.insert_one(like)
+    analytics.track("likes")
     
     # Update like count
     collection = db.short_posts if post_type == "post" else db.blog_posts
-    await collection.update_one({"id": post_id}, {"$inc": {"likes_count": 1}})
+    await collection.update_one({"id": post_id}, {"$inc": {"likes_count": 1}, "$set": touched()})
     
     # Create notification (if not self-like)
     if post["author_id"] != user_id:
@@ -77,6 +79,6 @@ async def unlike_post(post_type: str, post_id: str, user_id: str = Depends(get_c
         raise HTTPException(status_code=400, detail="Not liked")
     
     collection = db.short_posts if post_type == "post" else db.blog_posts
-    await collection.update_one({"id": post_id}, {"$inc": {"likes_count": -1}})
+    await collection.update_one({"id": post_id}, {"$inc": {"likes_count": -1}, "$set": touched()})
     
     return {"message": "Unliked successfully"}
@@ -0,0 +1,55 @@
+"""Media routes - serve files stored by the local storage backend."""
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import FileResponse, Response
+
+from ..services.media_service import (
+    MediaNotFound, RangeNotSatisfiable, FileRangeResponse,
+    resolve_media_path, media_headers, media_type_for, etag_matches, if_range_matches, parse_range, accel_redirect_target
+)
+
+router = APIRouter()
+
+
+@router.api_route("/uploads/{path:path}", methods=["GET", "HEAD"], include_in_schema=False)
+async def serve_media(path: str, request: Request):
+    """
+    Serve an uploaded file with cache validators and byte-range support.
+
+    Full responses go out through FileResponse, which uses the server's
+    pathsend extension when it has one. With MEDIA_ACCEL_REDIRECT_PREFIX
+    set, nginx is told where the file lives and sends it itself.
+    """
+    try:
+        full, st = await run_in_threadpool(resolve_media_path, path)
+    except MediaNotFound:
+        raise HTTPException(status_code=404, detail="Not found")
+
+    headers = media_headers(full, st)
+    media_type = media_type_for(full.name)
+
+    if etag_matches(request.headers.get("if-none-match"), headers["etag"]):
+        return Response(status_code=304, headers=headers)
+
+    target = accel_redirect_target(path)
+    if target:
+        # nginx handles Range and conditional requests against the file itself
+        headers["x-accel-redirect"] = target
+        return Response(headers=headers, media_type=media_type)
+
+    range_header = request.headers.get("range")
+    if_range = request.headers.get("if-range")
+    if range_header and if_range and not if_range_matches(if_range, headers["etag"]):
+        range_header = None
+    try:
+        byte_range = parse_range(range_header, st.st_size)
+    except RangeNotSatisfiable:
+        return Response(
+            status_code=416,
+            headers={"content-range": f"bytes */{st.st_size}", "accept-ranges": "bytes"},
+        )
+
+    if byte_range is None:
+        return FileResponse(full, headers=headers, media_type=media_type, stat_result=st)
+    start, end = byte_range
+    return FileRangeResponse(full, start, end, st.st_size, headers, media_type=media_type)
@@ -1,13 +1,15 @@
 """Messaging routes - conversations and messages."""
 from typing import List, Optional
 from fastapi import APIRouter, HTTPException, Depends, Body
+from fastapi.responses import ORJSONResponse
 import uuid
 from datetime import datetime, timezone
 
 from ..database import db
 from ..models import Message, MessageCreate, Conversation, ParticipantDetail
 from ..dependencies import get_current_user
-from ..services import manager
+from ..services import manager, analytics
+from ..serialization import trusted
 
 router = APIRouter()
 
@@ -40,7 +42,7 @@ async def get_conversation_messages(
         {"conversation_id": conversation_id}
     ).sort("created_at", -1).skip(skip).limit(limit).to_list(limit)
     
-    return [Message(**m) for m in messages]
+    return ORJSONResponse([trusted(Message, m) for m in messages])
 
 
 @router.post("/conversations")
@@ -113,6 +115,7 @@ async def send_message(
         "created_at": now
     }
     await db.messages.insert_one(message)
+    analytics.track("messages")
     
     # Update conversation
     recipient_id = [p for p in conversation["participants"] if p != current_user_id][0]
@@ -0,0 +1,20 @@
+"""Metrics routes - Prometheus scrape endpoint."""
+from fastapi import APIRouter
+from fastapi.responses import Response
+
+from ..metrics import MULTIPROCESS, render_latest
+from ..services.metrics_service import sample_runtime_metrics
+
+router = APIRouter()
+
+
+@router.get("/metrics", include_in_schema=False)
+async def prometheus_metrics():
+    """
+    Prometheus exposition. Served outside /api, which nginx does not proxy,
+    so only scrapers on the internal network reach it.
+    """
+    if not MULTIPROCESS:
+        sample_runtime_metrics()
+    body, content_type = render_latest()
+    return Response(content=body, media_type=content_type)
@@ -1,10 +1,12 @@
 """Notification routes - get and mark notifications."""
 from typing import List
 from fastapi import APIRouter, Depends
+from fastapi.responses import ORJSONResponse
 
 from ..database import db
 from ..models import Notification
 from ..dependencies import get_current_user
+from ..serialization import trusted
 
 router = APIRouter()
 
@@ -13,7 +15,7 @@ router = APIRouter()
 async def get_notifications(current_user_id: str = Depends(get_current_user)):
     """Get all notifications for current user."""
     notifications = await db.notifications.find({"user_id": current_user_id}).sort("created_at", -1).to_list(100)
-    return [Notification(**n) for n in notifications]
+    return ORJSONResponse([trusted(Notification, n) for n in notifications])
 
 
 @router.put("/notifications/{notification_id}/read")
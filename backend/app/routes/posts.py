@@ -1,12 +1,18 @@
 """Short post routes - CRUD for short posts."""
 from typing import Optional, List
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Request, Query
+from fastapi.responses import ORJSONResponse
 import uuid
 from datetime import datetime, timezone
 
 from ..database import db
 from ..models import ShortPost, ShortPostCreate, ShortPostUpdate
 from ..dependencies import get_current_user, get_optional_user
+from ..services import platform_stats
+from ..services.pipelines import content_page
+from ..serialization import trusted
+from ..fieldsets import CARD_FIELDS, View, select_fields
+from ..conditional import VERSION_FIELDS, latest, make_etag, not_modified, validator_headers, version_of
 
 router = APIRouter()
 
@@ -29,41 +35,55 @@ async def create_post(post_data: ShortPostCreate, user_id: str = Depends(get_cur
         "created_at": datetime.now(timezone.utc).isoformat()
     }
     await db.short_posts.insert_one(post)
+    await platform_stats.record(posts=1)
     return ShortPost(**post)
 
 
 @router.get("/posts", response_model=List[ShortPost])
-async def get_posts(skip: int = 0, limit: int = 50, current_user_id: Optional[str] = Depends(get_optional_user)):
-    """Get all posts with pagination."""
-    posts = await db.short_posts.find().sort("created_at", -1).skip(skip).limit(limit).to_list(limit)
+async def get_posts(
+    skip: int = Query(0, ge=0),
+    limit: int = Query(50, ge=1, le=100),
+    fields: Optional[str] = None,
+    view: View = "full",
+    current_user_id: Optional[str] = Depends(get_optional_user)
+):
+    """Get all posts with pagination; `fields`/`view` trim each item."""
+    selected = select_fields(ShortPost.model_fields, CARD_FIELDS["post"], fields, view)
+    result = await content_page("post", {}, skip, limit, selected, current_user_id)
     
-    result = []
-    for post in posts:
-        author = await db.users.find_one({"id": post["author_id"]})
-        post_data = ShortPost(**post).dict()
-        if author:
-            post_data["author_name"] = author.get("name", "")
-            post_data["author_avatar"] = author.get("avatar", "")
-        
-        if current_user_id:
-            liked = await db.likes.find_one({"user_id": current_user_id, "post_id": post["id"], "post_type": "post"})
-            post_data["liked_by_user"] = bool(liked)
-        result.append(post_data)
-    
-    return result
+    # Already shaped like the response model; skip its second validation pass
+    return ORJSONResponse(result)
 
 
 @router.get("/posts/{post_id}", response_model=ShortPost)
-async def get_post_by_id(post_id: str, current_user_id: Optional[str] = Depends(get_optional_user)):
+async def get_post_by_id(post_id: str, request: Request, current_user_id: Optional[str] = Depends(get_optional_user)):
     """Get a single post by ID."""
+    # Validators first: the post's and its author's versions in one round trip,
+    # so revalidation is answered before anything is hydrated
+    versions = await db.short_posts.aggregate([
+        {"$match": {"id": post_id}},
+        {"$lookup": {"from": "users", "localField": "author_id", "foreignField": "id", "as": "author"}},
+        {"$project": {
+            "_id": 0, **VERSION_FIELDS, "likes_count": 1, "comments_count": 1,
+            **{f"author.{field}": 1 for field in VERSION_FIELDS},
+        }},
+    ]).to_list(1)
+    if not versions:
+        raise HTTPException(status_code=404, detail="Post not found")
+    authors = versions[0].pop("author", None) or [None]
+    last_modified = latest(version_of(versions[0]), version_of(authors[0]))
+    etag = make_etag(post_id, last_modified, versions[0].get("likes_count"), versions[0].get("comments_count"), current_user_id)
+    cached = not_modified(request, etag, last_modified)
+    if cached:
+        return cached
+    
     post = await db.short_posts.find_one({"id": post_id})
     if not post:
         raise HTTPException(status_code=404, detail="Post not found")
     
     author = await db.users.find_one({"id": post["author_id"]})
-    post_data = ShortPost(**post).dict()
+    post_data = trusted(ShortPost, post)
     if author:
-        post_data["author_name"] = author.get("name", "")
         post_data["author_avatar"] = author.get("avatar", "")
     
     if current_user_id:
@@ -72,7 +92,7 @@ async def get_post_by_id(post_id: str, current_user_id: Optional[str] = Depends(
     else:
         post_data["liked_by_user"] = False
     
-    return post_data
+    return ORJSONResponse(post_data, headers=validator_headers(etag, last_modified))
 
 
 @router.put("/posts/{post_id}", response_model=ShortPost)
@@ -86,6 +106,7 @@ async def update_post(post_id: str, post_data: ShortPostUpdate, user_id: str = D
     
     update_data = {k: v for k, v in post_data.dict().items() if v is not None}
     update_data["updated_at"] = datetime.now(timezone.utc).isoformat()
+    update_data["modified_at"] = update_data["updated_at"]
     
     await db.short_posts.update_one({"id": post_id}, {"$set": update_data})
     updated_post = await db.short_posts.find_one({"id": post_id})
@@ -108,32 +129,29 @@ async def delete_post(post_id: str, user_id: str = Depends(get_current_user)):
     if post["author_id"] != user_id:
         raise HTTPException(status_code=403, detail="Not authorized")
     
-    await db.short_posts.delete_one({"id": post_id})
+    deleted = await db.short_posts.delete_one({"id": post_id})
     await db.likes.delete_many({"post_id": post_id, "post_type": "post"})
-    await db.comments.delete_many({"post_id": post_id, "post_type": "post"})
+    comments = await db.comments.delete_many({"post_id": post_id, "post_type": "post"})
+    await platform_stats.record(posts=-deleted.deleted_count, comments=-comments.deleted_count)
     return {"message": "Post deleted successfully"}
 
 
 @router.get("/users/{username}/posts", response_model=List[ShortPost])
-async def get_user_posts(username: str, skip: int = 0, limit: int = 20, current_user_id: Optional[str] = Depends(get_optional_user)):
-    """Get posts by a specific user."""
+async def get_user_posts(
+    username: str,
+    skip: int = Query(0, ge=0),
+    limit: int = Query(20, ge=1, le=100),
+    fields: Optional[str] = None,
+    view: View = "full",
+    current_user_id: Optional[str] = Depends(get_optional_user)
+):
+    """Get posts by a specific user; `fields`/`view` trim each item."""
+    selected = select_fields(ShortPost.model_fields, CARD_FIELDS["post"], fields, view)
     user = await db.users.find_one({"username": username})
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     
-    posts = await db.short_posts.find({"author_id": user["id"]}).sort("created_at", -1).skip(skip).limit(limit).to_list(limit)
-    
-    result = []
-    for post in posts:
-        author = await db.users.find_one({"id": post["author_id"]})
-        post_data = ShortPost(**post).dict()
-        if author:
-            post_data["author_name"] = author.get("name", "")
-            post_data["author_avatar"] = author.get("avatar", "")
-        
-        if current_user_id:
-            liked = await db.likes.find_one({"user_id": current_user_id, "post_id": post["id"], "post_type": "post"})
-            post_data["liked_by_user"] = bool(liked)
-        result.append(post_data)
+    result = await content_page("post", {"author_id": user["id"]}, skip, limit, selected, current_user_id)
     
-    return result
+    # Already shaped like the response model; skip its second validation pass
+    return ORJSONResponse(result)
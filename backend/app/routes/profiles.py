@@ -0,0 +1,76 @@
+"""Profile routes - a whole profile page in one request."""
+import asyncio
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import ORJSONResponse
+
+from ..database import db
+from ..dependencies import get_optional_user
+from ..fieldsets import CARD_FIELDS, View
+from ..models import User
+from ..services import active_stories, is_following, online_status
+from ..services.pipelines import content_page
+
+router = APIRouter()
+
+SECTIONS = ("profile", "posts", "blogs", "stories", "status")
+
+
+def _select_sections(sections: Optional[str]) -> tuple:
+    if not sections:
+        return SECTIONS
+    requested = {name.strip() for name in sections.split(",") if name.strip()}
+    unknown = requested.difference(SECTIONS)
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown sections: {', '.join(sorted(unknown))}")
+    return tuple(name for name in SECTIONS if name in requested)
+
+
+@router.get("/profiles/{username}")
+async def get_profile_page(
+    username: str,
+    sections: Optional[str] = None,
+    limit: int = Query(20, ge=1, le=100),
+    view: View = "card",
+    current_user_id: Optional[str] = Depends(get_optional_user)
+):
+    """
+    Profile, posts, blogs, active stories and online status of a user.
+
+    The username is resolved once and the sections are queried
+    concurrently; `sections=profile,posts` limits the response to those
+    keys, `limit` applies to posts and blogs, and `view=full` includes
+    blog bodies.
+    """
+    wanted = _select_sections(sections)
+    user = await db.users.find_one({"username": username}, {"_id": 0, "password_hash": 0})
+    if not user:
+        raise HTTPException(status_code=404, detail="User not found")
+    user_id = user["id"]
+
+    fetches = {}
+    if "profile" in wanted and current_user_id:
+        fetches["is_following"] = is_following(current_user_id, user_id)
+    if "posts" in wanted:
+        selected = CARD_FIELDS["post"] if view == "card" else None
+        fetches["posts"] = content_page("post", {"author_id": user_id}, 0, limit, selected, current_user_id)
+    if "blogs" in wanted:
+        selected = CARD_FIELDS["blog"] if view == "card" else None
+        fetches["blogs"] = content_page("blog", {"author_id": user_id}, 0, limit, selected, current_user_id)
+    if "stories" in wanted:
+        fetches["stories"] = active_stories(user_id)
+    results = dict(zip(fetches, await asyncio.gather(*fetches.values())))
+
+    page = {}
+    for name in wanted:
+        if name == "profile":
+            page["profile"] = User(**user).dict()
+            if current_user_id:
+                page["profile"]["is_following"] = results["is_following"]
+        elif name == "status":
+            # Online state lives in this worker's connection manager and the user document
+            page["status"] = online_status(user)
+        else:
+            page[name] = results[name]
+    return ORJSONResponse(page)
@@ -1,12 +1,15 @@
 """Stories routes - CRUD for stories."""
-from typing import Optional, List
-from fastapi import APIRouter, HTTPException, Depends
+from typing import FrozenSet, Optional, List, Tuple
+from fastapi import APIRouter, HTTPException, Depends, Request
+from fastapi.responses import ORJSONResponse, Response
 import uuid
 from datetime import datetime, timezone, timedelta
 
 from ..database import db
 from ..models import Story, StoryCreate
 from ..dependencies import get_current_user, get_optional_user
+from ..services import active_stories, anonymous_reads, story_trays, tray_changed, tray_changed_since
+from ..conditional import make_etag, not_modified, touched, validator_headers, version_of
 
 router = APIRouter()
 
@@ -29,17 +32,32 @@ async def create_story(story_data: StoryCreate, user_id: str = Depends(get_curre
         "expires_at": (now + timedelta(hours=24)).isoformat()
     }
     await db.stories.insert_one(story)
+    await tray_changed(user_id)
     return Story(**story)
 
 
 @router.get("/stories")
-async def get_stories(current_user_id: Optional[str] = Depends(get_optional_user)):
+async def get_stories(request: Request, current_user_id: Optional[str] = Depends(get_optional_user)):
     """Get all active stories grouped by user."""
+    # The tray is the same for everyone: computed once, shared and cached briefly
+    etag, body = await anonymous_reads.get(("stories",), _story_tray)
+    cached = not_modified(request, etag)
+    if cached:
+        return cached
+    return Response(body, media_type="application/json", headers=validator_headers(etag))
+
+
+async def _story_tray() -> Tuple[str, bytes]:
+    """ETag and rendered body of the active stories, grouped by user."""
     now = datetime.now(timezone.utc).isoformat()
     
     # Get non-expired stories
     stories = await db.stories.find({"expires_at": {"$gt": now}}).sort("created_at", -1).to_list(100)
     
+    # Stories drop out as they expire without any write, so the ETag covers
+    # which stories are active and there is no Last-Modified
+    etag = make_etag([(s["id"], version_of(s), s.get("views_count")) for s in stories])
+    
     # Group by user
     user_stories = {}
     for story in stories:
@@ -53,19 +71,81 @@ async def get_stories(current_user_id: Optional[str] = Depends(get_optional_user
             }
         user_stories[uid]["stories"].append(Story(**story).dict())
     
-    return list(user_stories.values())
+    return etag, ORJSONResponse(list(user_stories.values())).body
+
+
+@router.get("/stories/tray")
+async def get_story_tray(request: Request, current_user_id: str = Depends(get_current_user)):
+    """
+    Active stories of the users you follow, one ring per user.
+
+    Each story carries `seen` and each ring `has_unseen`; rings with
+    unseen stories come first, then by their newest story.
+    """
+    def build():
+        return _follow_tray(current_user_id)
+    
+    built_at, followed, etag, body = await story_trays.get(current_user_id, build)
+    # Other workers publish their story writes, views and follows; a tray older than those is rebuilt
+    if await tray_changed_since([current_user_id, *followed], built_at):
+        story_trays.invalidate(current_user_id)
+        built_at, followed, etag, body = await story_trays.get(current_user_id, build)
+    cached = not_modified(request, etag)
+    if cached:
+        return cached
+    return Response(body, media_type="application/json", headers=validator_headers(etag))
+
+
+async def _follow_tray(viewer_id: str) -> Tuple[datetime, FrozenSet[str], str, bytes]:
+    """Build time and followed ids (for invalidation), ETag and rendered body of a viewer's tray."""
+    built_at = datetime.now(timezone.utc)
+    now = built_at.isoformat()
+    follows = await db.follows.find({"follower_id": viewer_id}, {"_id": 0, "following_id": 1}).to_list(None)
+    followed = frozenset(f["following_id"] for f in follows)
+    
+    stories = []
+    if followed:
+        stories = await db.stories.find(
+            {"user_id": {"$in": list(followed)}, "expires_at": {"$gt": now}}
+        ).sort("created_at", -1).to_list(None)
+    
+    # Seen state for the whole tray in one query
+    seen = set()
+    if stories:
+        views = await db.story_views.find(
+            {"user_id": viewer_id, "story_id": {"$in": [s["id"] for s in stories]}}, {"_id": 0, "story_id": 1}
+        ).to_list(None)
+        seen = {v["story_id"] for v in views}
+    
+    rings = {}
+    for story in stories:
+        uid = story["user_id"]
+        if uid not in rings:
+            # Stories come newest first, so the first one dates the ring
+            rings[uid] = {
+                "user_id": uid,
+                "username": story["username"],
+                "user_avatar": story["user_avatar"],
+                "has_unseen": False,
+                "latest_at": story["created_at"],
+                "stories": []
+            }
+        item = Story(**story).dict()
+        item["seen"] = story["id"] in seen
+        rings[uid]["has_unseen"] |= not item["seen"]
+        rings[uid]["stories"].append(item)
+    
+    # Already newest first; the stable sort moves unseen rings ahead
+    tray = sorted(rings.values(), key=lambda ring: not ring["has_unseen"])
+    
+    etag = make_etag(viewer_id, [(s["id"], version_of(s), s.get("views_count"), s["id"] in seen) for s in stories])
+    return built_at, followed, etag, ORJSONResponse(tray).body
 
 
 @router.get("/stories/user/{user_id}", response_model=List[Story])
 async def get_user_stories(user_id: str):
     """Get all active stories for a user."""
-    now = datetime.now(timezone.utc).isoformat()
-    stories = await db.stories.find({
-        "user_id": user_id,
-        "expires_at": {"$gt": now}
-    }).sort("created_at", -1).to_list(100)
-    
-    return [Story(**s) for s in stories]
+    return await active_stories(user_id)
 
 
 @router.post("/stories/{story_id}/view")
@@ -87,7 +167,8 @@ async def view_story(story_id: str, current_user_id: str = Depends(get_current_u
             "user_id": current_user_id,
             "viewed_at": datetime.now(timezone.utc).isoformat()
         })
-        await db.stories.update_one({"id": story_id}, {"$inc": {"views_count": 1}})
+        await db.stories.update_one({"id": story_id}, {"$inc": {"views_count": 1}, "$set": touched()})
+        await tray_changed(current_user_id)
     
     return {"message": "Story viewed"}
 
@@ -103,4 +184,5 @@ async def delete_story(story_id: str, user_id: str = Depends(get_current_user)):
     
     await db.stories.delete_one({"id": story_id})
     await db.story_views.delete_many({"story_id": story_id})
+    await tray_changed(user_id)
     return {"message": "Story deleted"}
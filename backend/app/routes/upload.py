@@ -1,17 +1,43 @@
-"""Upload routes - image and audio upload to Cloudinary."""
+"""Upload routes - image and audio upload to the configured storage backend."""
+import asyncio
 import logging
 from fastapi import APIRouter, HTTPException, Depends, File, UploadFile
-import sys
-from pathlib import Path
-
-# Add parent directory to path for cloudinary_utils
-sys.path.insert(0, str(Path(__file__).parent.parent.parent))
-from cloudinary_utils import upload_to_cloudinary
 
+from ..models import DirectUploadRequest, DirectUploadComplete
 from ..dependencies import get_current_user
+from ..services.upload_service import spool_upload, UploadTooLarge
+from ..services.storage import (
+    store_upload, begin_direct_upload, complete_direct_upload, DirectUploadError
+)
 
 router = APIRouter()
 
+# Storage folder for each upload type
+UPLOAD_FOLDERS = {
+    "profile": "pinpost/avatars",
+    "cover": "pinpost/covers",
+    "post": "pinpost/posts",
+    "blog": "pinpost/blogs",
+    "story": "pinpost/stories",
+    "message": "pinpost/messages"
+}
+AUDIO_FOLDER = "pinpost/uploads"
+
+
+async def _store(
+    file: UploadFile,
+    folder: str,
+    user_id: str,
+    resource_type: str = "image",
+    upload_type: str = None
+) -> dict:
+    """Spool the upload to disk and hand it to storage without blocking the loop."""
+    spooled = await spool_upload(file)
+    try:
+        return await store_upload(spooled, folder, user_id, resource_type, upload_type)
+    finally:
+        spooled.cleanup()
+
 
 @router.post("/upload/image")
 async def upload_image(
@@ -19,29 +45,28 @@ async def upload_image(
     user_id: str = Depends(get_current_user),
     upload_type: str = "profile"
 ):
-    """Upload an image to Cloudinary."""
+    """Upload an image."""
     if not file.content_type.startswith("image/"):
         raise HTTPException(status_code=400, detail="File must be an image")
     
-    # Determine Cloudinary folder based on upload type
-    folders = {
-        "profile": "pinpost/avatars",
-        "cover": "pinpost/covers",
-        "post": "pinpost/posts",
-        "blog": "pinpost/blogs",
-        "story": "pinpost/stories",
-        "message": "pinpost/messages"
-    }
-    folder = folders.get(upload_type, "pinpost/uploads")
+    folder = UPLOAD_FOLDERS.get(upload_type, "pinpost/uploads")
     
     try:
-        file_content = await file.read()
-        result = upload_to_cloudinary(file_content, file.filename, upload_type, folder)
+        result = await _store(file, folder, user_id, upload_type=upload_type)
         
         if result:
-            return {"url": result["url"], "public_id": result.get("public_id")}
+            return {
+                "url": result["url"],
+                "public_id": result.get("public_id"),
+                "deduplicated": result["deduplicated"],
+                "variants": result.get("variants", {}).get(upload_type, {})
+            }
         else:
             raise HTTPException(status_code=500, detail="Upload failed")
+    except UploadTooLarge:
+        raise HTTPException(status_code=413, detail="File too large")
+    except asyncio.TimeoutError:
+        raise HTTPException(status_code=504, detail="Upload timed out")
     except Exception as e:
         logging.error(f"Upload error: {e}")
         raise HTTPException(status_code=500, detail=f"Upload failed: {str(e)}")
@@ -49,19 +74,59 @@ async def upload_image(
 
 @router.post("/upload/audio")
 async def upload_audio(file: UploadFile = File(...), user_id: str = Depends(get_current_user)):
-    """Upload an audio file to Cloudinary."""
+    """Upload an audio file."""
     allowed_types = ["audio/mpeg", "audio/wav", "audio/webm", "audio/ogg", "audio/mp4"]
     if file.content_type not in allowed_types:
         raise HTTPException(status_code=400, detail="Invalid audio format")
     
     try:
-        file_content = await file.read()
-        result = upload_to_cloudinary(file_content, file.filename, "message")
+        result = await _store(file, AUDIO_FOLDER, user_id, resource_type="video")
         
         if result:
-            return {"url": result["url"], "public_id": result.get("public_id")}
+            return {
+                "url": result["url"],
+                "public_id": result.get("public_id"),
+                "deduplicated": result["deduplicated"]
+            }
         else:
             raise HTTPException(status_code=500, detail="Upload failed")
+    except UploadTooLarge:
+        raise HTTPException(status_code=413, detail="File too large")
+    except asyncio.TimeoutError:
+        raise HTTPException(status_code=504, detail="Upload timed out")
     except Exception as e:
         logging.error(f"Audio upload error: {e}")
         raise HTTPException(status_code=500, detail=f"Upload failed: {str(e)}")
+
+
+@router.post("/upload/sign")
+async def sign_direct_upload(request: DirectUploadRequest, user_id: str = Depends(get_current_user)):
+    """Issue short-lived signed parameters for uploading straight to storage."""
+    if request.media == "audio":
+        folder, resource_type = AUDIO_FOLDER, "video"
+    elif request.media == "image":
+        folder, resource_type = UPLOAD_FOLDERS.get(request.upload_type, "pinpost/uploads"), "image"
+    else:
+        raise HTTPException(status_code=400, detail="Invalid media type")
+    
+    try:
+        return begin_direct_upload(user_id, folder, resource_type)
+    except DirectUploadError as e:
+        raise HTTPException(status_code=501, detail=str(e))
+
+
+@router.post("/upload/complete")
+async def complete_upload(completion: DirectUploadComplete, user_id: str = Depends(get_current_user)):
+    """Verify and record an asset the client uploaded directly to storage."""
+    try:
+        result = await complete_direct_upload(user_id, completion.dict())
+    except DirectUploadError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except asyncio.TimeoutError:
+        raise HTTPException(status_code=504, detail="Upload verification timed out")
+    
+    return {
+        "url": result["url"],
+        "public_id": result.get("public_id"),
+        "deduplicated": result["deduplicated"]
+    }
@@ -1,13 +1,17 @@
 """User routes - profile, follow, search, trending."""
 from typing import Optional, List
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, BackgroundTasks, HTTPException, Depends, Request
+from fastapi.responses import ORJSONResponse
 import uuid
 from datetime import datetime, timezone
+from pymongo import UpdateOne
+from pymongo.errors import DuplicateKeyError
 
 from ..database import db
 from ..models import User, UserUpdate
 from ..dependencies import get_current_user, get_optional_user
-from ..services import create_notification
+from ..services import create_notification, anonymous_reads, tray_changed, is_following, online_status
+from ..conditional import VERSION_FIELDS, make_etag, not_modified, touched, validator_headers, version_of
 
 router = APIRouter()
 
@@ -133,12 +137,13 @@ async def get_user_suggestions(limit: int = 10, current_user_id: Optional[str] =
 @router.get("/users/trending")
 async def get_trending_users(limit: int = 5, current_user_id: Optional[str] = Depends(get_optional_user)):
     """Get trending/popular users."""
+    # The same for every caller: computed once, shared and cached briefly
+    return await anonymous_reads.response(("trending_users", limit), lambda: _trending_users(limit))
+
+
+async def _trending_users(limit: int) -> List[dict]:
     users = await db.users.find().sort("followers_count", -1).limit(limit).to_list(limit)
-    result = []
-    for user in users:
-        user.pop("password_hash", None)
-        result.append(User(**user))
-    return result
+    return [User(**user).model_dump() for user in users]
 
 
 @router.get("/users/search")
@@ -159,8 +164,21 @@ async def search_users(q: str, limit: int = 10):
 
 
 @router.get("/users/{username}")
-async def get_user_profile(username: str, current_user_id: Optional[str] = Depends(get_optional_user)):
+async def get_user_profile(username: str, request: Request, current_user_id: Optional[str] = Depends(get_optional_user)):
     """Get user profile by username."""
+    versions = await db.users.find_one(
+        {"username": username}, {"_id": 0, **VERSION_FIELDS, "followers_count": 1, "following_count": 1}
+    )
+    if not versions:
+        raise HTTPException(status_code=404, detail="User not found")
+    last_modified = version_of(versions)
+    etag = make_etag(
+        username, last_modified, versions.get("followers_count"), versions.get("following_count"), current_user_id
+    )
+    cached = not_modified(request, etag, last_modified)
+    if cached:
+        return cached
+    
     user = await db.users.find_one({"username": username})
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
@@ -170,46 +188,53 @@ async def get_user_profile(username: str, current_user_id: Optional[str] = Depen
     
     # Check if current user follows this user
     if current_user_id:
-        following = await db.follows.find_one({
-            "follower_id": current_user_id,
-            "following_id": user["id"]
-        })
-        user_data["is_following"] = bool(following)
+        user_data["is_following"] = await is_following(current_user_id, user["id"])
     
-    return user_data
+    return ORJSONResponse(user_data, headers=validator_headers(etag, last_modified))
+
+
+def _follow_counters(follower_id: str, following_id: str, step: int) -> list:
+    """Both sides of a follow edge, as one bulk write."""
+    return [
+        UpdateOne({"id": following_id}, {"$inc": {"followers_count": step}, "$set": touched()}),
+        UpdateOne({"id": follower_id}, {"$inc": {"following_count": step}, "$set": touched()}),
+    ]
 
 
 @router.post("/users/{user_id}/follow")
-async def follow_user(user_id: str, current_user_id: str = Depends(get_current_user)):
+async def follow_user(user_id: str, background_tasks: BackgroundTasks, current_user_id: str = Depends(get_current_user)):
     """Follow a user."""
     if user_id == current_user_id:
         raise HTTPException(status_code=400, detail="Cannot follow yourself")
     
-    target_user = await db.users.find_one({"id": user_id})
-    if not target_user:
+    # Target and follower in one read
+    users = await db.users.find(
+        {"id": {"$in": [user_id, current_user_id]}}, {"_id": 0, "id": 1, "username": 1, "avatar": 1}
+    ).to_list(2)
+    users = {u["id"]: u for u in users}
+    if user_id not in users:
         raise HTTPException(status_code=404, detail="User not found")
-    
-    existing = await db.follows.find_one({
-        "follower_id": current_user_id,
-        "following_id": user_id
-    })
-    if existing:
+    current_user = users[current_user_id]
+    
+    # The unique (follower_id, following_id) index makes this the only check:
+    # of two concurrent follows exactly one inserts, and only it bumps the counters
+    try:
+        result = await db.follows.update_one(
+            {"follower_id": current_user_id, "following_id": user_id},
+            {"$setOnInsert": {"id": str(uuid.uuid4()), "created_at": datetime.now(timezone.utc).isoformat()}},
+            upsert=True,
+        )
+    except DuplicateKeyError:
+        raise HTTPException(status_code=400, detail="Already following")
+    if result.upserted_id is None:
         raise HTTPException(status_code=400, detail="Already following")
     
-    current_user = await db.users.find_one({"id": current_user_id})
-    
-    await db.follows.insert_one({
-        "id": str(uuid.uuid4()),
-        "follower_id": current_user_id,
-        "following_id": user_id,
-        "created_at": datetime.now(timezone.utc).isoformat()
-    })
-    
-    await db.users.update_one({"id": user_id}, {"$inc": {"followers_count": 1}})
-    await db.users.update_one({"id": current_user_id}, {"$inc": {"following_count": 1}})
+    await db.users.bulk_write(_follow_counters(current_user_id, user_id, 1), ordered=False)
+    await tray_changed(current_user_id)
     
-    # Create notification
-    await create_notification(
+    # Notify after the response is sent
+    background_tasks.add_task(
+        create_notification,
         user_id=user_id,
         notif_type="follow",
         actor_id=current_user_id,
@@ -228,11 +253,12 @@ async def unfollow_user(user_id: str, current_user_id: str = Depends(get_current
         "follower_id": current_user_id,
         "following_id": user_id
     })
+    # Only the request that removed the edge decrements
     if result.deleted_count == 0:
         raise HTTPException(status_code=400, detail="Not following")
     
-    await db.users.update_one({"id": user_id}, {"$inc": {"followers_count": -1}})
-    await db.users.update_one({"id": current_user_id}, {"$inc": {"following_count": -1}})
+    await db.users.bulk_write(_follow_counters(current_user_id, user_id, -1), ordered=False)
+    await tray_changed(current_user_id)
     
     return {"message": "Unfollowed successfully"}
 
@@ -253,7 +279,7 @@ async def update_profile(profile_data: UserUpdate, current_user_id: str = Depend
         if existing:
             raise HTTPException(status_code=400, detail="Username already taken")
     
-    await db.users.update_one({"id": current_user_id}, {"$set": update_data})
+    await db.users.update_one({"id": current_user_id}, {"$set": {**update_data, **touched()}})
     user = await db.users.find_one({"id": current_user_id})
     return User(**user)
 
@@ -262,7 +288,7 @@ async def update_profile(profile_data: UserUpdate, current_user_id: str = Depend
 async def update_avatar(avatar_data: dict, current_user_id: str = Depends(get_current_user)):
     """Update user avatar."""
     avatar_url = avatar_data.get("avatar", "")
-    await db.users.update_one({"id": current_user_id}, {"$set": {"avatar": avatar_url}})
+    await db.users.update_one({"id": current_user_id}, {"$set": {"avatar": avatar_url, **touched()}})
     user = await db.users.find_one({"id": current_user_id})
     return User(**user)
 
@@ -270,7 +296,7 @@ async def update_avatar(avatar_data: dict, current_user_id: str = Depends(get_cu
 @router.delete("/users/avatar")
 async def remove_avatar(current_user_id: str = Depends(get_current_user)):
     """Remove user avatar."""
-    await db.users.update_one({"id": current_user_id}, {"$set": {"avatar": ""}})
+    await db.users.update_one({"id": current_user_id}, {"$set": {"avatar": "", **touched()}})
     user = await db.users.find_one({"id": current_user_id})
     return User(**user)
 
@@ -279,7 +305,7 @@ async def remove_avatar(current_user_id: str = Depends(get_current_user)):
 async def update_cover_photo(cover_data: dict, current_user_id: str = Depends(get_current_user)):
     """Update user cover photo."""
     cover_url = cover_data.get("cover_photo", "")
-    await db.users.update_one({"id": current_user_id}, {"$set": {"cover_photo": cover_url}})
+    await db.users.update_one({"id": current_user_id}, {"$set": {"cover_photo": cover_url, **touched()}})
     user = await db.users.find_one({"id": current_user_id})
     return User(**user)
 
@@ -287,7 +313,7 @@ async def update_cover_photo(cover_data: dict, current_user_id: str = Depends(ge
 @router.delete("/users/cover-photo")
 async def remove_cover_photo(current_user_id: str = Depends(get_current_user)):
     """Remove user cover photo."""
-    await db.users.update_one({"id": current_user_id}, {"$set": {"cover_photo": ""}})
+    await db.users.update_one({"id": current_user_id}, {"$set": {"cover_photo": "", **touched()}})
     user = await db.users.find_one({"id": current_user_id})
     return User(**user)
 
@@ -295,17 +321,8 @@ async def remove_cover_photo(current_user_id: str = Depends(get_current_user)):
 @router.get("/users/{user_id}/status")
 async def get_user_online_status(user_id: str):
     """Get user's online status."""
-    from ..services import manager
-    
     user = await db.users.find_one({"id": user_id})
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     
-    status = manager.get_user_status(user_id)
-    if not status["online"]:
-        status = {
-            "online": user.get("online", False),
-            "last_seen": user.get("last_seen")
-        }
-    
-    return status
+    return online_status(user)
@@ -0,0 +1,42 @@
+"""
+Pinpost Serialization
+Fast path for responses built from documents this app wrote itself.
+"""
+from copy import copy
+from functools import lru_cache
+from typing import AbstractSet, Any, Callable, Optional, Tuple, Type
+
+from pydantic import BaseModel
+from pydantic_core import PydanticUndefined
+
+
+@lru_cache(maxsize=None)
+def _field_plan(model: Type[BaseModel]) -> Tuple[Tuple[str, Any, Optional[Callable]], ...]:
+    return tuple(
+        (name, None if field.default is PydanticUndefined else field.default, field.default_factory)
+        for name, field in model.model_fields.items()
+    )
+
+
+def trusted(model: Type[BaseModel], doc: dict, fields: Optional[AbstractSet[str]] = None) -> dict:
+    """
+    `model(**doc).model_dump()` without validation.
+
+    Documents read back from our own collections were validated on the
+    way in, so list endpoints only need them cut down to the response
+    model's fields (dropping _id and internal keys) with defaults filled
+    in - the same result as model_construct(), minus the model instance.
+    With `fields` (a sparse fieldset), only those fields are kept.
+    """
+    out = {}
+    for name, default, factory in _field_plan(model):
+        if fields is not None and name not in fields:
+            continue
+        if name in doc:
+            out[name] = doc[name]
+        elif factory is not None:
+            out[name] = factory()
+        else:
+            # Mutable defaults ([] / {}) must not be shared between responses
+            out[name] = copy(default) if isinstance(default, (list, dict)) else default
+    return out
@@ -1,10 +1,27 @@
 # Services package
-from .auth_service import hash_password, verify_password, create_access_token
+from .auth_service import (
+    hash_password, verify_password, create_access_token,
+    hash_password_async, verify_password_async, hashing_stats,
+    token_claims, decode_access_token, revocations, set_admin_status,
+)
 from .notification_service import create_notification
+from .stats_service import platform_stats
+from .analytics_service import analytics
+from .follow_service import ensure_follow_edge_index, reconcile_follow_counts
 from .websocket_service import manager, ConnectionManager
+from .profile_service import is_following, active_stories, online_status
+from .story_service import tray_changed, tray_changed_since
+from .microcache import anonymous_reads, story_trays, MicroCache
 
 __all__ = [
     "hash_password", "verify_password", "create_access_token",
+    "hash_password_async", "verify_password_async", "hashing_stats",
+    "token_claims", "decode_access_token", "revocations", "set_admin_status",
     "create_notification",
+    "platform_stats", "analytics",
+    "ensure_follow_edge_index", "reconcile_follow_counts",
     "manager", "ConnectionManager",
+    "is_following", "active_stories", "online_status",
+    "tray_changed", "tray_changed_since",
+    "anonymous_reads", "story_trays", "MicroCache",
 ]
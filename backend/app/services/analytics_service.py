@@ -0,0 +1,200 @@
+"""Activity analytics - events folded into minute/hour/day rollup buckets."""
+import asyncio
+import logging
+from collections import Counter
+from datetime import datetime, timezone, timedelta
+from typing import Dict, List, Optional, Set, Tuple
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError, PyMongoError
+
+from ..config import settings
+from ..database import db
+
+METRICS = ("signups", "active_users", "posts", "blogs", "comments", "likes", "messages")
+
+GRANULARITIES = {
+    "minute": timedelta(minutes=1),
+    "hour": timedelta(hours=1),
+    "day": timedelta(days=1),
+}
+
+# Distinct-user metrics only make sense per day
+DAILY_ONLY = {"active_users"}
+
+
+def bucket_start(granularity: str, at: datetime) -> datetime:
+    if granularity == "minute":
+        return at.replace(second=0, microsecond=0)
+    if granularity == "hour":
+        return at.replace(minute=0, second=0, microsecond=0)
+    return at.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def _retention(granularity: str) -> Optional[timedelta]:
+    """
+    How long buckets of a granularity are kept; day buckets are kept forever.
+
+    Every event is counted at all three granularities when it is flushed,
+    so expiring old minute and hour buckets compacts history down to the
+    coarser buckets without losing totals.
+    """
+    if granularity == "minute":
+        return timedelta(hours=settings.ANALYTICS_MINUTE_RETENTION)
+    if granularity == "hour":
+        return timedelta(days=settings.ANALYTICS_HOUR_RETENTION)
+    return None
+
+
+class Analytics:
+    """
+    Buffers activity in memory and flushes it to analytics_rollups.
+
+    track() is synchronous and only bumps a counter, so write paths pay
+    nothing for analytics; a background task upserts the pending counts
+    every ANALYTICS_FLUSH_INTERVAL seconds, one update per bucket.
+    """
+
+    def __init__(self):
+        self._pending: Counter = Counter()  # (metric, minute start) -> count
+        self._active: Set[Tuple[str, datetime]] = set()  # (user_id, day) not yet flushed
+        self._seen_day: Optional[datetime] = None
+        self._seen: Set[str] = set()  # users already counted active today by this process
+        self._task: Optional[asyncio.Task] = None
+        self._flush_lock = asyncio.Lock()
+
+    @property
+    def pending(self) -> int:
+        """Buffered counters and active users waiting for the next flush."""
+        return len(self._pending) + len(self._active)
+
+    def track(self, metric: str, count: int = 1, at: Optional[datetime] = None):
+        at = at or datetime.now(timezone.utc)
+        self._pending[(metric, bucket_start("minute", at))] += count
+
+    def track_active(self, user_id: str, at: Optional[datetime] = None):
+        """Note that a user was active; each user counts once per day."""
+        day = bucket_start("day", at or datetime.now(timezone.utc))
+        if day != self._seen_day:
+            self._seen_day = day
+            self._seen = set()
+        if user_id in self._seen:
+            return
+        self._seen.add(user_id)
+        self._active.add((user_id, day))
+
+    async def _count_new_active(self, active: Set[Tuple[str, datetime]]) -> Counter:
+        """Record active users, counting only those no other process has recorded today."""
+        if not active:
+            return Counter()
+        docs = [
+            {"_id": f"{day.date().isoformat()}:{user_id}", "expires_at": day + timedelta(days=2)}
+            for user_id, day in active
+        ]
+        try:
+            await db.analytics_active.insert_many(docs, ordered=False)
+            duplicates = set()
+        except BulkWriteError as e:
+            duplicates = {docs[err["index"]]["_id"] for err in e.details.get("writeErrors", []) if err.get("code") == 11000}
+        counts = Counter()
+        for doc, (user_id, day) in zip(docs, active):
+            if doc["_id"] not in duplicates:
+                counts[("active_users", day)] += 1
+        return counts
+
+    async def flush(self):
+        async with self._flush_lock:
+            pending, self._pending = self._pending, Counter()
+            active, self._active = self._active, set()
+            if not pending and not active:
+                return
+            try:
+                daily = await self._count_new_active(active)
+            except PyMongoError as e:
+                logging.error(f"Failed to record active users: {e}")
+                self._active |= active
+                daily = Counter()
+
+            buckets: Dict[Tuple[str, datetime], Counter] = {}
+            for (metric, minute), count in pending.items():
+                for granularity in GRANULARITIES:
+                    key = (granularity, bucket_start(granularity, minute))
+                    buckets.setdefault(key, Counter())[metric] += count
+            for (metric, day), count in daily.items():
+                buckets.setdefault(("day", day), Counter())[metric] += count
+
+            ops = []
+            for (granularity, start), counts in buckets.items():
+                on_insert = {"granularity": granularity, "start": start}
+                retention = _retention(granularity)
+                if retention:
+                    on_insert["expires_at"] = start + retention
+                ops.append(UpdateOne(
+                    {"_id": f"{granularity}:{start.isoformat()}"},
+                    {"$inc": {f"counts.{m}": n for m, n in counts.items()}, "$setOnInsert": on_insert},
+                    upsert=True,
+                ))
+            try:
+                await db.analytics_rollups.bulk_write(ops, ordered=False)
+            except PyMongoError as e:
+                # Keep the counts for the next flush rather than dropping them
+                logging.error(f"Failed to flush analytics: {e}")
+                self._pending.update(pending)
+                if daily:
+                    logging.error(f"Dropped {sum(daily.values())} active-user counts")
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(settings.ANALYTICS_FLUSH_INTERVAL)
+            try:
+                await self.flush()
+            except Exception as e:
+                logging.error(f"Analytics flush loop error: {e}")
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        await self.flush()
+
+    async def series(self, metric: str, start: datetime, end: datetime, granularity: str) -> List[dict]:
+        """
+        Bucket counts for [start, end), zero-filled, including counts not yet flushed.
+
+        Reads one document per bucket, so cost depends on the range and
+        granularity, never on how many events happened.
+        """
+        step = GRANULARITIES[granularity]
+        first = bucket_start(granularity, start)
+        docs = await db.analytics_rollups.find(
+            {"granularity": granularity, "start": {"$gte": first, "$lt": end}},
+            {"_id": 0, "start": 1, f"counts.{metric}": 1},
+        ).to_list(None)
+        values = Counter()
+        for doc in docs:
+            start_at = doc["start"]
+            if start_at.tzinfo is None:
+                start_at = start_at.replace(tzinfo=timezone.utc)
+            values[start_at] += doc.get("counts", {}).get(metric, 0)
+        for (pending_metric, minute), count in self._pending.items():
+            if pending_metric == metric:
+                values[bucket_start(granularity, minute)] += count
+
+        points = []
+        at = first
+        while at < end:
+            points.append({"start": at.isoformat(), "value": values.get(at, 0)})
+            at += step
+        return points
+
+    async def count(self, metric: str, granularity: str, at: Optional[datetime] = None) -> int:
+        """Count for the single bucket containing `at` (default now)."""
+        start = bucket_start(granularity, at or datetime.now(timezone.utc))
+        points = await self.series(metric, start, start + GRANULARITIES[granularity], granularity)
+        return points[0]["value"]
+
+
+analytics = Analytics()
@@ -1,8 +1,54 @@
 """Authentication services - password hashing and JWT tokens."""
+import asyncio
+import hashlib
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List
 import bcrypt
 import jwt
 from datetime import datetime, timezone, timedelta
+from pymongo import ReturnDocument, UpdateOne
 from ..config import settings
+from ..database import db
+from ..conditional import touched
+from .cache import LRUCache
+
+# bcrypt is deliberately slow; it runs on its own small pool so a login spike
+# queues here instead of blocking the event loop or the default executor.
+_hash_executor = ThreadPoolExecutor(
+    max_workers=settings.PASSWORD_HASH_WORKERS,
+    thread_name_prefix="password-hash",
+)
+_hash_slots = asyncio.Semaphore(settings.PASSWORD_HASH_WORKERS)
+
+
+class HashingStats:
+    """Queue and run counters for the password hashing pool."""
+
+    def __init__(self):
+        self.waiting = 0
+        self.running = 0
+        self.completed = 0
+        self.queue_time_total = 0.0
+        self.queue_time_max = 0.0
+
+    def record_wait(self, seconds: float):
+        self.completed += 1
+        self.queue_time_total += seconds
+        self.queue_time_max = max(self.queue_time_max, seconds)
+
+    def snapshot(self) -> dict:
+        return {
+            "waiting": self.waiting,
+            "running": self.running,
+            "completed": self.completed,
+            "avg_queue_ms": round(self.queue_time_total / self.completed * 1000, 2) if self.completed else 0.0,
+            "max_queue_ms": round(self.queue_time_max * 1000, 2),
+        }
+
+
+hashing_stats = HashingStats()
 
 
 def hash_password(password: str) -> str:
@@ -20,6 +66,34 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
     return bcrypt.checkpw(password_bytes, hashed_bytes)
 
 
+async def _run_hashing(fn, *args):
+    """Run a bcrypt call on the hashing pool, recording how long it queued."""
+    queued_at = time.perf_counter()
+    hashing_stats.waiting += 1
+    try:
+        await _hash_slots.acquire()
+    finally:
+        hashing_stats.waiting -= 1
+    hashing_stats.record_wait(time.perf_counter() - queued_at)
+    hashing_stats.running += 1
+    try:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(_hash_executor, fn, *args)
+    finally:
+        hashing_stats.running -= 1
+        _hash_slots.release()
+
+
+async def hash_password_async(password: str) -> str:
+    """Hash a password without blocking the event loop."""
+    return await _run_hashing(hash_password, password)
+
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    """Verify a password without blocking the event loop."""
+    return await _run_hashing(verify_password, plain_password, hashed_password)
+
+
 def create_access_token(data: dict) -> str:
     """Create a JWT access token."""
     to_encode = data.copy()
@@ -27,3 +101,104 @@ def create_access_token(data: dict) -> str:
     to_encode.update({"exp": expire})
     encoded_jwt = jwt.encode(to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
     return encoded_jwt
+
+
+def token_claims(user: dict) -> dict:
+    """Claims embedded in a user's access token, including their role snapshot."""
+    return {
+        "sub": user["id"],
+        "adm": bool(user.get("is_admin", False)),
+        "rv": user.get("role_version", 0),
+    }
+
+
+# Verified payloads keyed by token hash; entries expire with the token itself.
+_token_cache = LRUCache(maxsize=settings.TOKEN_CACHE_SIZE, name="tokens")
+
+
+def decode_access_token(token: str) -> dict:
+    """Verify a JWT, reusing the result for tokens seen recently."""
+    key = hashlib.sha256(token.encode("utf-8")).digest()
+    payload = _token_cache.get(key)
+    if payload is not None:
+        return payload
+    payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
+    _token_cache.set(key, payload, expires_at=payload.get("exp"))
+    return payload
+
+
+class RevocationTable:
+    """
+    Cached copy of the small token_revocations collection.
+
+    Only users whose role changed or who were deleted have an entry, so the
+    whole table is reloaded every TOKEN_REVOCATION_REFRESH seconds instead of
+    looking users up per request. Writes made by this process apply at once.
+    """
+
+    def __init__(self, refresh_interval: float):
+        self.refresh_interval = refresh_interval
+        self._entries: Dict[str, dict] = {}
+        self._loaded_at = 0.0
+        self._lock = asyncio.Lock()
+
+    async def _refresh_if_stale(self):
+        if time.monotonic() - self._loaded_at < self.refresh_interval:
+            return
+        async with self._lock:
+            if time.monotonic() - self._loaded_at < self.refresh_interval:
+                return
+            try:
+                docs = await db.token_revocations.find({}, {"_id": 0}).to_list(None)
+                self._entries = {d["user_id"]: d for d in docs}
+            except Exception as e:
+                logging.error(f"Failed to refresh token revocations: {e}")
+            self._loaded_at = time.monotonic()
+
+    async def get(self, user_id: str) -> dict:
+        await self._refresh_if_stale()
+        return self._entries.get(user_id, {})
+
+    async def is_revoked(self, user_id: str) -> bool:
+        return bool((await self.get(user_id)).get("revoked"))
+
+    async def record(self, user_id: str, role_version: int = 0, revoked: bool = False):
+        entry = {
+            "user_id": user_id,
+            "role_version": role_version,
+            "revoked": revoked,
+            "updated_at": datetime.now(timezone.utc).isoformat(),
+        }
+        await db.token_revocations.update_one({"user_id": user_id}, {"$set": entry}, upsert=True)
+        self._entries[user_id] = entry
+
+    async def revoke_many(self, user_ids: List[str]):
+        """Revoke every token of several users in one round trip."""
+        if not user_ids:
+            return
+        now = datetime.now(timezone.utc).isoformat()
+        entries = [
+            {"user_id": user_id, "role_version": 0, "revoked": True, "updated_at": now}
+            for user_id in user_ids
+        ]
+        await db.token_revocations.bulk_write(
+            [UpdateOne({"user_id": e["user_id"]}, {"$set": e}, upsert=True) for e in entries],
+            ordered=False,
+        )
+        for entry in entries:
+            self._entries[entry["user_id"]] = entry
+
+
+revocations = RevocationTable(settings.TOKEN_REVOCATION_REFRESH)
+
+
+async def set_admin_status(user_id: str, is_admin: bool):
+    """Change a user's admin flag and invalidate tokens carrying the old role."""
+    user = await db.users.find_one_and_update(
+        {"id": user_id},
+        {"$set": {"is_admin": is_admin, **touched()}, "$inc": {"role_version": 1}},
+        projection={"_id": 0, "role_version": 1},
+        return_document=ReturnDocument.AFTER,
+    )
+    if user:
+        await revocations.record(user_id, role_version=user["role_version"])
@@ -0,0 +1,88 @@
+"""Follow graph maintenance."""
+import logging
+from typing import Dict
+
+from pymongo import UpdateOne
+
+from ..database import db
+
+FOLLOW_EDGE_INDEX = "follower_id_1_following_id_1"
+
+# Ids per delete_many/bulk_write round trip
+BATCH_SIZE = 1000
+
+
+async def _remove_duplicate_edges() -> int:
+    """Keep the oldest edge of each (follower_id, following_id) pair; returns how many were removed."""
+    duplicates = db.follows.aggregate([
+        {"$sort": {"_id": 1}},
+        {"$group": {"_id": {"a": "$follower_id", "b": "$following_id"}, "ids": {"$push": "$_id"}, "n": {"$sum": 1}}},
+        {"$match": {"n": {"$gt": 1}}},
+    ], allowDiskUse=True)
+    extra = []
+    removed = 0
+    async for group in duplicates:
+        extra += group["ids"][1:]
+        if len(extra) >= BATCH_SIZE:
+            removed += (await db.follows.delete_many({"_id": {"$in": extra}})).deleted_count
+            extra = []
+    if extra:
+        removed += (await db.follows.delete_many({"_id": {"$in": extra}})).deleted_count
+    return removed
+
+
+async def _edge_counts(group_field: str) -> Dict[str, int]:
+    rows = db.follows.aggregate([{"$group": {"_id": f"${group_field}", "n": {"$sum": 1}}}], allowDiskUse=True)
+    return {row["_id"]: row["n"] async for row in rows}
+
+
+async def reconcile_follow_counts() -> int:
+    """
+    Correct followers_count and following_count where they disagree with
+    the follows collection; returns how many counters were changed.
+
+    Users whose counters already match are never written. A drifted
+    counter is recounted on its own and set only if it still holds the
+    value that was read, so a follow landing meanwhile keeps its $inc.
+    """
+    counters = {
+        "followers_count": ("following_id", await _edge_counts("following_id")),
+        "following_count": ("follower_id", await _edge_counts("follower_id")),
+    }
+    ops = []
+    fixed = 0
+    async for user in db.users.find({}, {"_id": 0, "id": 1, **{counter: 1 for counter in counters}}):
+        for counter, (edge_field, counts) in counters.items():
+            stored = user.get(counter, 0)
+            if stored == counts.get(user["id"], 0):
+                continue
+            actual = await db.follows.count_documents({edge_field: user["id"]})
+            if stored != actual:
+                ops.append(UpdateOne({"id": user["id"], counter: user.get(counter)}, {"$set": {counter: actual}}))
+        if len(ops) >= BATCH_SIZE:
+            fixed += (await db.users.bulk_write(ops, ordered=False)).modified_count
+            ops = []
+    if ops:
+        fixed += (await db.users.bulk_write(ops, ordered=False)).modified_count
+    return fixed
+
+
+async def ensure_follow_edge_index():
+    """
+    Build the unique (follower_id, following_id) index follow_user relies on.
+
+    The old check-then-insert follow could store the same edge twice (and
+    count it twice), which would make the build fail. So the first time,
+    before the index exists, duplicate edges are removed and counters that
+    disagree with the remaining edges are corrected. Every step is
+    idempotent and never overwrites a concurrent $inc, so workers starting
+    together (one of them already serving follows) may all run it.
+    """
+    indexes = await db.follows.index_information()
+    if FOLLOW_EDGE_INDEX in indexes:
+        return
+    removed = await _remove_duplicate_edges()
+    fixed = await reconcile_follow_counts()
+    # Built last, so a startup that dies halfway runs the whole step again next time
+    await db.follows.create_index([("follower_id", 1), ("following_id", 1)], unique=True, name=FOLLOW_EDGE_INDEX)
+    logging.info(f"Built unique follow edge index; removed {removed} duplicate edges, corrected {fixed} counters")
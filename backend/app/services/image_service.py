@@ -0,0 +1,104 @@
+"""Image variant rendering - resized, metadata-free WebP/AVIF renditions built in a process pool."""
+import asyncio
+import logging
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Optional
+
+from ..config import settings
+
+try:
+    from PIL import Image, ImageOps, features
+except ImportError:  # optional dependency, uploads are stored without variants
+    Image = None
+
+# Variant name -> (width, height). A height means a center crop to exactly
+# that box; None keeps the aspect ratio and only bounds the width.
+VARIANT_SPECS = {
+    "profile": {"sm": (64, 64), "md": (160, 160), "lg": (320, 320)},
+    "cover": {"md": (960, None), "lg": (1600, None)},
+    "post": {"sm": (480, None), "md": (1080, None)},
+    "story": {"md": (720, None), "lg": (1080, None)},
+}
+
+# Animated and vector formats are left alone
+PROCESSABLE_TYPES = {"image/jpeg", "image/png", "image/webp", "image/bmp", "image/tiff", "image/avif"}
+
+_pool: Optional[ProcessPoolExecutor] = None
+
+
+def _output_formats() -> List[str]:
+    formats = ["webp"]
+    if settings.IMAGE_AVIF_ENABLED and features.check("avif"):
+        formats.append("avif")
+    return formats
+
+
+def _render(src_path: str, out_dir: str, specs: dict, formats: List[str], quality: int) -> List[dict]:
+    """Runs in a worker process: decode once, write every size/format pair."""
+    rendered = []
+    with Image.open(src_path) as source:
+        # Apply EXIF orientation before the metadata is dropped
+        image = ImageOps.exif_transpose(source)
+        if image.mode not in ("RGB", "RGBA"):
+            image = image.convert("RGBA" if "transparency" in image.info else "RGB")
+
+        for name, (width, height) in specs.items():
+            if height:
+                variant = ImageOps.fit(image, (width, height), Image.LANCZOS)
+            else:
+                variant = image.copy()
+                variant.thumbnail((width, width * 4), Image.LANCZOS)
+            # Fresh info dict so no EXIF/XMP/ICC data is carried over
+            variant.info = {}
+
+            for fmt in formats:
+                path = os.path.join(out_dir, f"{name}.{fmt}")
+                variant.save(path, format=fmt.upper(), quality=quality)
+                rendered.append({
+                    "name": name,
+                    "format": fmt,
+                    "width": variant.width,
+                    "height": variant.height,
+                    "path": path,
+                })
+    return rendered
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    global _pool
+    if _pool is None:
+        _pool = ProcessPoolExecutor(
+            max_workers=settings.IMAGE_WORKERS,
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+    return _pool
+
+
+def wants_variants(upload_type: Optional[str], content_type: str) -> bool:
+    """Whether an upload of this type should get resized variants."""
+    return (
+        Image is not None
+        and settings.IMAGE_VARIANTS_ENABLED
+        and upload_type in VARIANT_SPECS
+        and content_type in PROCESSABLE_TYPES
+    )
+
+
+async def render_variants(src_path: str, out_dir: str, upload_type: str) -> List[dict]:
+    """Render the variants for an upload type into out_dir without blocking the loop."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(
+        _get_pool(), _render, src_path, out_dir,
+        VARIANT_SPECS[upload_type], _output_formats(), settings.IMAGE_VARIANT_QUALITY
+    )
+
+
+def shutdown_pool():
+    """Stop the worker processes (called on app shutdown)."""
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+        logging.info("Image processing pool stopped")
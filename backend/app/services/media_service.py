@@ -0,0 +1,189 @@
+"""Local media serving - cache validators, byte ranges and X-Accel-Redirect handoff for /uploads."""
+import mimetypes
+import os
+import re
+import stat
+from email.utils import formatdate
+from pathlib import Path
+from typing import Optional, Tuple
+
+import anyio
+from starlette.responses import Response
+from starlette.types import Receive, Scope, Send
+
+from ..config import settings
+
+# Extension a stored upload gets for its declared content type; anything
+# else is stored as .bin and served as an opaque download
+MEDIA_EXTENSIONS = {
+    "image/jpeg": ".jpg",
+    "image/png": ".png",
+    "image/gif": ".gif",
+    "image/webp": ".webp",
+    "image/avif": ".avif",
+    "audio/mpeg": ".mp3",
+    "audio/wav": ".wav",
+    "audio/webm": ".webm",
+    "audio/ogg": ".ogg",
+    "audio/mp4": ".m4a",
+}
+# What mimetypes guesses for those extensions, where it differs
+SERVABLE_TYPES = frozenset(MEDIA_EXTENSIONS) | {"audio/x-wav", "video/webm"}
+
+# Keys written by store_upload: <sha256>.<ext> or <sha256>_<upload_type>_<size>.<fmt>
+_CONTENT_ADDRESSED = re.compile(r"^[0-9a-f]{64}(_[a-z]+_[a-z]+)?\.[a-z0-9]+$")
+
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+
+class MediaNotFound(Exception):
+    """Raised when a media path does not name a regular file under UPLOAD_DIR."""
+
+
+class RangeNotSatisfiable(Exception):
+    """Raised when a Range header cannot be served for the file size."""
+
+
+def resolve_media_path(path: str) -> Tuple[Path, os.stat_result]:
+    """Map a request path onto UPLOAD_DIR, refusing anything that escapes it."""
+    root = Path(settings.UPLOAD_DIR).resolve()
+    full = (root / path).resolve()
+    if root not in full.parents:
+        raise MediaNotFound(path)
+    try:
+        st = os.stat(full)
+    except (FileNotFoundError, NotADirectoryError):
+        raise MediaNotFound(path)
+    if not stat.S_ISREG(st.st_mode):
+        raise MediaNotFound(path)
+    return full, st
+
+
+def is_content_addressed(name: str) -> bool:
+    return bool(_CONTENT_ADDRESSED.match(name))
+
+
+def media_headers(full: Path, st: os.stat_result) -> dict:
+    """
+    Validators and caching headers for a media file.
+
+    Content-addressed files are never rewritten, so their name is a strong
+    ETag and they can be cached forever. Anything else (legacy uploads)
+    gets a weak mtime/size ETag and MEDIA_MAX_AGE.
+    """
+    if is_content_addressed(full.name):
+        etag = f'"{full.stem}"'
+        cache_control = IMMUTABLE_CACHE_CONTROL
+    else:
+        etag = f'W/"{int(st.st_mtime):x}-{st.st_size:x}"'
+        cache_control = f"public, max-age={settings.MEDIA_MAX_AGE}"
+    return {
+        "etag": etag,
+        "cache-control": cache_control,
+        "last-modified": formatdate(st.st_mtime, usegmt=True),
+        "accept-ranges": "bytes",
+        "x-content-type-options": "nosniff",
+    }
+
+
+def media_type_for(name: str) -> str:
+    """Content type to serve a stored file as; never one a browser would run (HTML, SVG, scripts)."""
+    guessed = mimetypes.guess_type(name)[0]
+    return guessed if guessed in SERVABLE_TYPES else "application/octet-stream"
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Weak comparison, as If-None-Match requires."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    bare = etag[2:] if etag.startswith("W/") else etag
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == bare:
+            return True
+    return False
+
+
+def if_range_matches(if_range: str, etag: str) -> bool:
+    """
+    Strong comparison, as If-Range requires: a weak validator on either
+    side, or a date, never matches, and the client gets the whole file.
+    """
+    if_range = if_range.strip()
+    return not if_range.startswith("W/") and not etag.startswith("W/") and if_range == etag
+
+
+def parse_range(header: Optional[str], size: int) -> Optional[Tuple[int, int]]:
+    """
+    Parse a single `bytes=` range into an inclusive (start, end).
+
+    Returns None when the whole file should be sent (no header, another
+    unit, or several ranges - serving all of it is allowed for those).
+    """
+    if not header:
+        return None
+    unit, _, spec = header.partition("=")
+    if unit.strip().lower() != "bytes" or "," in spec:
+        return None
+    first, sep, last = spec.strip().partition("-")
+    if not sep:
+        raise RangeNotSatisfiable(header)
+    try:
+        if first:
+            start = int(first)
+            end = int(last) if last else size - 1
+        else:
+            # Suffix range: the last N bytes
+            length = int(last)
+            if length <= 0:
+                raise RangeNotSatisfiable(header)
+            start, end = max(size - length, 0), size - 1
+    except ValueError:
+        raise RangeNotSatisfiable(header)
+    if start < 0 or start >= size or end < start:
+        raise RangeNotSatisfiable(header)
+    return start, min(end, size - 1)
+
+
+def accel_redirect_target(path: str) -> Optional[str]:
+    """Internal nginx location for a media path, or None when handoff is disabled."""
+    prefix = settings.MEDIA_ACCEL_REDIRECT_PREFIX
+    if not prefix:
+        return None
+    return prefix.rstrip("/") + "/" + path.lstrip("/")
+
+
+class FileRangeResponse(Response):
+    """206 response streaming one byte range of a file from a worker thread."""
+    chunk_size = 64 * 1024
+
+    def __init__(self, path: Path, start: int, end: int, size: int, headers: dict, media_type: Optional[str] = None):
+        self.path = path
+        self.start = start
+        self.end = end
+        headers = dict(headers)
+        headers["content-range"] = f"bytes {start}-{end}/{size}"
+        headers["content-length"] = str(end - start + 1)
+        super().__init__(status_code=206, headers=headers, media_type=media_type)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        await send({"type": "http.response.start", "status": self.status_code, "headers": self.raw_headers})
+        if scope["method"].upper() == "HEAD":
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+            return
+        remaining = self.end - self.start + 1
+        async with await anyio.open_file(self.path, mode="rb") as file:
+            await file.seek(self.start)
+            while remaining > 0:
+                chunk = await file.read(min(self.chunk_size, remaining))
+                if not chunk:
+                    break
+                remaining -= len(chunk)
+                await send({"type": "http.response.body", "body": chunk, "more_body": remaining > 0})
+        if remaining > 0:
+            # File shrank underneath us; end the body rather than hang the client
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
@@ -0,0 +1,58 @@
+"""Runtime metrics - sample in-process queues, sockets and caches into the Prometheus gauges."""
+import asyncio
+import logging
+from typing import Optional
+
+from .. import metrics
+from ..admission import admission
+from .analytics_service import analytics
+from .auth_service import hashing_stats
+from .cache import registered_caches
+from .upload_service import upload_queue_depth
+from .websocket_service import manager
+
+# Seconds between samples when each worker must publish its own values
+SAMPLE_INTERVAL = 5
+
+_task: Optional[asyncio.Task] = None
+
+
+def sample_runtime_metrics():
+    metrics.WEBSOCKET_CONNECTIONS.set(manager.connection_count())
+    metrics.ADMISSION_LIMIT.set(admission.limit)
+    metrics.WEBSOCKET_USERS.set(len(manager.active_connections))
+    metrics.QUEUE_DEPTH.labels("websocket_send").set(manager.queue_depth())
+    metrics.QUEUE_DEPTH.labels("analytics").set(analytics.pending)
+    metrics.QUEUE_DEPTH.labels("upload").set(upload_queue_depth())
+    metrics.QUEUE_DEPTH.labels("password_hash").set(hashing_stats.waiting)
+    for cache in registered_caches():
+        metrics.CACHE_HITS.labels(cache.name).set(cache.hits)
+        metrics.CACHE_MISSES.labels(cache.name).set(cache.misses)
+        metrics.CACHE_ENTRIES.labels(cache.name).set(len(cache))
+
+
+async def _run():
+    while True:
+        try:
+            sample_runtime_metrics()
+        except Exception as e:
+            logging.error(f"Runtime metrics sampling failed: {e}")
+        await asyncio.sleep(SAMPLE_INTERVAL)
+
+
+def start_sampler():
+    """
+    Sample periodically in multiprocess mode, where a scrape is answered by
+    one worker but reports every worker's gauges. A single process samples
+    at scrape time instead.
+    """
+    global _task
+    if metrics.MULTIPROCESS and _task is None:
+        _task = asyncio.create_task(_run())
+
+
+def stop_sampler():
+    global _task
+    if _task is not None:
+        _task.cancel()
+        _task = None
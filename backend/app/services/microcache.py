@@ -0,0 +1,66 @@
+"""Single-flight microcache for reads that are identical for every caller."""
+import asyncio
+from functools import partial
+from typing import Any, Awaitable, Callable, Hashable
+
+from fastapi.responses import ORJSONResponse, Response
+
+from ..config import settings
+from .cache import LRUCache
+
+_MISSING = object()
+
+
+class MicroCache:
+    """
+    Caches results for a few seconds and coalesces concurrent misses.
+
+    While a key is being computed, every other request for it awaits the
+    same task instead of running the queries again, so a burst of N
+    identical requests costs one computation per TTL per worker.
+    """
+
+    def __init__(self, name: str, ttl: float, maxsize: int):
+        self.cache = LRUCache(maxsize=maxsize, ttl=ttl, name=name)
+        self._inflight: dict = {}
+
+    async def get(self, key: Hashable, compute: Callable[[], Awaitable[Any]]) -> Any:
+        # In-flight first, so requests that join a computation aren't counted as misses
+        task = self._inflight.get(key)
+        if task is None:
+            value = self.cache.get(key, _MISSING)
+            if value is not _MISSING:
+                return value
+            task = asyncio.ensure_future(compute())
+            self._inflight[key] = task
+            task.add_done_callback(partial(self._settle, key))
+        # A caller that disconnects must not cancel the work others are waiting on
+        return await asyncio.shield(task)
+
+    def _settle(self, key: Hashable, task: asyncio.Future):
+        # A computation invalidated while running still answers its waiters, but isn't kept
+        if self._inflight.get(key) is not task:
+            return
+        del self._inflight[key]
+        # Failures reach the waiters but are not cached
+        if not task.cancelled() and task.exception() is None:
+            self.cache.set(key, task.result())
+
+    def invalidate(self, *keys: Hashable):
+        """Drop cached and in-flight results, so the next get() recomputes."""
+        for key in keys:
+            self.cache.pop(key)
+            self._inflight.pop(key, None)
+
+    async def response(self, key: Hashable, compute: Callable[[], Awaitable[Any]]) -> Response:
+        """JSON response for compute()'s result, rendered once per fill."""
+        async def render() -> bytes:
+            return ORJSONResponse(await compute()).body
+        return Response(await self.get(key, render), media_type="application/json")
+
+
+# Anonymous feed/blog pages, stories and trending users
+anonymous_reads = MicroCache("anonymous_reads", ttl=settings.MICROCACHE_TTL, maxsize=settings.MICROCACHE_SIZE)
+
+# Per-user story trays, keyed by viewer id
+story_trays = MicroCache("story_trays", ttl=settings.STORY_TRAY_TTL, maxsize=settings.STORY_TRAY_CACHE_SIZE)
@@ -0,0 +1,166 @@
+"""Bulk moderation - delete posts, blogs, comments or users in batches with their dependent data."""
+import asyncio
+from collections import Counter
+from datetime import datetime, timezone
+from typing import List, Optional
+from pymongo import UpdateOne
+
+from ..database import db
+from ..conditional import touched
+from .auth_service import revocations
+from .stats_service import platform_stats
+
+# Target -> collection and the field that names its author
+TARGETS = {
+    "posts": {"collection": "short_posts", "author_field": "author_id", "post_type": "post"},
+    "blogs": {"collection": "blog_posts", "author_field": "author_id", "post_type": "blog"},
+    "comments": {"collection": "comments", "author_field": "user_id"},
+    "users": {"collection": "users", "author_field": "id"},
+}
+
+# Ids per delete_many/bulk_write round trip
+BATCH_SIZE = 1000
+
+# Most items one request may act on; larger waves are handled in several calls
+MAX_ITEMS = 10000
+
+
+def _iso(value: datetime) -> str:
+    """created_at is stored as a UTC ISO string, which sorts like the datetime."""
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc).isoformat()
+
+
+def build_query(
+    target: str,
+    ids: List[str],
+    author_id: Optional[str] = None,
+    created_after: Optional[datetime] = None,
+    created_before: Optional[datetime] = None,
+) -> dict:
+    """Mongo filter for the items a moderation request selects; every criterion must hold."""
+    conditions = []
+    if ids:
+        conditions.append({"id": {"$in": ids}})
+    if author_id:
+        conditions.append({TARGETS[target]["author_field"]: author_id})
+    created = {}
+    if created_after:
+        created["$gte"] = _iso(created_after)
+    if created_before:
+        created["$lt"] = _iso(created_before)
+    if created:
+        conditions.append({"created_at": created})
+    return conditions[0] if len(conditions) == 1 else {"$and": conditions}
+
+
+async def _delete_posts(docs: List[dict], target: str) -> Counter:
+    spec = TARGETS[target]
+    ids = [d["id"] for d in docs]
+    deleted, likes, comments = await asyncio.gather(
+        db[spec["collection"]].delete_many({"id": {"$in": ids}}),
+        db.likes.delete_many({"post_id": {"$in": ids}, "post_type": spec["post_type"]}),
+        db.comments.delete_many({"post_id": {"$in": ids}, "post_type": spec["post_type"]}),
+    )
+    return Counter({target: deleted.deleted_count, "likes": likes.deleted_count, "comments": comments.deleted_count})
+
+
+async def _delete_comments(docs: List[dict], target: str) -> Counter:
+    deleted = await db.comments.delete_many({"id": {"$in": [d["id"] for d in docs]}})
+
+    # One counter update per parent, grouped by collection
+    per_parent = Counter((d["post_type"], d["post_id"]) for d in docs)
+    updates = {"post": [], "blog": []}
+    for (post_type, post_id), n in per_parent.items():
+        if post_type in updates:
+            updates[post_type].append(UpdateOne({"id": post_id}, {"$inc": {"comments_count": -n}, "$set": touched()}))
+    await asyncio.gather(*[
+        (db.short_posts if post_type == "post" else db.blog_posts).bulk_write(ops, ordered=False)
+        for post_type, ops in updates.items() if ops
+    ])
+    return Counter({"comments": deleted.deleted_count})
+
+
+async def _delete_users(docs: List[dict], target: str) -> Counter:
+    ids = [d["id"] for d in docs]
+    posts, blogs, comments, likes, *_ = await asyncio.gather(
+        db.short_posts.delete_many({"author_id": {"$in": ids}}),
+        db.blog_posts.delete_many({"author_id": {"$in": ids}}),
+        db.comments.delete_many({"user_id": {"$in": ids}}),
+        db.likes.delete_many({"user_id": {"$in": ids}}),
+        db.follows.delete_many({"$or": [{"follower_id": {"$in": ids}}, {"following_id": {"$in": ids}}]}),
+        db.notifications.delete_many({"$or": [{"user_id": {"$in": ids}}, {"actor_id": {"$in": ids}}]}),
+        db.stories.delete_many({"user_id": {"$in": ids}}),
+    )
+    deleted = await db.users.delete_many({"id": {"$in": ids}})
+    await revocations.revoke_many(ids)
+    return Counter({
+        "users": deleted.deleted_count,
+        "posts": posts.deleted_count,
+        "blogs": blogs.deleted_count,
+        "comments": comments.deleted_count,
+        "likes": likes.deleted_count,
+    })
+
+
+_DELETERS = {
+    "posts": _delete_posts,
+    "blogs": _delete_posts,
+    "comments": _delete_comments,
+    "users": _delete_users,
+}
+
+
+async def bulk_delete(
+    target: str,
+    admin_id: str,
+    ids: List[str],
+    author_id: Optional[str] = None,
+    created_after: Optional[datetime] = None,
+    created_before: Optional[datetime] = None,
+    dry_run: bool = False,
+) -> dict:
+    """
+    Delete every item a request selects, BATCH_SIZE ids per round trip.
+
+    Returns a status per item ("deleted", "matched" for dry runs,
+    "not_found", or "skipped" for the acting admin) and the number of
+    rows removed from each collection, dependants included.
+    """
+    spec = TARGETS[target]
+    query = build_query(target, ids, author_id, created_after, created_before)
+    projection = {"_id": 0, "id": 1}
+    if target == "comments":
+        projection.update({"post_id": 1, "post_type": 1})
+
+    docs = await db[spec["collection"]].find(query, projection).limit(MAX_ITEMS + 1).to_list(MAX_ITEMS + 1)
+    truncated = len(docs) > MAX_ITEMS
+    docs = docs[:MAX_ITEMS]
+
+    results = {item_id: "not_found" for item_id in ids}
+    if target == "users":
+        if any(d["id"] == admin_id for d in docs):
+            results[admin_id] = "skipped"
+        docs = [d for d in docs if d["id"] != admin_id]
+
+    removed = Counter()
+    if not dry_run:
+        for start in range(0, len(docs), BATCH_SIZE):
+            removed += await _DELETERS[target](docs[start:start + BATCH_SIZE], target)
+        await platform_stats.record(**{
+            name: -removed[name] for name in ("users", "posts", "blogs", "comments") if removed[name]
+        })
+
+    status = "matched" if dry_run else "deleted"
+    for d in docs:
+        results[d["id"]] = status
+
+    return {
+        "target": target,
+        "dry_run": dry_run,
+        "matched": len(docs),
+        "truncated": truncated,
+        "removed": dict(removed),
+        "results": results,
+    }
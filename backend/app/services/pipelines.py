@@ -0,0 +1,158 @@
+"""
+Aggregation pipelines for list endpoints.
+
+Each page is one aggregate: the page itself, then $lookup stages that
+join the author's current profile and the viewer's like, so the server
+does the per-row joins instead of the app issuing 1 + 2N queries.
+"""
+import asyncio
+from typing import AbstractSet, Dict, List, Optional
+
+from ..database import db
+from ..fieldsets import projection, wants
+from ..models import BlogPost, Comment, ShortPost
+from ..serialization import trusted
+
+CONTENT = {
+    "post": {"collection": "short_posts", "model": ShortPost},
+    "blog": {"collection": "blog_posts", "model": BlogPost},
+}
+
+# Keys of a feed item, by type; the feed is not backed by a response model
+FEED_ITEM_DEFAULTS = {
+    "post": {
+        "id": None, "author_id": None, "author_username": "", "author_avatar": "", "author_name": "",
+        "content": None, "likes_count": 0, "comments_count": 0, "created_at": None, "liked_by_user": False,
+    },
+    "blog": {
+        "id": None, "author_id": None, "author_username": "", "author_avatar": "", "author_name": "",
+        "title": None, "excerpt": "", "cover_image": "", "content": None, "tags": [],
+        "likes_count": 0, "comments_count": 0, "created_at": None, "liked_by_user": False,
+    },
+}
+
+
+def page_stages(query: dict, skip: int, limit: int, sort: Optional[dict] = None) -> List[dict]:
+    stages = [{"$match": query}]
+    if sort:
+        stages.append({"$sort": sort})
+    if skip:
+        stages.append({"$skip": skip})
+    stages.append({"$limit": limit})
+    return stages
+
+
+def author_stages(fields: Dict[str, str], local_field: str = "author_id") -> List[dict]:
+    """
+    Join the author from users (by `id`, indexed) and copy user fields onto
+    each document as {output: user_field}. Documents whose author is gone
+    keep their own (denormalized) value.
+    """
+    found = {"$gt": [{"$size": "$_author"}, 0]}
+    return [
+        {"$lookup": {"from": "users", "localField": local_field, "foreignField": "id", "as": "_author"}},
+        {"$addFields": {
+            output: {"$cond": [
+                found,
+                {"$ifNull": [{"$arrayElemAt": [f"$_author.{field}", 0]}, ""]},
+                {"$ifNull": [f"${output}", ""]},
+            ]}
+            for output, field in fields.items()
+        }},
+        {"$project": {"_author": 0}},
+    ]
+
+
+def viewer_like_stages(viewer_id: str, post_type: str) -> List[dict]:
+    """Set liked_by_user from the viewer's own likes only (likes: user_id, post_type, post_id)."""
+    return [
+        {"$lookup": {
+            "from": "likes",
+            "let": {"post_id": "$id"},
+            "pipeline": [
+                {"$match": {"user_id": viewer_id, "post_type": post_type, "$expr": {"$eq": ["$post_id", "$$post_id"]}}},
+                {"$limit": 1},
+                {"$project": {"_id": 1}},
+            ],
+            "as": "_liked",
+        }},
+        {"$addFields": {"liked_by_user": {"$gt": [{"$size": "$_liked"}, 0]}}},
+        {"$project": {"_liked": 0}},
+    ]
+
+
+def _content_pipeline(
+    kind: str,
+    query: dict,
+    skip: int,
+    limit: int,
+    selected: Optional[AbstractSet[str]],
+    viewer_id: Optional[str],
+    authors: Dict[str, str],
+) -> List[dict]:
+    pipeline = page_stages(query, skip, limit, {"created_at": -1})
+    # Trim before joining, so unselected bodies never leave the first stage
+    fields = projection(selected, "author_id", "created_at")
+    if fields:
+        pipeline.append({"$project": fields})
+    wanted = {output: field for output, field in authors.items() if wants(selected, output)}
+    if wanted:
+        pipeline += author_stages(wanted)
+    if viewer_id and wants(selected, "liked_by_user"):
+        pipeline += viewer_like_stages(viewer_id, kind)
+    return pipeline
+
+
+async def content_page(
+    kind: str,
+    query: dict,
+    skip: int,
+    limit: int,
+    selected: Optional[AbstractSet[str]] = None,
+    viewer_id: Optional[str] = None,
+) -> List[dict]:
+    """A page of posts or blogs shaped like their response model (or the selected fields), newest first."""
+    spec = CONTENT[kind]
+    pipeline = _content_pipeline(kind, query, skip, limit, selected, viewer_id, {"author_avatar": "avatar"})
+    docs = await db[spec["collection"]].aggregate(pipeline).to_list(limit)
+    return [trusted(spec["model"], doc, selected) for doc in docs]
+
+
+def _feed_item(kind: str, doc: dict, selected: Optional[AbstractSet[str]]) -> dict:
+    item = {"type": kind}
+    for key, default in FEED_ITEM_DEFAULTS[kind].items():
+        # type and created_at always go out: clients tell items apart and order them by them
+        if selected is None or key in selected or key == "created_at":
+            value = doc.get(key, default)
+            item[key] = list(value) if isinstance(value, list) else value
+    return item
+
+
+async def feed_page(
+    query: dict,
+    skip: int,
+    limit: int,
+    post_fields: Optional[AbstractSet[str]],
+    blog_fields: Optional[AbstractSet[str]],
+    viewer_id: Optional[str],
+) -> List[dict]:
+    """Newest posts and blogs merged into one page; both pages are fetched concurrently."""
+    authors = {"author_avatar": "avatar", "author_name": "name", "author_username": "username"}
+    posts, blogs = await asyncio.gather(*[
+        db[CONTENT[kind]["collection"]].aggregate(
+            _content_pipeline(kind, query, skip, limit, fields, viewer_id, authors)
+        ).to_list(limit)
+        for kind, fields in (("post", post_fields), ("blog", blog_fields))
+    ])
+    items = [_feed_item("post", doc, post_fields) for doc in posts]
+    items += [_feed_item("blog", doc, blog_fields) for doc in blogs]
+    items.sort(key=lambda item: item["created_at"], reverse=True)
+    return items[:limit]
+
+
+async def comment_page(post_type: str, post_id: str, limit: int = 100) -> List[dict]:
+    """Comments on a post or blog with each commenter's current username and avatar."""
+    pipeline = page_stages({"post_id": post_id, "post_type": post_type}, 0, limit)
+    pipeline += author_stages({"username": "username", "user_avatar": "avatar"}, local_field="user_id")
+    docs = await db.comments.aggregate(pipeline).to_list(limit)
+    return [trusted(Comment, doc) for doc in docs]
@@ -0,0 +1,33 @@
+"""Profile pieces shared by the per-section endpoints and the composite profile page."""
+from datetime import datetime, timezone
+from typing import List
+
+from ..database import db
+from ..models import Story
+from .websocket_service import manager
+
+
+async def is_following(follower_id: str, user_id: str) -> bool:
+    following = await db.follows.find_one({"follower_id": follower_id, "following_id": user_id}, {"_id": 1})
+    return bool(following)
+
+
+async def active_stories(user_id: str) -> List[dict]:
+    """A user's unexpired stories, newest first."""
+    now = datetime.now(timezone.utc).isoformat()
+    stories = await db.stories.find({
+        "user_id": user_id,
+        "expires_at": {"$gt": now}
+    }).sort("created_at", -1).to_list(100)
+    return [Story(**s).dict() for s in stories]
+
+
+def online_status(user: dict) -> dict:
+    """Live status from this worker's connections, else what the user document last recorded."""
+    status = manager.get_user_status(user["id"])
+    if not status["online"]:
+        status = {
+            "online": user.get("online", False),
+            "last_seen": user.get("last_seen")
+        }
+    return status
@@ -0,0 +1,60 @@
+"""Platform statistics - running totals maintained by the write paths."""
+import logging
+from datetime import datetime
+from typing import Optional
+from pymongo.errors import PyMongoError
+
+from ..database import db
+from .analytics_service import analytics
+
+# Counter name -> collection it mirrors
+COUNTERS = {
+    "users": "users",
+    "posts": "short_posts",
+    "blogs": "blog_posts",
+    "comments": "comments",
+}
+
+# Counter name -> analytics metric its creations are tracked as
+CREATION_METRICS = {"users": "signups", "posts": "posts", "blogs": "blogs", "comments": "comments"}
+
+TOTALS_ID = "totals"
+
+
+class PlatformStats:
+    """
+    Counters in the platform_stats collection.
+
+    The totals document is adjusted on every create and delete so the
+    admin dashboard reads one document instead of counting collections;
+    creations are also tracked as analytics events.
+    """
+
+    async def record(self, at: Optional[datetime] = None, **deltas: int):
+        """Apply counter deltas, e.g. record(posts=-1, comments=-3)."""
+        deltas = {name: n for name, n in deltas.items() if n}
+        if not deltas:
+            return
+        for name, n in deltas.items():
+            if n > 0:
+                analytics.track(CREATION_METRICS[name], n, at)
+        try:
+            await db.platform_stats.update_one({"_id": TOTALS_ID}, {"$inc": deltas}, upsert=True)
+        except PyMongoError as e:
+            # Statistics never fail the write that triggered them
+            logging.error(f"Failed to record platform stats {deltas}: {e}")
+
+    async def seed(self):
+        """Create the totals document from estimated collection counts if it is missing."""
+        if await db.platform_stats.find_one({"_id": TOTALS_ID}, {"_id": 1}):
+            return
+        totals = {name: await db[collection].estimated_document_count() for name, collection in COUNTERS.items()}
+        await db.platform_stats.update_one({"_id": TOTALS_ID}, {"$setOnInsert": totals}, upsert=True)
+        logging.info(f"Seeded platform stats: {totals}")
+
+    async def totals(self) -> dict:
+        doc = await db.platform_stats.find_one({"_id": TOTALS_ID}) or {}
+        return {name: max(doc.get(name, 0), 0) for name in COUNTERS}
+
+
+platform_stats = PlatformStats()
@@ -0,0 +1,323 @@
+"""Media storage backends and content-addressed upload records."""
+import asyncio
+import logging
+import mimetypes
+import shutil
+import sys
+import tempfile
+import uuid
+from abc import ABC, abstractmethod
+from datetime import datetime, timezone, timedelta
+from pathlib import Path
+from typing import Optional
+import jwt
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+
+from ..config import settings
+from ..database import db
+from .upload_service import DeferredCleanup, SpooledUpload, run_upload
+from .image_service import wants_variants, render_variants
+from .media_service import MEDIA_EXTENSIONS
+
+# Add backend directory to path for cloudinary_utils
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+
+class StorageBackend(ABC):
+    """Where uploaded bytes end up. save() blocks and runs on the upload pool."""
+    name = ""
+
+    supports_direct_upload = False
+
+    @abstractmethod
+    def save(self, path: str, key: str, folder: str, resource_type: str = "image") -> dict:
+        """Store the file at `path` under `key`; returns its url and public_id."""
+
+
+class LocalStorage(StorageBackend):
+    """Files under UPLOAD_DIR, served from MEDIA_BASE_URL."""
+    name = "local"
+
+    def __init__(self, root: str, base_url: str):
+        self.root = Path(root)
+        self.base_url = base_url.rstrip("/")
+        self.root.mkdir(parents=True, exist_ok=True)
+
+    def save(self, path: str, key: str, folder: str, resource_type: str = "image") -> dict:
+        dest = self.root / key
+        if not dest.exists():
+            shutil.move(path, dest)
+        return {"url": f"{self.base_url}/{key}", "public_id": key}
+
+
+class CloudinaryStorage(StorageBackend):
+    """Authenticated uploads through cloudinary_utils."""
+    name = "cloudinary"
+    supports_direct_upload = True
+
+    def save(self, path: str, key: str, folder: str, resource_type: str = "image") -> dict:
+        from cloudinary_utils import upload_to_cloudinary
+
+        result = upload_to_cloudinary(
+            path, key, folder=folder, timeout=settings.UPLOAD_TIMEOUT, resource_type=resource_type
+        )
+        return {"url": result["url"], "public_id": result["public_id"]}
+
+    def sign_upload(self, params: dict, resource_type: str) -> dict:
+        from cloudinary_utils import sign_upload_params
+        return sign_upload_params(params, resource_type)
+
+    def verify_upload(self, public_id: str, version, signature: str) -> bool:
+        from cloudinary_utils import verify_upload_signature
+        return verify_upload_signature(public_id, version, signature)
+
+    def asset_info(self, public_id: str, resource_type: str) -> Optional[dict]:
+        from cloudinary_utils import get_resource_info
+        return get_resource_info(public_id, resource_type)
+
+    def asset_url(self, public_id: str, version, fmt: Optional[str], resource_type: str) -> str:
+        from cloudinary_utils import build_asset_url
+        return build_asset_url(public_id, version, fmt, resource_type)
+
+    def delete(self, public_id: str) -> bool:
+        from cloudinary_utils import delete_from_cloudinary
+        return delete_from_cloudinary(public_id)
+
+
+_backend = None
+
+
+def get_storage() -> StorageBackend:
+    """Return the configured storage backend (STORAGE_BACKEND=cloudinary|local)."""
+    global _backend
+    if _backend is None:
+        if settings.STORAGE_BACKEND == "local":
+            _backend = LocalStorage(settings.UPLOAD_DIR, settings.MEDIA_BASE_URL)
+        else:
+            _backend = CloudinaryStorage()
+    return _backend
+
+
+async def _add_reference(content_hash: str):
+    return await db.media.find_one_and_update(
+        {"hash": content_hash},
+        {
+            "$inc": {"ref_count": 1},
+            "$set": {"last_referenced_at": datetime.now(timezone.utc).isoformat()},
+        },
+        projection={"_id": 0},
+        return_document=ReturnDocument.AFTER,
+    )
+
+
+async def _store_variants(spooled: SpooledUpload, upload_type: str, folder: str) -> dict:
+    """Render resized variants for an upload type and store each one."""
+    backend = get_storage()
+    out_dir = tempfile.mkdtemp(prefix="variants-")
+    files = DeferredCleanup(lambda: shutil.rmtree(out_dir, ignore_errors=True))
+    try:
+        rendered = await render_variants(spooled.path, out_dir, upload_type)
+        stored = await asyncio.gather(*[
+            run_upload(
+                backend.save, r["path"],
+                f"{spooled.sha256}_{upload_type}_{r['name']}.{r['format']}", folder, files=files
+            )
+            for r in rendered
+        ])
+        return {
+            f"{r['name']}.{r['format']}": {"url": s["url"], "width": r["width"], "height": r["height"]}
+            for r, s in zip(rendered, stored)
+        }
+    except Exception as e:
+        # Variants are an optimization; the original upload still succeeds
+        logging.error(f"Image variant generation failed for {spooled.sha256}: {e}")
+        return {}
+    finally:
+        files.release()
+
+
+async def store_upload(
+    spooled: SpooledUpload,
+    folder: str,
+    user_id: str,
+    resource_type: str = "image",
+    upload_type: Optional[str] = None
+) -> dict:
+    """
+    Store an upload keyed by its content hash.
+
+    Bytes that were already uploaded short-circuit to the existing media
+    record without touching the backend; every upload adds a reference
+    so unreferenced media can be garbage collected later. Image uploads
+    also get resized variants per upload_type, recorded under
+    media.variants.<upload_type>.
+    """
+    content_hash = f"sha256:{spooled.sha256}"
+    make_variants = wants_variants(upload_type, spooled.content_type)
+    existing = await _add_reference(content_hash)
+    if existing and (not make_variants or upload_type in existing.get("variants", {})):
+        existing["deduplicated"] = True
+        return existing
+
+    # Variants are rendered from the spooled file before the backend may move it
+    variants = await _store_variants(spooled, upload_type, folder) if make_variants else {}
+
+    if existing:
+        if variants:
+            await db.media.update_one({"hash": content_hash}, {"$set": {f"variants.{upload_type}": variants}})
+            existing.setdefault("variants", {})[upload_type] = variants
+        existing["deduplicated"] = True
+        return existing
+
+    backend = get_storage()
+    # The extension decides how the file is served, so it never comes from the client's filename
+    key = spooled.sha256 + MEDIA_EXTENSIONS.get(spooled.content_type, ".bin")
+    stored = await run_upload(backend.save, spooled.path, key, folder, resource_type, files=spooled.files)
+
+    now = datetime.now(timezone.utc).isoformat()
+    media = {
+        "hash": content_hash,
+        "backend": backend.name,
+        "url": stored["url"],
+        "public_id": stored["public_id"],
+        "folder": folder,
+        "content_type": spooled.content_type,
+        "size": spooled.size,
+        "uploaded_by": user_id,
+        "ref_count": 1,
+        "variants": {upload_type: variants} if variants else {},
+        "created_at": now,
+        "last_referenced_at": now,
+    }
+    try:
+        await db.media.insert_one(media)
+    except DuplicateKeyError:
+        # Same bytes uploaded concurrently - keep the record that won
+        existing = await _add_reference(content_hash)
+        existing["deduplicated"] = True
+        return existing
+
+    media.pop("_id", None)
+    media["deduplicated"] = False
+    return media
+
+
+class DirectUploadError(Exception):
+    """Raised when a direct upload cannot be signed or its completion is invalid."""
+
+
+# Formats a signed image upload may contain
+DIRECT_IMAGE_FORMATS = "jpg,jpeg,png,webp,gif,avif"
+
+
+def begin_direct_upload(user_id: str, folder: str, resource_type: str = "image") -> dict:
+    """
+    Issue signed parameters for a client-to-storage upload.
+
+    The client posts its file with `fields` straight to `upload_url`, then
+    calls the completion endpoint with the storage response and `intent`,
+    a short-lived token that binds the upload to this user and public_id.
+    """
+    backend = get_storage()
+    if not backend.supports_direct_upload:
+        raise DirectUploadError(f"Direct uploads are not supported by the {backend.name} storage backend")
+
+    public_id = uuid.uuid4().hex
+    params = {"folder": folder, "public_id": public_id, "timestamp": int(datetime.now(timezone.utc).timestamp())}
+    if resource_type == "image":
+        params["allowed_formats"] = DIRECT_IMAGE_FORMATS
+    signed = backend.sign_upload(params, resource_type)
+
+    expires_at = datetime.now(timezone.utc) + timedelta(seconds=settings.DIRECT_UPLOAD_TTL)
+    signed["intent"] = jwt.encode(
+        {
+            "sub": user_id,
+            "typ": "upload",
+            "jti": uuid.uuid4().hex,
+            "pid": f"{folder}/{public_id}",
+            "folder": folder,
+            "rt": resource_type,
+            "exp": expires_at,
+        },
+        settings.SECRET_KEY,
+        algorithm=settings.ALGORITHM,
+    )
+    signed["expires_at"] = expires_at.isoformat()
+    return signed
+
+
+async def complete_direct_upload(user_id: str, completion: dict) -> dict:
+    """Verify a finished direct upload and record it like a proxied one."""
+    try:
+        intent = jwt.decode(completion["intent"], settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
+    except jwt.InvalidTokenError:
+        raise DirectUploadError("Upload intent is invalid or expired")
+    if intent.get("typ") != "upload" or intent.get("sub") != user_id:
+        raise DirectUploadError("Upload intent does not belong to this user")
+    if not intent.get("jti"):
+        raise DirectUploadError("Upload intent is invalid or expired")
+
+    public_id = completion["public_id"]
+    version = completion["version"]
+    if public_id != intent["pid"]:
+        raise DirectUploadError("Upload does not match its intent")
+
+    backend = get_storage()
+    if not await run_upload(backend.verify_upload, public_id, version, completion["signature"]):
+        raise DirectUploadError("Storage signature verification failed")
+
+    # The signature covers only public_id and version; everything else comes from storage itself
+    info = await run_upload(backend.asset_info, public_id, intent["rt"])
+    if not info:
+        raise DirectUploadError("Uploaded asset was not found in storage")
+
+    # Each intent completes once, so a replay cannot add references or reach the dedupe below
+    try:
+        await db.upload_intents.insert_one({
+            "jti": intent["jti"],
+            "user_id": user_id,
+            "expires_at": datetime.fromtimestamp(intent["exp"], timezone.utc),
+        })
+    except DuplicateKeyError:
+        raise DirectUploadError("Upload intent was already used")
+
+    # Storage etags are MD5s of the bytes, so duplicates still collapse to one record
+    content_hash = f"md5:{info['etag']}" if info.get("etag") else f"{backend.name}:{public_id}"
+    existing = await _add_reference(content_hash)
+    if existing:
+        # Only a second copy of stored bytes is removed, never the asset the record points to
+        if existing.get("public_id") != public_id:
+            try:
+                await run_upload(backend.delete, public_id)
+            except Exception as e:
+                logging.error(f"Failed to remove duplicate direct upload {public_id}: {e}")
+        existing["deduplicated"] = True
+        return existing
+
+    now = datetime.now(timezone.utc).isoformat()
+    media = {
+        "hash": content_hash,
+        "backend": backend.name,
+        "url": backend.asset_url(public_id, version, info.get("format"), intent["rt"]),
+        "public_id": public_id,
+        "folder": intent["folder"],
+        "content_type": mimetypes.guess_type(f"upload.{info.get('format')}")[0] or "",
+        "size": info.get("bytes"),
+        "uploaded_by": user_id,
+        "ref_count": 1,
+        "variants": {},
+        "direct": True,
+        "created_at": now,
+        "last_referenced_at": now,
+    }
+    try:
+        await db.media.insert_one(media)
+    except DuplicateKeyError:
+        existing = await _add_reference(content_hash)
+        existing["deduplicated"] = True
+        return existing
+
+    media.pop("_id", None)
+    media["deduplicated"] = False
+    return media
@@ -0,0 +1,36 @@
+"""Story tray invalidation across workers."""
+from datetime import datetime, timedelta, timezone
+from typing import Iterable
+
+from ..config import settings
+from ..database import db
+from .microcache import story_trays
+
+# Allowance for clock differences between app hosts when comparing change times
+CLOCK_SKEW = timedelta(seconds=1)
+
+
+async def tray_changed(user_id: str):
+    """
+    Record that trays showing this user are out of date: their stories
+    changed, or (as a viewer) what they follow or have seen did.
+
+    This worker drops the user's own tray at once; every worker checks
+    the record before serving a cached tray (see tray_changed_since).
+    """
+    story_trays.invalidate(user_id)
+    now = datetime.now(timezone.utc)
+    await db.tray_changes.update_one(
+        {"_id": user_id},
+        # Only needed while a tray built before it could still be cached
+        {"$set": {"changed_at": now, "expires_at": now + timedelta(seconds=settings.STORY_TRAY_TTL) + CLOCK_SKEW}},
+        upsert=True,
+    )
+
+
+async def tray_changed_since(user_ids: Iterable[str], built_at: datetime) -> bool:
+    """Whether any of these users changed after a tray was built, in one _id lookup."""
+    changed = await db.tray_changes.find_one(
+        {"_id": {"$in": list(user_ids)}, "changed_at": {"$gt": built_at - CLOCK_SKEW}}, {"_id": 1}
+    )
+    return changed is not None
@@ -0,0 +1,142 @@
+"""Upload pipeline - spool request files to disk in chunks and push them to storage off the event loop."""
+import asyncio
+import hashlib
+import os
+import tempfile
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Optional
+from fastapi import UploadFile
+
+from ..config import settings
+
+# Remote uploads are blocking SDK calls; they get their own bounded pool.
+_upload_executor = ThreadPoolExecutor(
+    max_workers=settings.UPLOAD_WORKERS,
+    thread_name_prefix="upload",
+)
+
+# Storage calls submitted to the pool and not yet finished
+_pending_uploads = 0
+_pending_lock = threading.Lock()
+
+
+class UploadTooLarge(Exception):
+    """Raised when an upload exceeds MAX_FILE_SIZE while being read."""
+
+
+class DeferredCleanup:
+    """
+    Runs a cleanup once it was requested and every storage call reading
+    the files has finished.
+
+    A call that timed out is still running on its upload thread, so its
+    files must outlive the request that gave up on it.
+    """
+
+    def __init__(self, cleanup: Callable[[], None]):
+        self._cleanup = cleanup
+        self._pending = 0
+        self._released = False
+        self._lock = threading.Lock()
+
+    def attach(self, future: Future):
+        with self._lock:
+            self._pending += 1
+        future.add_done_callback(self._finished)
+
+    def _finished(self, future: Future):
+        with self._lock:
+            self._pending -= 1
+            run = self._released and not self._pending
+        if run:
+            self._cleanup()
+
+    def release(self):
+        with self._lock:
+            self._released = True
+            run = not self._pending
+        if run:
+            self._cleanup()
+
+
+class SpooledUpload:
+    """A request file copied to a temporary path, with its size and content hash."""
+
+    def __init__(self, path: str, size: int, sha256: str, filename: str, content_type: str):
+        self.path = path
+        self.size = size
+        self.sha256 = sha256
+        self.filename = filename
+        self.content_type = content_type
+        self.files = DeferredCleanup(self._unlink)
+
+    def _unlink(self):
+        try:
+            os.unlink(self.path)
+        except FileNotFoundError:
+            pass
+
+    def cleanup(self):
+        """Delete the file, or once the storage calls still reading it are done."""
+        self.files.release()
+
+
+def _write_chunk(handle, digest, chunk: bytes):
+    digest.update(chunk)
+    handle.write(chunk)
+
+
+async def spool_upload(file: UploadFile, max_size: int = None) -> SpooledUpload:
+    """Copy an upload to a temp file chunk by chunk, enforcing the size limit as it goes."""
+    max_size = settings.MAX_FILE_SIZE if max_size is None else max_size
+    loop = asyncio.get_running_loop()
+    suffix = os.path.splitext(file.filename or "")[1]
+    handle = tempfile.NamedTemporaryFile(delete=False, suffix=suffix)
+    digest = hashlib.sha256()
+    size = 0
+    try:
+        while True:
+            chunk = await file.read(settings.UPLOAD_CHUNK_SIZE)
+            if not chunk:
+                break
+            size += len(chunk)
+            if size > max_size:
+                raise UploadTooLarge(f"File exceeds {max_size} bytes")
+            await loop.run_in_executor(None, _write_chunk, handle, digest, chunk)
+        handle.close()
+    except BaseException:
+        handle.close()
+        os.unlink(handle.name)
+        raise
+
+    return SpooledUpload(handle.name, size, digest.hexdigest(), file.filename or "", file.content_type or "")
+
+
+def upload_queue_depth() -> int:
+    """Storage calls submitted to the upload pool and not yet finished, queued or running."""
+    return _pending_uploads
+
+
+def _upload_finished(future: Future):
+    global _pending_uploads
+    with _pending_lock:
+        _pending_uploads -= 1
+
+
+async def run_upload(fn, *args, files: Optional[DeferredCleanup] = None, **kwargs):
+    """
+    Run a blocking storage call on the upload pool with UPLOAD_TIMEOUT.
+
+    The timeout only stops waiting: the call runs on until it returns, so
+    `files` it reads are cleaned up after it rather than under it.
+    """
+    global _pending_uploads
+    with _pending_lock:
+        _pending_uploads += 1
+    future = _upload_executor.submit(fn, *args, **kwargs)
+    # Fires when the thread is done (or the call was cancelled before it started)
+    future.add_done_callback(_upload_finished)
+    if files is not None:
+        files.attach(future)
+    return await asyncio.wait_for(asyncio.wrap_future(future), timeout=settings.UPLOAD_TIMEOUT)
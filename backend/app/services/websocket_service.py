@@ -1,80 +1,275 @@
 """WebSocket connection manager for real-time notifications and messaging."""
+import asyncio
 import json
 import logging
-from typing import Dict
+from collections import deque
+from typing import Dict, Optional, Set, Union
 from datetime import datetime, timezone
-from fastapi import WebSocket
+from fastapi import WebSocket, WebSocketDisconnect
+
+from ..config import settings
+from .ws_codec import Frame, negotiate_codec
+
+# Frames that skip the batching window and go out as soon as the writer runs
+PRIORITY_TYPES = {"new_message", "pong"}
+
+
+def _coalesce_key(message: dict) -> Optional[tuple]:
+    """Return the merge key for presence frames, None for frames that must be delivered."""
+    message_type = message.get("type")
+    if message_type == "user_status":
+        return ("user_status", message.get("user_id"))
+    if message_type == "typing":
+        return ("typing", message.get("conversation_id"), message.get("user_id"))
+    return None
+
+
+class ClientConnection:
+    """
+    A single WebSocket with its own bounded outbound queue and writer task.
+
+    Queue policy:
+    - presence frames (user_status, typing) are merged: a newer frame replaces
+      the queued one for the same user/conversation instead of being appended
+    - when the queue is full, the oldest presence frame is dropped to make room
+    - if only undroppable frames are queued the client is too slow, so the
+      socket is closed (1013) and the client reconnects and resyncs over REST
+
+    Delivery: normal frames wait a short coalescing window and go out together
+    as one `batch` frame; priority frames (direct messages) skip the window.
+    """
+
+    def __init__(self, user_id: str, websocket: WebSocket, max_queue: int, codec):
+        self.user_id = user_id
+        self.websocket = websocket
+        self.codec = codec
+        self.max_queue = max_queue
+        self.closed = False
+        self.dropped = 0
+        self._frames: deque = deque()
+        self._priority: deque = deque()
+        self._pending: Dict[tuple, list] = {}
+        self._ready = asyncio.Event()
+        self._priority_ready = asyncio.Event()
+        self.batch_window = settings.WS_BATCH_WINDOW_MS / 1000
+        self.batch_max_events = settings.WS_BATCH_MAX_EVENTS
+        self._writer: Optional[asyncio.Task] = None
+        self._closer: Optional[asyncio.Task] = None
+
+    @property
+    def queue_depth(self) -> int:
+        return len(self._frames) + len(self._priority)
+
+    def start(self):
+        """Start the writer task that drains the outbound queue."""
+        self._writer = asyncio.create_task(self._write_loop())
+
+    def send(self, frame: Union[Frame, dict]) -> bool:
+        """Queue a frame for delivery without waiting on the socket."""
+        if self.closed:
+            return False
+        if not isinstance(frame, Frame):
+            frame = Frame(frame)
+
+        key = _coalesce_key(frame.message)
+        if key is not None and key in self._pending:
+            self._pending[key][1] = frame
+            return True
+
+        if self.queue_depth >= self.max_queue and not self._drop_oldest_presence():
+            logging.warning(f"WebSocket send queue full for user {self.user_id}, closing slow connection")
+            self.close(code=1013)
+            return False
+
+        if frame.message.get("type") in PRIORITY_TYPES:
+            self._priority.append(frame)
+            self._priority_ready.set()
+        else:
+            entry = [key, frame]
+            self._frames.append(entry)
+            if key is not None:
+                self._pending[key] = entry
+        self._ready.set()
+        return True
+
+    def _drop_oldest_presence(self) -> bool:
+        for index, entry in enumerate(self._frames):
+            if entry[0] is not None:
+                del self._frames[index]
+                del self._pending[entry[0]]
+                self.dropped += 1
+                return True
+        return False
+
+    async def _write_loop(self):
+        try:
+            while True:
+                await self._ready.wait()
+                self._ready.clear()
+                await self._flush_priority()
+                if self._frames and self.batch_window > 0:
+                    # Coalescing window, cut short if a priority frame arrives
+                    try:
+                        await asyncio.wait_for(self._priority_ready.wait(), self.batch_window)
+                    except asyncio.TimeoutError:
+                        pass
+                    await self._flush_priority()
+                await self._flush_frames()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logging.info(f"WebSocket writer stopped for user {self.user_id}: {e}")
+            self.closed = True
+
+    async def _flush_priority(self):
+        self._priority_ready.clear()
+        while self._priority:
+            await self._send_payload(self._priority.popleft().encode(self.codec))
+
+    async def _flush_frames(self):
+        while self._frames:
+            payloads = []
+            while self._frames and len(payloads) < self.batch_max_events:
+                key, frame = self._frames.popleft()
+                if key is not None:
+                    self._pending.pop(key, None)
+                payloads.append(frame.encode(self.codec))
+            if len(payloads) == 1:
+                await self._send_payload(payloads[0])
+            else:
+                await self._send_payload(self.codec.encode_batch(payloads))
+
+    async def _send_payload(self, payload):
+        if self.codec.binary:
+            await self.websocket.send_bytes(payload)
+        else:
+            await self.websocket.send_text(payload)
+
+    async def receive(self) -> dict:
+        """Receive and decode one client frame."""
+        message = await self.websocket.receive()
+        if message["type"] == "websocket.disconnect":
+            raise WebSocketDisconnect(message.get("code", 1000))
+        if message.get("bytes") is not None:
+            return self.codec.decode(message["bytes"])
+        text = message.get("text") or ""
+        if text == "ping":
+            return {"type": "ping"}
+        return json.loads(text)
+
+    def stop(self):
+        """Stop the writer task; the socket itself is left to its owner."""
+        self.closed = True
+        if self._writer and not self._writer.done():
+            self._writer.cancel()
+
+    def close(self, code: int = 1000):
+        """Stop the writer and close the socket in the background."""
+        if self._closer is not None:
+            return
+        self.stop()
+        self._closer = asyncio.create_task(self._close_socket(code))
+
+    async def _close_socket(self, code: int):
+        try:
+            await self.websocket.close(code=code)
+        except Exception:
+            pass
 
 
 class ConnectionManager:
     """Manages WebSocket connections for real-time features."""
-    
+
     def __init__(self):
-        self.active_connections: Dict[str, WebSocket] = {}
+        self.active_connections: Dict[str, Set[ClientConnection]] = {}
         self.user_status: Dict[str, dict] = {}
         self.typing_status: Dict[str, dict] = {}
-    
-    async def connect(self, user_id: str, websocket: WebSocket):
-        """Connect a user's WebSocket."""
-        await websocket.accept()
-        self.active_connections[user_id] = websocket
-        self.user_status[user_id] = {
-            "online": True,
-            "last_seen": datetime.now(timezone.utc).isoformat()
-        }
-        
-        # Broadcast user online status
-        await self.broadcast({
-            "type": "user_status",
-            "user_id": user_id,
-            "online": True,
-            "last_seen": self.user_status[user_id]["last_seen"]
-        })
-        
+
+    async def connect(self, user_id: str, websocket: WebSocket) -> ClientConnection:
+        """Accept a WebSocket and register it alongside the user's other sockets."""
+        codec, subprotocol = negotiate_codec(websocket)
+        await websocket.accept(subprotocol=subprotocol)
+        connection = ClientConnection(user_id, websocket, settings.WS_SEND_QUEUE_SIZE, codec)
+        connection.start()
+
+        first_connection = not self.active_connections.get(user_id)
+        self.active_connections.setdefault(user_id, set()).add(connection)
+
+        if first_connection:
+            self.user_status[user_id] = {
+                "online": True,
+                "last_seen": datetime.now(timezone.utc).isoformat()
+            }
+
+            # Broadcast user online status
+            await self.broadcast({
+                "type": "user_status",
+                "user_id": user_id,
+                "online": True,
+                "last_seen": self.user_status[user_id]["last_seen"]
+            })
+
         logging.info(f"WebSocket connected for user: {user_id}")
-    
-    def disconnect(self, user_id: str):
-        """Disconnect a user's WebSocket."""
-        if user_id in self.active_connections:
+        return connection
+
+    def disconnect(self, connection: ClientConnection) -> bool:
+        """Unregister a socket. Returns True when it was the user's last one."""
+        connection.stop()
+        user_id = connection.user_id
+        connections = self.active_connections.get(user_id)
+        if connections is not None:
+            connections.discard(connection)
+            if connections:
+                return False
             del self.active_connections[user_id]
+
         if user_id in self.user_status:
             self.user_status[user_id]["online"] = False
             self.user_status[user_id]["last_seen"] = datetime.now(timezone.utc).isoformat()
-    
+        return True
+
+    def _deliver(self, connection: ClientConnection, frame: Frame):
+        if not connection.send(frame):
+            self.disconnect(connection)
+
     async def send_notification(self, user_id: str, message: dict):
-        """Send a notification to a specific user."""
-        if user_id in self.active_connections:
-            try:
-                await self.active_connections[user_id].send_json(message)
-            except Exception as e:
-                logging.error(f"Error sending notification to {user_id}: {e}")
-                self.disconnect(user_id)
-    
+        """Send a notification to every socket of a specific user."""
+        frame = Frame(message)
+        for connection in list(self.active_connections.get(user_id, ())):
+            self._deliver(connection, frame)
+
     async def broadcast(self, message: dict, exclude_user: str = None):
-        """Broadcast a message to all connected users."""
-        for user_id, connection in list(self.active_connections.items()):
+        """Broadcast a message to all connected users, encoding it once per codec."""
+        frame = Frame(message)
+        for user_id, connections in list(self.active_connections.items()):
             if exclude_user and user_id == exclude_user:
                 continue
-            try:
-                await connection.send_json(message)
-            except Exception:
-                self.disconnect(user_id)
-    
+            for connection in list(connections):
+                self._deliver(connection, frame)
+
     def is_online(self, user_id: str) -> bool:
         """Check if user is currently online."""
-        return user_id in self.active_connections
-    
+        return bool(self.active_connections.get(user_id))
+
+    def connection_count(self) -> int:
+        """Number of open sockets across all users."""
+        return sum(len(connections) for connections in self.active_connections.values())
+
+    def queue_depth(self) -> int:
+        """Frames waiting to be written across all sockets."""
+        return sum(c.queue_depth for connections in self.active_connections.values() for c in connections)
+
     def get_user_status(self, user_id: str) -> dict:
         """Get user's online status and last seen."""
         return self.user_status.get(user_id, {"online": False, "last_seen": None})
-    
+
     async def set_typing(self, user_id: str, conversation_id: str, typing: bool):
         """Set typing status for a user in a conversation."""
         if conversation_id not in self.typing_status:
             self.typing_status[conversation_id] = {}
-        
+
         self.typing_status[conversation_id][user_id] = typing
-        
+
         # Broadcast typing status to conversation participants
         await self.broadcast({
             "type": "typing",
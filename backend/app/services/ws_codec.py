@@ -0,0 +1,138 @@
+"""WebSocket wire codecs - JSON fallback and compact MessagePack encoding."""
+import json
+from typing import Optional, Tuple
+from fastapi import WebSocket
+
+try:
+    import msgpack
+except ImportError:  # optional dependency, clients fall back to JSON
+    msgpack = None
+
+MSGPACK_SUBPROTOCOL = "pinpost.msgpack.v1"
+
+# Short keys used by the MessagePack codec. Values are left untouched.
+KEY_ALIASES = {
+    "type": "t",
+    "id": "i",
+    "user_id": "u",
+    "notification": "n",
+    "message": "m",
+    "events": "e",
+    "actor_id": "ai",
+    "actor_username": "an",
+    "actor_avatar": "aa",
+    "post_id": "p",
+    "post_type": "pt",
+    "comment_id": "ci",
+    "read": "r",
+    "created_at": "ca",
+    "conversation_id": "cv",
+    "sender_id": "si",
+    "sender_username": "sn",
+    "sender_avatar": "sa",
+    "content": "c",
+    "image_url": "iu",
+    "voice_url": "vu",
+    "read_by": "rb",
+    "delivered_to": "dt",
+    "online": "o",
+    "last_seen": "ls",
+    "typing": "ty",
+}
+KEY_EXPANSIONS = {short: key for key, short in KEY_ALIASES.items()}
+
+
+def _compact(value):
+    """Alias keys and drop null fields recursively."""
+    if isinstance(value, dict):
+        return {
+            KEY_ALIASES.get(k, k): _compact(v)
+            for k, v in value.items()
+            if v is not None
+        }
+    if isinstance(value, list):
+        return [_compact(v) for v in value]
+    return value
+
+
+def _expand(value):
+    """Reverse of _compact for frames received from compact clients."""
+    if isinstance(value, dict):
+        return {KEY_EXPANSIONS.get(k, k): _expand(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_expand(v) for v in value]
+    return value
+
+
+class JsonCodec:
+    """Plain JSON text frames - the default every client understands."""
+    name = "json"
+    binary = False
+
+    def encode(self, message: dict) -> str:
+        return json.dumps(message, separators=(",", ":"), ensure_ascii=False)
+
+    def encode_batch(self, payloads: list) -> str:
+        """Wrap already-encoded frames in one batch frame without re-encoding them."""
+        return '{"type":"batch","events":[' + ",".join(payloads) + "]}"
+
+    def decode(self, data) -> dict:
+        return json.loads(data)
+
+
+class MsgPackCodec:
+    """Binary MessagePack frames with short field keys."""
+    name = "msgpack"
+    binary = True
+
+    def encode(self, message: dict) -> bytes:
+        return msgpack.packb(_compact(message), use_bin_type=True)
+
+    def encode_batch(self, payloads: list) -> bytes:
+        """Wrap already-encoded frames in one batch frame without re-encoding them."""
+        packer = msgpack.Packer(use_bin_type=True)
+        header = (
+            packer.pack_map_header(2)
+            + packer.pack(KEY_ALIASES["type"]) + packer.pack("batch")
+            + packer.pack(KEY_ALIASES["events"]) + packer.pack_array_header(len(payloads))
+        )
+        return header + b"".join(payloads)
+
+    def decode(self, data) -> dict:
+        return _expand(msgpack.unpackb(data, raw=False))
+
+
+json_codec = JsonCodec()
+msgpack_codec = MsgPackCodec() if msgpack is not None else None
+
+
+def negotiate_codec(websocket: WebSocket) -> Tuple[object, Optional[str]]:
+    """
+    Pick the codec for a connecting socket.
+
+    Clients opt into MessagePack with the `pinpost.msgpack.v1` subprotocol or
+    `?encoding=msgpack`; everything else (or a server without msgpack) gets JSON.
+    Returns the codec and the subprotocol to echo back on accept.
+    """
+    if msgpack_codec is None:
+        return json_codec, None
+    if MSGPACK_SUBPROTOCOL in websocket.scope.get("subprotocols", []):
+        return msgpack_codec, MSGPACK_SUBPROTOCOL
+    if websocket.query_params.get("encoding") == "msgpack":
+        return msgpack_codec, None
+    return json_codec, None
+
+
+class Frame:
+    """An outbound message, encoded at most once per codec however many sockets receive it."""
+    __slots__ = ("message", "_encoded")
+
+    def __init__(self, message: dict):
+        self.message = message
+        self._encoded = {}
+
+    def encode(self, codec):
+        payload = self._encoded.get(codec.name)
+        if payload is None:
+            payload = self._encoded[codec.name] = codec.encode(self.message)
+        return payload
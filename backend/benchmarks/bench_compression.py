@@ -0,0 +1,115 @@
+"""
+CPU cost vs. bytes saved when compressing API responses.
+
+    cd backend && python -m benchmarks.bench_compression
+
+Bodies are a 20-blog /api/blogs page (~9KB of content each, what get_feed
+and get_blogs send) and a 50-item /api/posts page. For each codec/level it
+reports the compressed size, CPU time per response and the time saved on
+the wire at a few link speeds; a level pays off while the transfer time
+saved exceeds the CPU spent.
+"""
+import gzip
+import random
+import time
+import uuid
+from datetime import datetime, timezone
+
+from fastapi.responses import ORJSONResponse
+
+from app.models import BlogPost, ShortPost
+from app.serialization import trusted
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+ROUNDS = 50
+# Mbit/s: mobile 3G-ish, typical 4G, home broadband
+LINKS = (2, 20, 100)
+
+_WORDS = (
+    "the a of and to in is for on with that this it as be are from at by was we you your "
+    "python database query index latency mongo cache server client request response page "
+    "feed blog post story image profile follow like comment share user time build deploy "
+    "performance memory network thread async event loop worker process queue buffer"
+).split()
+
+
+def _text(rng: random.Random, words: int) -> str:
+    return " ".join(rng.choice(_WORDS) for _ in range(words)).capitalize() + "."
+
+
+def _blog(rng: random.Random) -> dict:
+    now = datetime.now(timezone.utc).isoformat()
+    content = "\n\n".join(_text(rng, 120) for _ in range(12))  # ~9KB
+    return {
+        "id": str(uuid.uuid4()),
+        "author_id": str(uuid.uuid4()),
+        "author_username": f"user{rng.randint(1, 9999)}",
+        "author_avatar": f"/uploads/{uuid.uuid4().hex}.webp",
+        "title": _text(rng, 8),
+        "content": content,
+        "excerpt": content[:150] + "...",
+        "cover_image": "",
+        "tags": rng.sample(_WORDS, 3),
+        "likes_count": rng.randint(0, 500),
+        "comments_count": rng.randint(0, 50),
+        "shares_count": rng.randint(0, 10),
+        "created_at": now,
+        "updated_at": now,
+    }
+
+
+def _post(rng: random.Random) -> dict:
+    return {
+        "id": str(uuid.uuid4()),
+        "author_id": str(uuid.uuid4()),
+        "author_username": f"user{rng.randint(1, 9999)}",
+        "author_avatar": f"/uploads/{uuid.uuid4().hex}.webp",
+        "content": _text(rng, rng.randint(5, 50)),
+        "likes_count": rng.randint(0, 500),
+        "comments_count": rng.randint(0, 50),
+        "shares_count": 0,
+        "created_at": datetime.now(timezone.utc).isoformat(),
+    }
+
+
+def _codecs():
+    codecs = [(f"gzip-{level}", lambda b, level=level: gzip.compress(b, compresslevel=level, mtime=0)) for level in (1, 6, 9)]
+    if brotli is not None:
+        codecs += [(f"br-{q}", lambda b, q=q: brotli.compress(b, quality=q)) for q in (1, 4, 6, 11)]
+    return codecs
+
+
+def _measure(fn, body: bytes):
+    rounds = ROUNDS if len(body) < 500_000 else ROUNDS // 5
+    start = time.process_time()
+    for _ in range(rounds):
+        out = fn(body)
+    return len(out), (time.process_time() - start) / rounds * 1000
+
+
+def main():
+    rng = random.Random(42)
+    bodies = {
+        "blogs x20": ORJSONResponse([trusted(BlogPost, _blog(rng)) for _ in range(20)]).body,
+        "posts x50": ORJSONResponse([trusted(ShortPost, _post(rng)) for _ in range(50)]).body,
+    }
+    if brotli is None:
+        print("brotli not installed; gzip only")
+    for name, body in bodies.items():
+        print(f"\n{name}: {len(body) / 1024:.1f} KiB uncompressed")
+        print(f"{'codec':<8} {'size KiB':>9} {'ratio':>6} {'cpu ms':>7}   " + "   ".join(f"saved@{m}Mbit" for m in LINKS))
+        for codec, fn in _codecs():
+            size, cpu_ms = _measure(fn, body)
+            saved = [((len(body) - size) * 8 / (m * 1e6)) * 1000 - cpu_ms for m in LINKS]
+            print(
+                f"{codec:<8} {size / 1024:9.1f} {len(body) / size:6.1f} {cpu_ms:7.2f}   "
+                + "   ".join(f"{s:+10.1f}ms" for s in saved)
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+"""
+Round trips and latency of list pages: per-row hydration loops vs. $lookup pipelines.
+
+    cd backend && MONGO_URL=mongodb://localhost:27017 python -m benchmarks.bench_pipelines
+
+Needs a real MongoDB (mongomock has no $lookup sub-pipelines or command
+events). Seeds a scratch database, BENCH_DB_NAME (default pinpost_bench),
+and drops it afterwards. "loop" is the previous handler code: one page
+query, then an author and a like lookup per row; "pipeline" is
+services.pipelines. Commands are counted with the app's query log.
+"""
+import os
+
+os.environ["DB_NAME"] = os.environ.get("BENCH_DB_NAME", "pinpost_bench")
+
+import asyncio  # noqa: E402
+import random  # noqa: E402
+import statistics  # noqa: E402
+import time  # noqa: E402
+import uuid  # noqa: E402
+from datetime import datetime, timedelta, timezone  # noqa: E402
+
+from app.database import client, db  # noqa: E402
+from app.models import BlogPost, ShortPost  # noqa: E402
+from app.query_log import QueryLog, _current  # noqa: E402
+from app.serialization import trusted  # noqa: E402
+from app.services.pipelines import content_page, feed_page  # noqa: E402
+
+USERS = 200
+POSTS = 5000
+BLOGS = 1000
+OTHER_LIKES = 20000
+ROUNDS = 30
+
+
+async def _seed(viewer_id: str):
+    rng = random.Random(7)
+    now = datetime.now(timezone.utc)
+    users = [
+        {"id": str(uuid.uuid4()), "username": f"user{i}", "email": f"user{i}@bench.io", "name": f"User {i}",
+         "avatar": f"/uploads/{uuid.uuid4().hex}.webp", "created_at": now.isoformat()}
+        for i in range(USERS)
+    ]
+    users[0]["id"] = viewer_id
+
+    def item(i: int) -> dict:
+        author = rng.choice(users)
+        return {
+            "id": str(uuid.uuid4()), "author_id": author["id"], "author_username": author["username"],
+            "author_avatar": "", "likes_count": 0, "comments_count": 0, "shares_count": 0,
+            "created_at": (now - timedelta(minutes=i)).isoformat(),
+        }
+
+    posts = [{**item(i), "content": "Short post body " * 8} for i in range(POSTS)]
+    blogs = [
+        {**item(i), "title": "A blog title", "content": "Long form paragraph. " * 400, "excerpt": "An excerpt",
+         "cover_image": "", "tags": ["bench"], "updated_at": now.isoformat()}
+        for i in range(BLOGS)
+    ]
+    likes = [
+        {"id": str(uuid.uuid4()), "user_id": rng.choice(users)["id"], "post_id": rng.choice(posts)["id"], "post_type": "post"}
+        for _ in range(OTHER_LIKES)
+    ]
+    likes += [
+        {"id": str(uuid.uuid4()), "user_id": viewer_id, "post_id": p["id"], "post_type": "post"}
+        for p in rng.sample(posts, POSTS // 3)
+    ]
+    await db.users.insert_many(users)
+    await db.short_posts.insert_many(posts)
+    await db.blog_posts.insert_many(blogs)
+    await db.likes.insert_many(likes)
+    # The indexes the app creates at startup
+    await db.users.create_index("id", unique=True)
+    await db.short_posts.create_index("created_at")
+    await db.blog_posts.create_index("created_at")
+    await db.likes.create_index([("user_id", 1), ("post_type", 1), ("post_id", 1)])
+
+
+async def _loop_page(collection, model, post_type, limit, viewer_id):
+    docs = await collection.find().sort("created_at", -1).limit(limit).to_list(limit)
+    result = []
+    for doc in docs:
+        author = await db.users.find_one({"id": doc["author_id"]})
+        data = trusted(model, doc)
+        if author:
+            data["author_avatar"] = author.get("avatar", "")
+        liked = await db.likes.find_one({"user_id": viewer_id, "post_id": doc["id"], "post_type": post_type})
+        data["liked_by_user"] = bool(liked)
+        result.append(data)
+    return result
+
+
+async def _loop_feed(limit, viewer_id):
+    posts = await _loop_page(db.short_posts, ShortPost, "post", limit, viewer_id)
+    blogs = await _loop_page(db.blog_posts, BlogPost, "blog", limit, viewer_id)
+    return sorted(posts + blogs, key=lambda item: item["created_at"], reverse=True)[:limit]
+
+
+async def _measure(make_call):
+    durations, commands = [], 0
+    for _ in range(ROUNDS):
+        log = QueryLog(None)
+        token = _current.set(log)
+        start = time.perf_counter()
+        try:
+            await make_call()
+        finally:
+            _current.reset(token)
+        durations.append((time.perf_counter() - start) * 1000)
+        commands = log.count
+    return statistics.median(durations), commands
+
+
+async def main():
+    viewer_id = str(uuid.uuid4())
+    await client.drop_database(os.environ["DB_NAME"])
+    await _seed(viewer_id)
+    try:
+        print(f"{'page':<16} {'loop ms':>8} {'cmds':>5}   {'pipeline ms':>11} {'cmds':>5}   speedup")
+        for limit in (20, 50):
+            cases = {
+                f"posts x{limit}": (
+                    lambda: _loop_page(db.short_posts, ShortPost, "post", limit, viewer_id),
+                    lambda: content_page("post", {}, 0, limit, None, viewer_id),
+                ),
+                f"blogs x{limit}": (
+                    lambda: _loop_page(db.blog_posts, BlogPost, "blog", limit, viewer_id),
+                    lambda: content_page("blog", {}, 0, limit, None, viewer_id),
+                ),
+                f"feed x{limit}": (
+                    lambda: _loop_feed(limit, viewer_id),
+                    lambda: feed_page({}, 0, limit, None, None, viewer_id),
+                ),
+            }
+            for name, (loop, pipeline) in cases.items():
+                loop_ms, loop_cmds = await _measure(loop)
+                pipe_ms, pipe_cmds = await _measure(pipeline)
+                print(f"{name:<16} {loop_ms:8.1f} {loop_cmds:5d}   {pipe_ms:11.1f} {pipe_cmds:5d}   {loop_ms / pipe_ms:6.1f}x")
+    finally:
+        await client.drop_database(os.environ["DB_NAME"])
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
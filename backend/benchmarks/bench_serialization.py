@@ -0,0 +1,91 @@
+"""
+Per-item CPU cost of serializing a 100-item list page.
+
+    cd backend && python -m benchmarks.bench_serialization
+
+"before" is the old path: Model(**doc).dict() (model_dump) per item, FastAPI validating
+the list again against response_model, then the stdlib JSON encoder.
+"after" is trusted() shaping plus ORJSONResponse.
+"""
+import asyncio
+import time
+import uuid
+from datetime import datetime, timezone
+from typing import List
+
+from bson import ObjectId
+from fastapi.responses import JSONResponse, ORJSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_response_field
+
+from app.models import ShortPost, BlogPost
+from app.serialization import trusted
+
+PAGE_SIZE = 100
+ROUNDS = 200
+
+
+def _post() -> dict:
+    return {
+        "_id": ObjectId(),
+        "id": str(uuid.uuid4()),
+        "author_id": str(uuid.uuid4()),
+        "author_username": "someone",
+        "author_avatar": "https://res.cloudinary.com/demo/image/upload/avatar.jpg",
+        "content": "Short post body " * 8,
+        "likes_count": 12,
+        "comments_count": 3,
+        "shares_count": 0,
+        "created_at": datetime.now(timezone.utc).isoformat(),
+    }
+
+
+def _blog() -> dict:
+    now = datetime.now(timezone.utc).isoformat()
+    return {
+        "_id": ObjectId(),
+        "id": str(uuid.uuid4()),
+        "author_id": str(uuid.uuid4()),
+        "author_username": "someone",
+        "author_avatar": "",
+        "title": "A blog title",
+        "content": "Long form paragraph with some words in it. " * 200,  # ~9KB
+        "excerpt": "A blog excerpt",
+        "cover_image": "",
+        "tags": ["python", "mongodb", "fastapi"],
+        "likes_count": 40,
+        "comments_count": 7,
+        "shares_count": 1,
+        "created_at": now,
+        "updated_at": now,
+    }
+
+
+async def _before(model, docs, field) -> bytes:
+    items = [model(**doc).model_dump() for doc in docs]
+    content = await serialize_response(field=field, response_content=items)
+    return JSONResponse(content).body
+
+
+async def _after(model, docs, field) -> bytes:
+    return ORJSONResponse([trusted(model, doc) for doc in docs]).body
+
+
+async def _measure(fn, model, docs, field) -> float:
+    start = time.process_time()
+    for _ in range(ROUNDS):
+        await fn(model, docs, field)
+    return (time.process_time() - start) / (ROUNDS * len(docs)) * 1e6
+
+
+async def main():
+    for model, make in ((ShortPost, _post), (BlogPost, _blog)):
+        docs = [make() for _ in range(PAGE_SIZE)]
+        field = create_response_field(name="response", type_=List[model])
+        before = await _measure(_before, model, docs, field)
+        after = await _measure(_after, model, docs, field)
+        print(f"{model.__name__:<10} before {before:7.2f} us/item   after {after:7.2f} us/item   {before / after:4.1f}x")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
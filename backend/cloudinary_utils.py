@@ -1,6 +1,7 @@
 import cloudinary
 import cloudinary.uploader
 import cloudinary.api
+import cloudinary.utils
 import os
 from typing import Optional
 
@@ -40,6 +41,12 @@ def configure_cloudinary():
 
 _configured = False
 
+def ensure_configured():
+    global _configured
+    if not _configured:
+        configure_cloudinary()
+        _configured = True
+
 # Upload preset names
 PRESETS = {
     'profile': 'pinpost_profile',
@@ -49,23 +56,22 @@ PRESETS = {
     'story': 'pinpost_stories'
 }
 
-def upload_to_cloudinary(file_content: bytes, filename: str, upload_type: str = 'profile', folder: str = 'pinpost/uploads') -> dict:
+def upload_to_cloudinary(file_content, filename: str, upload_type: str = 'profile', folder: str = 'pinpost/uploads', timeout: Optional[float] = None, resource_type: str = 'image') -> dict:
     """
     Upload image to Cloudinary using authenticated upload (API Key/Secret)
+    file_content may be raw bytes or a path to a local file
     """
     try:
-        global _configured
-        if not _configured:
-            configure_cloudinary()
-            _configured = True
+        ensure_configured()
             
         # Use authenticated upload with folder instead of relying on presets
         print(f"DEBUG: Uploading to folder {folder}")
         result = cloudinary.uploader.upload(
             file_content,
             folder=folder,
-            resource_type="image",
-            public_id=os.path.splitext(filename)[0] # Optional: keep original filename as ID
+            resource_type=resource_type,
+            public_id=os.path.splitext(filename)[0], # Optional: keep original filename as ID
+            timeout=timeout
         )
         
         return {
@@ -96,4 +102,46 @@ def get_cloudinary_url(public_id: str, transformation: Optional[dict] = None) ->
             return cloudinary.CloudinaryImage(public_id).build_url(**transformation)
         return cloudinary.CloudinaryImage(public_id).build_url()
     except:
-        return ""
\ No newline at end of file
+        return ""
+
+def sign_upload_params(params: dict, resource_type: str = 'image') -> dict:
+    """Sign upload parameters so a client can upload directly to Cloudinary"""
+    ensure_configured()
+    config = cloudinary.config()
+    signature = cloudinary.utils.api_sign_request(params, config.api_secret)
+    return {
+        'upload_url': cloudinary.utils.cloudinary_api_url('upload', resource_type=resource_type),
+        'fields': dict(params, api_key=config.api_key, signature=signature),
+    }
+
+def verify_upload_signature(public_id: str, version, signature: str) -> bool:
+    """Verify the signature Cloudinary returned for a direct upload"""
+    ensure_configured()
+    try:
+        return cloudinary.utils.verify_api_response_signature(public_id, version, signature)
+    except Exception as e:
+        print(f"Cloudinary signature check error: {e}")
+        return False
+
+def get_resource_info(public_id: str, resource_type: str = 'image') -> Optional[dict]:
+    """Fetch what Cloudinary recorded for an uploaded asset (etag, format, bytes), or None"""
+    ensure_configured()
+    try:
+        result = cloudinary.api.resource(public_id, resource_type=resource_type)
+    except Exception as e:
+        print(f"Cloudinary resource lookup error: {e}")
+        return None
+    return {
+        'etag': result.get('etag'),
+        'format': result.get('format'),
+        'bytes': result.get('bytes'),
+        'version': result.get('version'),
+    }
+
+def build_asset_url(public_id: str, version, format: Optional[str] = None, resource_type: str = 'image') -> str:
+    """Build the delivery URL for an uploaded asset"""
+    ensure_configured()
+    url, _ = cloudinary.utils.cloudinary_url(
+        public_id, resource_type=resource_type, version=version, format=format, secure=True
+    )
+    return url
@@ -0,0 +1,17 @@
+"""Gunicorn hooks (loaded automatically from the working directory)."""
+import os
+import shutil
+
+
+def on_starting(server):
+    # Workers write metric files here; stale ones from a previous run would be merged in
+    path = os.environ.get("PROMETHEUS_MULTIPROC_DIR")
+    if path:
+        shutil.rmtree(path, ignore_errors=True)
+        os.makedirs(path, exist_ok=True)
+
+
+def child_exit(server, worker):
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        from prometheus_client import multiprocess
+        multiprocess.mark_process_dead(worker.pid)
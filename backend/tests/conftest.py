@@ -0,0 +1,40 @@
+"""
+Test setup: the real app against a scratch MongoDB database.
+
+    cd backend && MONGO_URL=mongodb://localhost:27017 python -m pytest -q
+
+Uses TEST_DB_NAME (default pinpost_test): emptied before the run (the
+indexes built at startup stay) and dropped after it. Query accounting
+counts driver command events, so these tests need a real server; without
+one they are skipped.
+"""
+import os
+
+os.environ["DB_NAME"] = os.environ.get("TEST_DB_NAME", "pinpost_test")
+os.environ["QUERY_STRICT"] = "true"
+# Every request computes its own result, so each one issues its own queries
+os.environ["MICROCACHE_TTL"] = "0"
+
+import pytest  # noqa: E402
+from fastapi.testclient import TestClient  # noqa: E402
+
+from app.database import client as mongo_client, db  # noqa: E402
+from app.main import app  # noqa: E402
+
+
+@pytest.fixture(scope="session")
+def client():
+    with TestClient(app) as test_client:
+        if test_client.get("/api/health").json().get("database") != "connected":
+            pytest.skip("MongoDB is not reachable at MONGO_URL")
+        test_client.portal.call(_empty_collections)
+        try:
+            yield test_client
+        finally:
+            test_client.portal.call(mongo_client.drop_database, os.environ["DB_NAME"])
+
+
+async def _empty_collections():
+    for name in await db.list_collection_names():
+        await db[name].delete_many({})
+
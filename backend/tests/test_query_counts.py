@@ -0,0 +1,63 @@
+"""
+List endpoints issue a fixed number of queries, however long the page.
+
+Runs with QUERY_STRICT on, so the query accounting middleware itself also
+fails any request that is over budget or issues more queries for a larger
+`limit` than for a smaller one.
+"""
+import re
+
+import pytest
+
+LIST_ENDPOINTS = ["/api/posts", "/api/blogs", "/api/feed"]
+SMALL, LARGE = 5, 25
+
+
+def register(client, username: str) -> dict:
+    """Authorization headers for a new user."""
+    response = client.post(
+        "/api/auth/register",
+        json={"username": username, "email": f"{username}@test.io", "password": "password123"},
+    )
+    assert response.status_code == 200, response.text
+    return {"Authorization": f"Bearer {response.json()['token']}"}
+
+
+def query_count(response) -> int:
+    """Commands the request issued, from its Server-Timing header."""
+    match = re.search(r'db;[^,]*desc="(\d+) queries"', response.headers["server-timing"])
+    assert match, response.headers["server-timing"]
+    return int(match.group(1))
+
+
+@pytest.fixture(scope="module")
+def viewer(client):
+    """A logged-in reader, with more posts and blogs by other authors than the largest page, some liked."""
+    viewer = register(client, "reader")
+    authors = [register(client, "author_one"), register(client, "author_two")]
+    for i in range(LARGE + 5):
+        author = authors[i % 2]
+        post = client.post("/api/posts", headers=author, json={"content": f"Post {i}"}).json()
+        blog = client.post(
+            "/api/blogs", headers=author, json={"title": f"Blog {i}", "content": "Body " * 50, "tags": ["test"]}
+        ).json()
+        if i % 3 == 0:
+            client.post(f"/api/post/{post['id']}/like", headers=viewer)
+            client.post(f"/api/blog/{blog['id']}/like", headers=viewer)
+    return viewer
+
+
+@pytest.mark.parametrize("path", LIST_ENDPOINTS)
+@pytest.mark.parametrize("signed_in", [False, True], ids=["anonymous", "viewer"])
+def test_list_query_count_does_not_grow_with_limit(client, viewer, path, signed_in):
+    headers = viewer if signed_in else {}
+    # Warm per-process caches (token lookups and the like) so both pages start equal
+    client.get(path, params={"limit": 1}, headers=headers)
+
+    small = client.get(path, params={"limit": SMALL}, headers=headers)
+    large = client.get(path, params={"limit": LARGE}, headers=headers)
+
+    assert small.status_code == 200, small.text
+    assert large.status_code == 200, large.text
+    assert len(large.json()) == LARGE
+    assert query_count(large) == query_count(small)
@@ -0,0 +1,130 @@
+"""
+QueryLog and QueryAccountingMiddleware with synthetic driver events.
+
+Each endpoint reports commands through the app's listener exactly as the
+driver would, so these run without a database.
+"""
+import itertools
+import logging
+from types import SimpleNamespace
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app import query_log
+from app.config import settings
+from app.metrics import mongo_listener
+from app.query_log import QueryAccountingMiddleware, QueryLog
+
+_request_ids = itertools.count(1)
+
+
+def issue(count: int, command: str = "find", collection: str = "users", micros: int = 2000):
+    """Report `count` finished commands for the current request."""
+    for _ in range(count):
+        request_id = next(_request_ids)
+        mongo_listener.started(SimpleNamespace(
+            connection_id=("test", 1), request_id=request_id, command_name=command, command={command: collection},
+        ))
+        mongo_listener.succeeded(SimpleNamespace(
+            connection_id=("test", 1), request_id=request_id, command_name=command, command={command: collection},
+            duration_micros=micros,
+        ))
+
+
+@pytest.fixture
+def accounting(monkeypatch):
+    monkeypatch.setattr(settings, "QUERY_TRACKING", True)
+    monkeypatch.setattr(settings, "QUERY_STRICT", False)
+    monkeypatch.setattr(settings, "QUERY_BUDGET", 20)
+    monkeypatch.setattr(query_log, "_scaling", {})
+
+    app = FastAPI()
+    app.add_middleware(QueryAccountingMiddleware)
+
+    @app.get("/fixed")
+    async def fixed(n: int = 3):
+        issue(n)
+        return {"ok": True}
+
+    @app.get("/per-row")
+    async def per_row(limit: int):
+        # One page query, then one lookup per row
+        issue(1, "aggregate", "short_posts")
+        issue(limit, "find", "users")
+        return {"ok": True}
+
+    @app.get("/page")
+    async def page(limit: int):
+        issue(2, "aggregate", "short_posts")
+        return {"ok": True}
+
+    with TestClient(app) as client:
+        yield client
+
+
+def test_query_log_groups_commands_by_site():
+    log = QueryLog(None)
+    for key, (command, collection) in enumerate([("find", "users"), ("find", "users"), ("aggregate", "likes")]):
+        log.started((1, key), command, collection)
+        log.finished((1, key), 0.004)
+
+    assert log.count == 3
+    assert log.duration == pytest.approx(0.012)
+    assert log.sites == {"find users": 2, "aggregate likes": 1}
+    assert log.top_sites(1) == ["find users x2 (8.0ms)"]
+
+
+def test_server_timing_reports_count_and_db_time(accounting):
+    response = accounting.get("/fixed", params={"n": 3})
+
+    assert response.status_code == 200
+    db_part, app_part = response.headers["server-timing"].split(", ")
+    assert db_part == 'db;dur=6.0;desc="3 queries"'
+    assert app_part.startswith("app;dur=")
+
+
+def test_over_budget_is_logged_but_served(accounting, monkeypatch, caplog):
+    monkeypatch.setattr(settings, "QUERY_BUDGET", 2)
+
+    with caplog.at_level(logging.WARNING):
+        response = accounting.get("/fixed", params={"n": 3})
+
+    assert response.status_code == 200
+    assert "/fixed issued 3 queries (budget 2)" in caplog.text
+    assert "find users x3" in caplog.text
+
+
+def test_strict_mode_fails_over_budget_requests(accounting, monkeypatch):
+    monkeypatch.setattr(settings, "QUERY_STRICT", True)
+    monkeypatch.setattr(settings, "QUERY_BUDGET", 2)
+
+    response = accounting.get("/fixed", params={"n": 3})
+
+    assert response.status_code == 500
+    body = response.json()
+    assert body["detail"] == "/fixed issued 3 queries (budget 2)"
+    assert body["call_sites"] == ["find users x3 (6.0ms)"]
+    assert "server-timing" not in response.headers
+
+
+def test_strict_mode_fails_when_queries_grow_with_limit(accounting, monkeypatch):
+    monkeypatch.setattr(settings, "QUERY_STRICT", True)
+
+    assert accounting.get("/per-row", params={"limit": 2}).status_code == 200
+    response = accounting.get("/per-row", params={"limit": 5})
+
+    assert response.status_code == 500
+    assert response.json()["detail"] == "/per-row issued 6 queries for limit=5 but 3 for limit=2"
+
+
+def test_strict_mode_passes_fixed_cost_pages(accounting, monkeypatch):
+    monkeypatch.setattr(settings, "QUERY_STRICT", True)
+
+    counts = []
+    for limit in (2, 5, 50):
+        response = accounting.get("/page", params={"limit": limit})
+        assert response.status_code == 200
+        counts.append(response.headers["server-timing"])
+    assert all('desc="2 queries"' in timing for timing in counts)
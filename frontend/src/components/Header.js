@@ -191,13 +191,17 @@ const NotificationsDropdown = ({ user }) => {
             if (event.data === 'pong') return; // Ignore pong responses
 
             const data = JSON.parse(event.data);
-
-            if (data.type === 'new_notification') {
-              const notification = data.notification;
-              setNotifications(prev => [notification, ...prev]);
-              setUnreadCount(prev => prev + 1);
-              showInstantNotification(notification);
-            }
+            // Bursts arrive coalesced into a single batch frame
+            const events = data.type === 'batch' ? data.events : [data];
+
+            events.forEach((evt) => {
+              if (evt.type === 'new_notification') {
+                const notification = evt.notification;
+                setNotifications(prev => [notification, ...prev]);
+                setUnreadCount(prev => prev + 1);
+                showInstantNotification(notification);
+              }
+            });
           } catch (error) {
             // Silently handle parsing errors
           }
@@ -160,90 +160,95 @@ export const useMessaging = (user) => {
       console.log('WebSocket connected for messages');
     };
 
-    websocket.onmessage = (event) => {
-      if (event.data === 'pong') return;
-      
-      try {
-        const data = JSON.parse(event.data);
+    const handleSocketEvent = (data) => {
+      if (data.type === 'new_message') {
+        const newMessage = data.message;
         
-        if (data.type === 'new_message') {
-          const newMessage = data.message;
-          
-          if (activeConversation && newMessage.conversation_id === activeConversation.id) {
-            setMessages(prev => [...prev, newMessage]);
-            axios.put(`${API}/messages/${newMessage.id}/read`).catch(err => console.error('Failed to mark as read:', err));
-          } else {
-            setConversations(prevConvs => {
-              const updated = prevConvs.map(conv => {
-                if (conv.id === data.conversation_id) {
-                  return {
-                    ...conv,
-                    last_message: newMessage.content || '📷 Photo',
-                    last_message_at: newMessage.created_at,
-                    unread_count: {
-                      ...conv.unread_count,
-                      [user.id]: (conv.unread_count[user.id] || 0) + 1
-                    }
-                  };
-                }
-                return conv;
-              });
-              return updated.sort((a, b) => 
-                new Date(b.last_message_at || b.updated_at) - 
-                new Date(a.last_message_at || a.updated_at)
-              );
-            });
-            
-            toast.info(`💬 ${newMessage.sender_username}`, {
-              description: newMessage.content || '📷 Sent a photo',
-              duration: 4000
+        if (activeConversation && newMessage.conversation_id === activeConversation.id) {
+          setMessages(prev => [...prev, newMessage]);
+          axios.put(`${API}/messages/${newMessage.id}/read`).catch(err => console.error('Failed to mark as read:', err));
+        } else {
+          setConversations(prevConvs => {
+            const updated = prevConvs.map(conv => {
+              if (conv.id === data.conversation_id) {
+                return {
+                  ...conv,
+                  last_message: newMessage.content || '📷 Photo',
+                  last_message_at: newMessage.created_at,
+                  unread_count: {
+                    ...conv.unread_count,
+                    [user.id]: (conv.unread_count[user.id] || 0) + 1
+                  }
+                };
+              }
+              return conv;
             });
-          }
+            return updated.sort((a, b) => 
+              new Date(b.last_message_at || b.updated_at) - 
+              new Date(a.last_message_at || a.updated_at)
+            );
+          });
+          
+          toast.info(`💬 ${newMessage.sender_username}`, {
+            description: newMessage.content || '📷 Sent a photo',
+            duration: 4000
+          });
         }
-        
-        if (data.type === 'user_status') {
-          setOnlineUsers(prev => ({
+      }
+      
+      if (data.type === 'user_status') {
+        setOnlineUsers(prev => ({
+          ...prev,
+          [data.user_id]: {
+            online: data.online,
+            last_seen: data.last_seen
+          }
+        }));
+      }
+      
+      if (data.type === 'typing_status') {
+        if (data.conversation_id === activeConversation?.id && data.user_id !== user.id) {
+          setTypingUsers(prev => ({
             ...prev,
-            [data.user_id]: {
-              online: data.online,
-              last_seen: data.last_seen
+            [data.conversation_id]: {
+              user_id: data.user_id,
+              typing: data.typing
             }
           }));
-        }
-        
-        if (data.type === 'typing_status') {
-          if (data.conversation_id === activeConversation?.id && data.user_id !== user.id) {
-            setTypingUsers(prev => ({
-              ...prev,
-              [data.conversation_id]: {
-                user_id: data.user_id,
-                typing: data.typing
-              }
-            }));
-            
-            if (data.typing) {
-              setTimeout(() => {
-                setTypingUsers(prev => ({
-                  ...prev,
-                  [data.conversation_id]: { ...prev[data.conversation_id], typing: false }
-                }));
-              }, 3000);
-            }
+          
+          if (data.typing) {
+            setTimeout(() => {
+              setTypingUsers(prev => ({
+                ...prev,
+                [data.conversation_id]: { ...prev[data.conversation_id], typing: false }
+              }));
+            }, 3000);
           }
         }
-        
-        if (data.type === 'message_status') {
-          setMessages(prev => prev.map(msg => {
-            if (msg.id === data.message_id) {
-              return {
-                ...msg,
-                delivered_to: data.delivered_to || msg.delivered_to,
-                read_by: data.read_by || msg.read_by
-              };
-            }
-            return msg;
-          }));
-        }
+      }
+      
+      if (data.type === 'message_status') {
+        setMessages(prev => prev.map(msg => {
+          if (msg.id === data.message_id) {
+            return {
+              ...msg,
+              delivered_to: data.delivered_to || msg.delivered_to,
+              read_by: data.read_by || msg.read_by
+            };
+          }
+          return msg;
+        }));
+      }
+    };
+
+    websocket.onmessage = (event) => {
+      if (event.data === 'pong') return;
+      
+      try {
+        const data = JSON.parse(event.data);
+        // Bursts arrive coalesced into a single batch frame
+        const events = data.type === 'batch' ? data.events : [data];
+        events.forEach(handleSocketEvent);
       } catch (error) {
         console.error('Error parsing WebSocket message:', error);
       }